@@ -0,0 +1,76 @@
+"""Startup benchmark for the `hd` CLI.
+
+Measures wall time from process spawn to the first byte of output for a
+short `hd detect` call. The budget applies to the overhead over a bare
+interpreter printing one line, so the check is stable across machines whose
+interpreter startup differs; the absolute numbers are reported as well.
+
+    python scripts/bench_startup.py --runs 20 --budget-ms 50
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+HD = "from hallucination_detector.cli import main; main()"
+
+
+def time_to_first_byte(argv):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC), env.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    proc = subprocess.Popen(argv, stdout=subprocess.PIPE, env=env)
+    assert proc.stdout is not None
+    proc.stdout.read(1)
+    elapsed = time.perf_counter() - start
+    proc.stdout.read()
+    proc.wait()
+    return elapsed * 1000.0
+
+
+def measure(argv, runs):
+    time_to_first_byte(argv)  # warm the filesystem cache
+    return sorted(time_to_first_byte(argv) for _ in range(runs))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get("HD_STARTUP_BUDGET_MS", 50)),
+        help="Fail when the median overhead over a bare interpreter exceeds this",
+    )
+    args = p.parse_args()
+
+    bare = measure([sys.executable, "-c", "print(1)"], args.runs)
+    hd = measure([sys.executable, "-c", HD, "detect", "--text", "{}"], args.runs)
+    median = statistics.median(hd)
+    overhead = median - statistics.median(bare)
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "budget_ms": args.budget_ms,
+        "interpreter_median_ms": round(statistics.median(bare), 2),
+        "hd_detect_median_ms": round(median, 2),
+        "hd_detect_p90_ms": round(hd[int(0.9 * (len(hd) - 1))], 2),
+        "overhead_ms": round(overhead, 2),
+    }
+    print(json.dumps(report, indent=2))
+    if overhead > args.budget_ms:
+        print(
+            f"startup regression: {overhead:.1f} ms > budget {args.budget_ms} ms",
+            file=sys.stderr,
+        )
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
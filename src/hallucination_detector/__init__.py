@@ -1,14 +1,87 @@
-from .detector import Detection as Detection
-from .detector import InvalidSchema as InvalidSchema
-from .detector import SchemaValidationUnavailable as SchemaValidationUnavailable
-from .detector import clear_schema_cache as clear_schema_cache
-from .detector import detect_batch as detect_batch
-from .detector import detect_text as detect_text
-from .detector import generate_report as generate_report
-from .detector import load_custom_rules as load_custom_rules
-from .detector import make_schema_guard as make_schema_guard
-from .detector import set_confident_keywords as set_confident_keywords
-from .registry import build_checks as build_checks
-from .registry import clear_registry as clear_registry
-from .registry import list_detectors as list_detectors
-from .registry import register_detector as register_detector
+# Public names are resolved lazily (PEP 562) so that `import
+# hallucination_detector` and CLI startup only pay for the modules they use.
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from .bytesinput import detect_bytes as detect_bytes
+    from .detector import Detection as Detection
+    from .detector import InvalidSchema as InvalidSchema
+    from .detector import SchemaValidationUnavailable as SchemaValidationUnavailable
+    from .detector import clear_schema_cache as clear_schema_cache
+    from .detector import detect_batch as detect_batch
+    from .detector import detect_text as detect_text
+    from .detector import generate_report as generate_report
+    from .detector import load_custom_rules as load_custom_rules
+    from .detector import make_schema_guard as make_schema_guard
+    from .detector import schema_cache_info as schema_cache_info
+    from .detector import set_confident_keywords as set_confident_keywords
+    from .largeinput import MaxInputPolicy as MaxInputPolicy
+    from .largeinput import scan_file as scan_file
+    from .metrics import render_prometheus as render_prometheus
+    from .pipeline import Pipeline as Pipeline
+    from .pipeline import PipelineConfig as PipelineConfig
+    from .redos import RegexRiskWarning as RegexRiskWarning
+    from .redos import UnsafePattern as UnsafePattern
+    from .redos import analyze_pattern as analyze_pattern
+    from .registry import build_checks as build_checks
+    from .registry import clear_registry as clear_registry
+    from .registry import list_detectors as list_detectors
+    from .registry import register_detector as register_detector
+    from .report import ReportAccumulator as ReportAccumulator
+    from .resultlog import ResultLog as ResultLog
+    from .resultlog import ResultLogWriter as ResultLogWriter
+    from .stats import DetectorStats as DetectorStats
+    from .streaming import StreamDetector as StreamDetector
+    from .streaming import detect_stream as detect_stream
+    from .tracing import set_tracer as set_tracer
+
+_LAZY: Dict[str, str] = {
+    "detect_bytes": "bytesinput",
+    "Detection": "detector",
+    "InvalidSchema": "detector",
+    "SchemaValidationUnavailable": "detector",
+    "clear_schema_cache": "detector",
+    "detect_batch": "detector",
+    "detect_text": "detector",
+    "generate_report": "detector",
+    "load_custom_rules": "detector",
+    "make_schema_guard": "detector",
+    "schema_cache_info": "detector",
+    "set_confident_keywords": "detector",
+    "MaxInputPolicy": "largeinput",
+    "scan_file": "largeinput",
+    "render_prometheus": "metrics",
+    "Pipeline": "pipeline",
+    "PipelineConfig": "pipeline",
+    "RegexRiskWarning": "redos",
+    "UnsafePattern": "redos",
+    "analyze_pattern": "redos",
+    "build_checks": "registry",
+    "clear_registry": "registry",
+    "list_detectors": "registry",
+    "register_detector": "registry",
+    "ReportAccumulator": "report",
+    "ResultLog": "resultlog",
+    "ResultLogWriter": "resultlog",
+    "DetectorStats": "stats",
+    "StreamDetector": "streaming",
+    "detect_stream": "streaming",
+    "set_tracer": "tracing",
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,46 @@
+"""On-disk cache location and atomic JSON files shared by the caches."""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+
+def cache_dir() -> str:
+    """``$HD_CACHE_DIR``, else ``$XDG_CACHE_HOME`` or ``~/.cache``, per package."""
+    explicit = os.environ.get("HD_CACHE_DIR")
+    if explicit:
+        return explicit
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "hallucination_detector")
+
+
+def read_json(path: str) -> Any:
+    """The decoded file, or ``None`` if it is missing or corrupt."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: str, data: Any) -> None:
+    """Atomically replace ``path``; failures are ignored (it is only a cache)."""
+    import tempfile
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".hd-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, sort_keys=True)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
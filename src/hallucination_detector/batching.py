@@ -0,0 +1,163 @@
+"""Adaptive micro-batching for concurrent single-text requests.
+
+`MicroBatcher` collects texts submitted from many threads and hands them to
+one batch function, trading a bounded amount of latency (``window_ms``) for
+fewer, larger pipeline runs. A batch is dispatched when it reaches
+``max_batch_size`` or when the window since its first item expires.
+
+With ``adaptive=True`` (the default) the window is only waited for while
+there is concurrency to exploit: if recent batches held a single item, a
+lone request is dispatched immediately instead of idling for the window.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .detector import Detection
+
+_Item = Tuple[str, "Future[Detection]"]
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        run_batch: Callable[[Sequence[str]], List[Detection]],
+        *,
+        window_ms: float = 2.0,
+        max_batch_size: int = 64,
+        adaptive: bool = True,
+    ) -> None:
+        if window_ms < 0:
+            raise ValueError("window_ms must be >= 0")
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self._run_batch = run_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.adaptive = adaptive
+        self._queue: "queue.SimpleQueue[_Item | None]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._wait_seconds = 0.0
+        self._histogram: Dict[int, int] = {}
+        self._recent = 1.0  # moving average of batch size
+        self._closed = False
+        # Orders submissions against close(): nothing is queued after None
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._loop, name="hd-micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, text: str) -> "Future[Detection]":
+        fut: "Future[Detection]" = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            self._queue.put((text, fut))
+        return fut
+
+    def detect(self, text: str) -> Detection:
+        return self.submit(text).result()
+
+    def close(self) -> None:
+        """Stop accepting work; queued items are still processed."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and the batch-size distribution since start."""
+        with self._lock:
+            batches = self._batches
+            return {
+                "batches": batches,
+                "items": self._items,
+                "mean_batch_size": (self._items / batches) if batches else 0.0,
+                "mean_wait_ms": (
+                    (self._wait_seconds / self._items) * 1000.0 if self._items else 0.0
+                ),
+                "batch_size_histogram": {
+                    str(k): v for k, v in sorted(self._histogram.items())
+                },
+                "window_ms": self.window * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "adaptive": self.adaptive,
+            }
+
+    def _collect(self, first: _Item) -> Tuple[List[_Item], bool]:
+        batch = [first]
+        stop = False
+        # Whatever is already queued goes into this batch without waiting
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        if self.adaptive and len(batch) == 1 and self._recent < 1.5:
+            return batch, False
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            start = time.monotonic()
+            batch, stop = self._collect(first)
+            self._dispatch(batch, time.monotonic() - start)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List[_Item], waited: float) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            results = self._run_batch(texts)
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"batch function returned {len(results)} results "
+                    f"for {len(batch)} texts"
+                )
+        except Exception as e:  # deliver the failure to every caller
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for (_, fut), res in zip(batch, results):
+                fut.set_result(res)
+        # Batch sizes are counted in power-of-two buckets (1, 2, 4, ...)
+        size = len(batch)
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._wait_seconds += waited * size
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+            self._recent = 0.8 * self._recent + 0.2 * size
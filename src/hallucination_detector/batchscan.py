@@ -0,0 +1,260 @@
+"""Whole-batch prefiltering for batches of short texts.
+
+For short texts most of the cost of `detect_batch` is per-call overhead:
+several detector calls, `Detection` allocations and regex setups per text,
+mostly to find nothing. With ``batch_scan=True`` (`detect_batch`,
+`Pipeline.run_batch`, ``hd detect --batch --batch-scan``) the batch is
+joined into one buffer with ``"\\x00"`` between texts and an `array` of the
+offsets where each text starts. Each detector's `Prefilter` (see
+``prefilter.py``) is searched once over the whole buffer; a hit is mapped
+back to its text by binary search over the offsets, and the search resumes
+at the start of the next text.
+
+Each text then runs only the detectors whose prefilter it hit, plus the
+detectors that have none. The JSON guard works the other way round: a text
+whose first non-blank character cannot start a JSON document gets
+``invalid_json`` without being parsed. A text that needs no detector at all
+gets its result without any call.
+
+Results are the same as without ``batch_scan``; stats count the detector
+calls actually made. A batch in which some text contains ``"\\x00"`` runs
+text by text.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Sequence,
+    Tuple,
+)
+
+from . import tracing
+from .dedup import _copy
+from .detector import Detection, Severity, _detect_resolved, guard_json
+from .prefilter import Prefilter, prefilter_of
+from .tracing import span_detector_name
+
+if TYPE_CHECKING:
+    from .stats import DetectorStats
+
+Check = Callable[[str], Detection]
+
+SEPARATOR = "\x00"
+
+# First non-blank character of a JSON document, right after a separator
+_JSON_START = re.compile(r'\x00[ \t\n\r]*[\[{"0-9tfnNI-]')
+_JSON_FIRST = re.compile(r'[ \t\n\r]*[\[{"0-9tfnNI-]')
+
+
+class _Buffer:
+    """A batch joined with `SEPARATOR`, with its start offsets.
+
+    The lower-cased copy is made on first use. It shares the offsets unless
+    lower-casing changed some text's length (e.g. ``"İ"``), in which case it
+    is joined from the lower-cased texts with offsets of its own.
+    """
+
+    __slots__ = ("texts", "text", "starts", "_lower")
+
+    def __init__(self, texts: List[str]) -> None:
+        self.texts = texts
+        self.text = SEPARATOR.join(texts)
+        self.starts = _starts(texts)
+        self._lower: Tuple[str, Any] | None = None
+
+    def lower(self) -> Tuple[str, Any]:
+        if self._lower is None:
+            lowered = self.text.lower()
+            if len(lowered) == len(self.text):
+                self._lower = (lowered, self.starts)
+            else:
+                texts = [t.lower() for t in self.texts]
+                self._lower = (SEPARATOR.join(texts), _starts(texts))
+        return self._lower
+
+    def mark(self, prefilter: Prefilter, bit: int, masks: List[int]) -> None:
+        """Set ``bit`` in the mask of every text ``prefilter`` hits."""
+        text, starts = self.text, self.starts
+        literals = prefilter.literals
+        if prefilter.case == "lower":
+            text, starts = self.lower()
+        elif prefilter.case == "ignore" and literals:
+            if text.isascii() and all(lit.isascii() for lit in literals):
+                # On ASCII, IGNORECASE is the same as comparing lower case
+                text, starts = self.lower()
+                literals = tuple(lit.lower() for lit in literals)
+            else:
+                either = "|".join(map(re.escape, literals))
+                _mark(
+                    _regex_find(re.compile(either, re.IGNORECASE)),
+                    text,
+                    starts,
+                    masks,
+                    bit,
+                )
+                literals = ()
+        for literal in literals:
+            _mark(_literal_find(literal), text, starts, masks, bit)
+        if prefilter.pattern is not None:
+            _mark(_regex_find(prefilter.pattern), self.text, self.starts, masks, bit)
+        if prefilter.non_ascii and not self.text.isascii():
+            for i, t in enumerate(self.texts):
+                if not t.isascii():
+                    masks[i] |= bit
+
+    def mark_json(self, bit: int, masks: List[int]) -> None:
+        """Set ``bit`` for every text that may be a JSON document."""
+        if _JSON_FIRST.match(self.text):
+            masks[0] |= bit
+
+        def find(text: str, pos: int) -> int:
+            # ``pos`` starts a text; its separator is the character before
+            m = _JSON_START.search(text, max(pos - 1, 0))
+            return -1 if m is None else m.start() + 1
+
+        _mark(find, self.text, self.starts, masks, bit)
+
+
+def _starts(texts: List[str]) -> Any:
+    return array("q", accumulate((len(t) + 1 for t in texts[:-1]), initial=0))
+
+
+def _literal_find(literal: str) -> Callable[[str, int], int]:
+    def find(text: str, pos: int) -> int:
+        return text.find(literal, pos)
+
+    return find
+
+
+def _regex_find(pattern: "re.Pattern[str]") -> Callable[[str, int], int]:
+    def find(text: str, pos: int) -> int:
+        m = pattern.search(text, pos)
+        return -1 if m is None else m.start()
+
+    return find
+
+
+def _mark(
+    find: Callable[[str, int], int],
+    text: str,
+    starts: Any,
+    masks: List[int],
+    bit: int,
+) -> None:
+    # One hit per text is enough: after a hit, resume at the next text
+    count = len(starts)
+    pos = 0
+    while True:
+        at = find(text, pos)
+        if at < 0:
+            return
+        i = bisect_right(starts, at) - 1
+        masks[i] |= bit
+        i += 1
+        if i == count:
+            return
+        pos = starts[i]
+
+
+def _json_miss(fn: Check) -> Check | None:
+    """What `fn` returns on text that is not JSON, if `fn` is the JSON guard.
+
+    Registry severity overrides around the guard are re-applied.
+    """
+    floors: List[Severity] = []
+    inner: Any = fn
+    while inner is not guard_json:
+        floor = getattr(inner, "severity_floor", None)
+        inner = getattr(inner, "__wrapped__", None)
+        if floor is None or inner is None:
+            return None
+        floors.append(floor)
+
+    def invalid_json(text: str) -> Detection:
+        return Detection(False, ["invalid_json"], "block")
+
+    miss: Check = invalid_json
+    if floors:
+        from .registry import _wrap_with_severity
+
+        for floor in reversed(floors):
+            miss = _wrap_with_severity(span_detector_name(fn), miss, floor)
+    # Stats and traces report the detector, not the stand-in
+    miss.detector_name = span_detector_name(fn)  # type: ignore[attr-defined]
+    return miss
+
+
+def scan_batch(
+    texts: Iterable[str],
+    detectors: Sequence[Check],
+    stats: "DetectorStats | None" = None,
+    time_budget_ms: float | None = None,
+) -> List[Detection]:
+    """`_detect_resolved` on each text, prefiltered over the whole batch."""
+    texts = list(texts)
+    if not texts:
+        return []
+    buffer = _Buffer(texts)
+    if buffer.text.count(SEPARATOR) != len(texts) - 1:
+        return [_detect_resolved(t, detectors, stats, time_budget_ms) for t in texts]
+    masks = [0] * len(texts)
+    always = 0
+    misses: Dict[int, Check] = {}
+    for d, fn in enumerate(detectors):
+        bit = 1 << d
+        miss = _json_miss(fn)
+        if miss is not None:
+            misses[d] = miss
+            buffer.mark_json(bit, masks)
+            continue
+        prefilter = prefilter_of(fn)
+        if prefilter is None:
+            always |= bit
+        else:
+            buffer.mark(prefilter, bit, masks)
+            if stats is not None:
+                hits = sum(1 for mask in masks if mask & bit)
+                stats.record_skip(fn, len(texts) - hits)
+
+    # Without stats or tracing, a text that only gets stand-ins has the same
+    # result as any other text with its mask; it is worked out once
+    plain = stats is None and tracing._TRACER is None
+    subsets: Dict[int, Tuple[Check, ...]] = {}
+    fixed: Dict[int, Detection | None] = {}
+    results = []
+    for text, mask in zip(texts, masks):
+        mask |= always
+        subset = subsets.get(mask)
+        if subset is None:
+            subset = subsets[mask] = _subset(detectors, mask, misses)
+            if plain and not mask:
+                fixed[mask] = _detect_resolved("", subset, None, time_budget_ms)
+        res = fixed.get(mask)
+        if res is not None:
+            results.append(_copy(res))
+        else:
+            results.append(_detect_resolved(text, subset, stats, time_budget_ms))
+    return results
+
+
+def _subset(
+    detectors: Sequence[Check], mask: int, misses: Dict[int, Check]
+) -> Tuple[Check, ...]:
+    """The detectors a text with ``mask`` runs, in order."""
+    subset = []
+    for d, fn in enumerate(detectors):
+        if mask >> d & 1:
+            subset.append(fn)
+        elif d in misses:
+            subset.append(misses[d])
+    return tuple(subset)
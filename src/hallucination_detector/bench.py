@@ -0,0 +1,414 @@
+"""Benchmark suite behind ``hd bench``.
+
+Every benchmark runs a callable over a fixed-seed corpus for at least
+``min_time`` seconds, timing each call, and reports throughput (ops/sec and
+items/sec) plus p50/p95/p99 latency. Results are plain JSON so runs from
+different versions can be compared with ``hd bench --compare old.json``.
+
+The ``threads.N`` benchmarks split the corpus over N threads sharing one
+`Pipeline`; items/sec across N shows how detection scales with threads. On a
+regular build the GIL serialises the detectors, so it stays flat; on a
+free-threaded build (``python3.13t``) it should grow with N. The report's
+``meta.gil_enabled`` says which kind of run it was.
+
+``shm.pickle.N`` and ``shm.shared.N`` send an N-record batch to a process
+pool, as pickled chunks and through `sharedbatch.run_shared`. They take far
+longer than the rest of the suite, so they run only when ``only`` selects
+them (``hd bench --only shm``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import random
+import sys
+import sysconfig
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Sequence
+
+from . import registry
+from .bytesinput import detect_bytes
+from .cli import _package_version
+from .detector import (
+    Detection,
+    InvalidSchema,
+    SchemaValidationUnavailable,
+    detect_batch,
+    detect_text,
+    load_custom_rules,
+    make_schema_guard,
+)
+from .pipeline import Pipeline
+from .sharedbatch import _chunk_size, run_shared
+from .stats import percentile
+
+DEFAULT_SEED = 1234
+DEFAULT_BATCH_SIZES = (1, 16, 256)
+DEFAULT_THREAD_COUNTS = (1, 2, 4)
+DEFAULT_SHM_RECORDS = 100_000
+# Benchmarks left out of a run unless ``only`` selects them
+_OPT_IN = ("shm.",)
+
+_WORDS = (
+    "the model said that results were stable across runs and the answer is "
+    "based on the provided context while users asked about pricing and "
+    "availability in several regions"
+).split()
+_KEYWORDS = ("definitely", "certainly", "clearly", "obviously", "fact")
+_CITES = ("https://example.com/a", "doi.org/10.1000/182", "http://example.org")
+
+BENCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "confidence": {"type": "number"},
+    },
+    "required": ["answer"],
+}
+
+
+@dataclass
+class BenchResult:
+    name: str
+    calls: int
+    items: int
+    total_s: float
+    ops_per_sec: float
+    items_per_sec: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+
+
+def make_corpus(size: int = 500, seed: int = DEFAULT_SEED) -> List[str]:
+    """Deterministic mix of JSON and prose with keywords, numbers and links."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(_WORDS, k=rng.randint(5, 60))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(_KEYWORDS))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), f"{rng.randint(1, 99)}%")
+        if rng.random() < 0.2:
+            words.append(rng.choice(_CITES))
+        sentence = " ".join(words)
+        if rng.random() < 0.5:
+            corpus.append(json.dumps({"answer": sentence, "confidence": rng.random()}))
+        else:
+            corpus.append(sentence)
+    return corpus
+
+
+def make_chat_corpus(size: int = 500, seed: int = DEFAULT_SEED) -> List[str]:
+    """Short plain-prose replies; one in twenty has a keyword or a number."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = rng.choices(_WORDS, k=rng.randint(3, 25))
+        if rng.random() < 0.05:
+            words.insert(0, rng.choice(_KEYWORDS))
+        if rng.random() < 0.05:
+            words.append(f"{rng.randint(1, 99)}%")
+        corpus.append(" ".join(words).capitalize() + ".")
+    return corpus
+
+
+def make_rules(count: int, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        a, b = rng.sample(_WORDS, 2)
+        rules.append(
+            {
+                "pattern": rf"\b{a}\b.*\b{b}\b",
+                "reason": f"rule_{i}",
+                "severity": rng.choice(["info", "warn"]),
+                "require_citation": rng.random() < 0.5,
+            }
+        )
+    return {"rules": rules}
+
+
+def make_pathological(
+    size: int = 20, seed: int = DEFAULT_SEED, words: int = 2000
+) -> List[str]:
+    """Adversarial texts (see ``corpus._pathological``) for worst-case timing."""
+    from .corpus import _pathological
+
+    rng = random.Random(seed)
+    return [_pathological(rng, words) for _ in range(size)]
+
+
+def gil_enabled() -> bool:
+    """False only on a free-threaded build running with the GIL disabled."""
+    check = getattr(sys, "_is_gil_enabled", None)
+    return True if check is None else bool(check())
+
+
+def measure(
+    name: str,
+    fn: Callable[[Any], Any],
+    inputs: Sequence[Any],
+    *,
+    items_per_call: int = 1,
+    min_time: float = 0.2,
+    max_calls: int = 1_000_000,
+) -> BenchResult:
+    """Call ``fn`` over ``inputs`` (cycling) for at least ``min_time`` seconds."""
+    clock = time.perf_counter_ns
+    for value in inputs[: min(len(inputs), 10)]:  # warm caches / lazy compiles
+        fn(value)
+    samples: List[int] = []
+    append = samples.append
+    n = len(inputs)
+    deadline = time.perf_counter() + min_time
+    i = 0
+    while i < max_calls and (i < n or time.perf_counter() < deadline):
+        value = inputs[i % n]
+        t0 = clock()
+        fn(value)
+        append(clock() - t0)
+        i += 1
+    total_s = sum(samples) / 1e9
+    samples.sort()
+    calls = len(samples)
+    return BenchResult(
+        name=name,
+        calls=calls,
+        items=calls * items_per_call,
+        total_s=round(total_s, 6),
+        ops_per_sec=round(calls / total_s, 2) if total_s else 0.0,
+        items_per_sec=round(calls * items_per_call / total_s, 2) if total_s else 0.0,
+        p50_us=round(percentile(samples, 50) / 1000.0, 3),
+        p95_us=round(percentile(samples, 95) / 1000.0, 3),
+        p99_us=round(percentile(samples, 99) / 1000.0, 3),
+    )
+
+
+def _run_pickled(pipeline: Pipeline, texts: List[str]) -> List[Detection]:
+    return pipeline.run_batch(texts)
+
+
+def _benchmarks(
+    corpus: List[str],
+    batch_sizes: Sequence[int],
+    rule_count: int,
+    seed: int,
+    min_time: float,
+    thread_counts: Sequence[int] = DEFAULT_THREAD_COUNTS,
+    shm_records: int = DEFAULT_SHM_RECORDS,
+) -> Dict[str, Callable[[], BenchResult | None]]:
+    def run(
+        name: str, fn: Callable[[Any], Any], inputs: Sequence[Any], per_call: int = 1
+    ) -> BenchResult:
+        return measure(name, fn, inputs, items_per_call=per_call, min_time=min_time)
+
+    def schema_bench() -> BenchResult | None:
+        try:
+            guard = make_schema_guard(BENCH_SCHEMA)
+        except (SchemaValidationUnavailable, InvalidSchema):
+            return None
+        return run("schema_guard", guard, corpus)
+
+    def rules_bench(name: str, inputs: Sequence[str]) -> BenchResult:
+        fd, path = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(make_rules(rule_count, seed), f)
+            rules = load_custom_rules(path)
+        finally:
+            os.unlink(path)
+
+        def detect(text: str) -> Detection:
+            return detect_text(text, checks=[], custom_rules=rules)
+
+        return run(name, detect, inputs)
+
+    def threads_bench(name: str, count: int) -> BenchResult:
+        # One call runs the whole corpus, a slice per thread
+        shared = Pipeline()
+        slices = [corpus[i::count] for i in range(count)]
+
+        def detect_slice(texts: List[str]) -> None:
+            for text in texts:
+                shared.run(text)
+
+        with ThreadPoolExecutor(count) as pool:
+
+            def detect_all(_: Any) -> None:
+                for future in [pool.submit(detect_slice, s) for s in slices]:
+                    future.result()
+
+            return run(name, detect_all, [None], len(corpus))
+
+    def shm_bench(name: str, shared: bool) -> BenchResult:
+        records = make_corpus(shm_records, seed)
+        size = _chunk_size(len(records))
+        pipeline = Pipeline()
+        with ProcessPoolExecutor() as pool:
+
+            def pickled(texts: List[str]) -> List[Detection]:
+                chunks = [texts[i : i + size] for i in range(0, len(texts), size)]
+                futures = [pool.submit(_run_pickled, pipeline, c) for c in chunks]
+                return [res for future in futures for res in future.result()]
+
+            def through_shm(texts: List[str]) -> List[Detection]:
+                return run_shared(pipeline, texts, pool, chunk_size=size)
+
+            fn = through_shm if shared else pickled
+            return run(name, fn, [records], len(records))
+
+    cases: Dict[str, Callable[[], BenchResult | None]] = {}
+    builtins = registry._builtin_detectors()
+    for name in registry._BUILTIN_ORDER:
+        cases[f"guard.{name}"] = partial(run, f"guard.{name}", builtins[name], corpus)
+    cases["detect_text"] = partial(run, "detect_text", detect_text, corpus)
+    for size in batch_sizes:
+        batches = [corpus[i : i + size] for i in range(0, len(corpus) - size + 1, size)]
+        if not batches:
+            batches = [(corpus * (size // len(corpus) + 1))[:size]]
+        name = f"detect_batch.{size}"
+        cases[name] = partial(run, name, detect_batch, batches, size)
+
+    # Whole-batch prefiltering against the same pipeline run text by text
+    size = max(batch_sizes, default=1)
+    chat = make_chat_corpus(max(len(corpus), size), seed)
+    chat_batches = [chat[i : i + size] for i in range(0, len(chat) - size + 1, size)]
+    pipeline = Pipeline()
+    for suffix, scan in (("run_batch", False), ("batch_scan", True)):
+        name = f"chat.{suffix}.{size}"
+        run_chat = partial(pipeline.run_batch, batch_scan=scan)
+        cases[name] = partial(run, name, run_chat, chat_batches, size)
+
+    for count in thread_counts:
+        name = f"threads.{count}"
+        cases[name] = partial(threads_bench, name, count)
+
+    for suffix, shared in (("pickle", False), ("shared", True)):
+        name = f"shm.{suffix}.{shm_records}"
+        cases[name] = partial(shm_bench, name, shared)
+
+    # The same corpus as UTF-8, as an ingestion layer would hold it
+    encoded = [text.encode("utf-8") for text in corpus]
+
+    def decode_then_detect(data: bytes) -> Detection:
+        return detect_text(data.decode("utf-8"))
+
+    cases["bytes.decode_then_detect"] = partial(
+        run, "bytes.decode_then_detect", decode_then_detect, encoded
+    )
+    cases["bytes.detect_bytes"] = partial(
+        run, "bytes.detect_bytes", detect_bytes, encoded
+    )
+    cases["schema_guard"] = schema_bench
+    name = f"custom_rules.{rule_count}"
+    cases[name] = partial(rules_bench, name, corpus)
+
+    # Worst-case inputs: these used to take minutes per text
+    hostile = make_pathological(seed=seed)
+    cases["pathological.logical_fallacies"] = partial(
+        run,
+        "pathological.logical_fallacies",
+        builtins["logical_fallacies"],
+        hostile,
+    )
+    cases["pathological.default_checks"] = partial(
+        run, "pathological.default_checks", detect_text, hostile
+    )
+    name = f"pathological.custom_rules.{rule_count}"
+    cases[name] = partial(rules_bench, name, hostile)
+    return cases
+
+
+def run_benchmarks(
+    *,
+    seed: int = DEFAULT_SEED,
+    corpus_size: int = 500,
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    rule_count: int = 100,
+    min_time: float = 0.2,
+    only: Sequence[str] | None = None,
+    thread_counts: Sequence[int] = DEFAULT_THREAD_COUNTS,
+    shm_records: int = DEFAULT_SHM_RECORDS,
+) -> Dict[str, Any]:
+    """Run the suite and return a JSON-serialisable report.
+
+    ``only`` keeps benchmarks whose name contains any of the given substrings;
+    the ``shm.*`` benchmarks run only when it is given.
+    """
+    corpus = make_corpus(corpus_size, seed)
+    results: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    cases = _benchmarks(
+        corpus, batch_sizes, rule_count, seed, min_time, thread_counts, shm_records
+    )
+    for name, case in cases.items():
+        if only and not any(sel in name for sel in only):
+            continue
+        if not only and name.startswith(_OPT_IN):
+            continue
+        res = case()
+        if res is None:
+            skipped.append(name)
+        else:
+            results.append(asdict(res))
+    return {
+        "meta": {
+            "package_version": _package_version(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "free_threaded_build": bool(sysconfig.get_config_var("Py_GIL_DISABLED")),
+            "gil_enabled": gil_enabled(),
+            "seed": seed,
+            "corpus_size": corpus_size,
+            "min_time_s": min_time,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-benchmark throughput ratios (current / baseline) for shared names."""
+    old = {r["name"]: r for r in baseline.get("results", [])}
+    rows = []
+    for r in current.get("results", []):
+        b = old.get(r["name"])
+        if b is None or not b["ops_per_sec"]:
+            continue
+        rows.append(
+            {
+                "name": r["name"],
+                "baseline_ops_per_sec": b["ops_per_sec"],
+                "ops_per_sec": r["ops_per_sec"],
+                "speedup": round(r["ops_per_sec"] / b["ops_per_sec"], 3),
+                "p99_us_delta": round(r["p99_us"] - b["p99_us"], 3),
+            }
+        )
+    return rows
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    header = f"{'benchmark':<24}{'ops/s':>14}{'items/s':>14}"
+    header += f"{'p50 us':>11}{'p95 us':>11}{'p99 us':>11}"
+    lines = [header]
+    for r in report["results"]:
+        lines.append(
+            f"{r['name']:<24}{r['ops_per_sec']:>14,.0f}{r['items_per_sec']:>14,.0f}"
+            f"{r['p50_us']:>11.1f}{r['p95_us']:>11.1f}{r['p99_us']:>11.1f}"
+        )
+    for name in report.get("skipped", []):
+        lines.append(f"{name:<24}{'skipped (dependency not installed)':>50}")
+    if any(r["name"].startswith("threads.") for r in report["results"]):
+        gil = "enabled" if report["meta"].get("gil_enabled", True) else "disabled"
+        lines.append(f"threads.* ran with the GIL {gil}")
+    return "\n".join(lines)
@@ -0,0 +1,242 @@
+"""Detection on UTF-8 bytes.
+
+`detect_bytes` (and `Pipeline.run_bytes`) accept ``bytes``, ``bytearray`` or
+``memoryview`` and return exactly what `detect_text` returns for the decoded
+text. Invalid UTF-8 is replaced rather than rejected.
+
+Most model output is plain ASCII, and on ASCII input a pattern means the
+same thing on bytes as on text. Such input is decoded lazily (for ASCII a
+plain copy) and the work that is cheaper on bytes is done on the buffer:
+
+- the JSON guard rejects input that cannot be a JSON document from its
+  first and last non-blank bytes, and parses only plausible documents;
+- custom rules whose pattern has a bytes equivalent (ASCII, no text-only
+  escapes) search the buffer before looking at the text.
+
+The prefilters (see ``prefilter.py``) look at the text, as for `detect_text`:
+substring search is faster on ``str`` than on ``bytes``. Skipped detectors
+are counted in `DetectorStats` the same way. Other detectors get the text.
+Input with non-ASCII bytes, or with the separators ``\\x1c``-``\\x1f``
+(whitespace to ``\\s`` on text only), is decoded and run through
+`detect_text` unchanged.
+
+User detectors can opt in by setting a ``bytes_check`` attribute: a callable
+taking ASCII ``bytes`` or ``bytearray`` and returning the same `Detection` the
+detector would return for the decoded text.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import TYPE_CHECKING, Any, Callable, Dict, Sequence, Tuple, Union, cast
+
+from .detector import (
+    Detection,
+    _detect_resolved,
+    _gates,
+    _resolve_detectors,
+    guard_json,
+)
+from .prefilter import Gate, TextFacts
+from .tracing import span_detector_name
+
+if TYPE_CHECKING:
+    from .stats import DetectorStats
+
+BytesLike = Union[bytes, bytearray, memoryview]
+Check = Callable[[str], Detection]
+
+# Separators that text-mode ``\s`` matches and bytes-mode ``\s`` does not
+_SEPARATORS = b"\x1c\x1d\x1e\x1f"
+
+
+class _Input:
+    """An ASCII buffer, with its text and `TextFacts` made on first use."""
+
+    __slots__ = ("data", "_text", "_facts")
+
+    def __init__(self, data: Any) -> None:
+        self.data = data
+        self._text: str | None = None
+        self._facts: TextFacts | None = None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = str(self.data, "ascii")
+        return self._text
+
+    def facts(self) -> TextFacts:
+        if self._facts is None:
+            self._facts = TextFacts(self.text())
+        return self._facts
+
+
+InputCheck = Callable[[_Input], Detection]
+
+_JSON_BLANK = b" \t\n\r"
+# Last non-blank byte a JSON document can have, by its first one
+_JSON_ENDS: Dict[int, bytes] = {
+    ord("{"): b"}",
+    ord("["): b"]",
+    ord('"'): b'"',
+    ord("t"): b"e",
+    ord("f"): b"e",
+    ord("n"): b"l",
+    ord("N"): b"N",  # NaN
+    ord("I"): b"y",  # Infinity
+    ord("-"): b"0123456789y",
+    **{digit: b"0123456789" for digit in b"0123456789"},
+}
+
+
+def json_plausible(data: Any) -> bool:
+    """False when ``data`` cannot be a JSON document, from its two ends.
+
+    Looks at the first and last bytes that are not JSON whitespace only, so
+    prose is rejected without decoding or parsing it.
+    """
+    start, end = 0, len(data) - 1
+    while start <= end and data[start] in _JSON_BLANK:
+        start += 1
+    while end > start and data[end] in _JSON_BLANK:
+        end -= 1
+    if start > end:
+        return False
+    ends = _JSON_ENDS.get(data[start])
+    return ends is not None and data[end] in ends
+
+
+def _json(inp: _Input) -> Detection:
+    if not json_plausible(inp.data):
+        return Detection(False, ["invalid_json"], "block")
+    return guard_json(inp.text())
+
+
+_BUILTIN_BYTES: Dict[Check, InputCheck] = {guard_json: _json}
+
+
+def _input_check(fn: Check) -> InputCheck | None:
+    """How to run `fn` on an ASCII `_Input` without text, if possible.
+
+    Severity overrides built by the registry are re-applied; other wrappers
+    may change what the detector does, so they get text.
+    """
+    inner = getattr(fn, "__wrapped__", None)
+    if inner is not None:
+        floor = getattr(fn, "severity_floor", None)
+        base = _input_check(inner) if floor is not None else None
+        if base is None:
+            return None
+        from .registry import _wrap_with_severity
+
+        # The wrapper only looks at results, so it works on any input type
+        wrap: Any = _wrap_with_severity
+        return cast(InputCheck, wrap(span_detector_name(fn), base, floor))
+    builtin = _BUILTIN_BYTES.get(fn)
+    if builtin is not None:
+        return builtin
+    check = getattr(fn, "bytes_check", None)
+    if not callable(check):
+        return None
+
+    def run(inp: _Input) -> Detection:
+        return check(inp.data)  # type: ignore[no-any-return]
+
+    return run
+
+
+def _adapt(fn: Check) -> InputCheck:
+    check = _input_check(fn)
+    if check is None:
+
+        def run(inp: _Input) -> Detection:
+            return fn(inp.text())
+
+    else:
+        bound = check
+
+        def run(inp: _Input) -> Detection:
+            return bound(inp)
+
+    # Stats and traces report the detector, not the adapter
+    run.detector_name = span_detector_name(fn)  # type: ignore[attr-defined]
+    return run
+
+
+def _input_gate(gate: Gate) -> Gate:
+    # `_detect_resolved` hands gates the facts of what the detectors run on,
+    # here an `_Input`; the prefilter looks at its text
+    def admits(facts: TextFacts) -> bool:
+        inp: Any = facts.text
+        return gate(inp.facts())
+
+    return admits
+
+
+Plan = Tuple[Tuple[InputCheck, ...], Tuple["Gate | None", ...] | None]
+
+
+@functools.lru_cache(maxsize=256)
+def _plan(detectors: Tuple[Check, ...]) -> Plan:
+    """``detectors`` adapted to `_Input`, with their prefilter checks."""
+    found = _gates(detectors)
+    if found is not None:
+        found = tuple(_input_gate(g) if g is not None else None for g in found)
+    return tuple(_adapt(fn) for fn in detectors), found
+
+
+def _ascii_buffer(data: BytesLike) -> Any:
+    """``data`` as ASCII ``bytes`` or ``bytearray``, or None if it is not."""
+    if isinstance(data, memoryview):
+        obj = data.obj
+        if (
+            isinstance(obj, (bytes, bytearray))
+            and data.contiguous
+            and data.nbytes == len(obj)
+        ):
+            data = obj
+        else:
+            data = data.tobytes()  # a slice: copied once, still not decoded
+    if not data.isascii():
+        return None
+    if len(data.translate(None, _SEPARATORS)) != len(data):
+        return None
+    return data
+
+
+def _detect_bytes_resolved(
+    data: BytesLike,
+    detectors: Sequence[Check],
+    stats: "DetectorStats | None",
+    time_budget_ms: float | None = None,
+    gates: Sequence[Gate | None] | None = None,
+) -> Detection:
+    """`detect_bytes` over an already resolved detector list.
+
+    ``gates`` are the prefilter checks of ``detectors``, if already known.
+    """
+    buf = _ascii_buffer(data)
+    if buf is None:
+        text = str(data, "utf-8", "replace")
+        if gates is None:
+            gates = _gates(detectors)
+        return _detect_resolved(text, detectors, stats, time_budget_ms, gates)
+    plan, input_gates = _plan(tuple(detectors))
+    inp: Any = _Input(buf)
+    return _detect_resolved(inp, plan, stats, time_budget_ms, input_gates)  # type: ignore[arg-type]
+
+
+def detect_bytes(
+    data: BytesLike,
+    checks: Sequence[Check] | None = None,
+    skip_json: bool = False,
+    custom_rules: Sequence[Check] | None = None,
+    stats: "DetectorStats | None" = None,
+    time_budget_ms: float | None = None,
+) -> Detection:
+    """`detect_text` on UTF-8 ``data``, decoding only where a detector needs it."""
+    detectors = _resolve_detectors(checks, skip_json, custom_rules)
+    return _detect_bytes_resolved(data, detectors, stats, time_budget_ms)
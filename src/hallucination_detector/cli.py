@@ -1,11 +1,11 @@
 import argparse
-import importlib.metadata
 import json
+import os
 import sys
-from typing import Dict, List, Optional, cast
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, cast
 
-from . import registry
 from .detector import (
+    Detection,
     InvalidSchema,
     SchemaValidationUnavailable,
     Severity,
@@ -13,6 +13,10 @@ from .detector import (
     make_schema_guard,
 )
 
+if TYPE_CHECKING:
+    from .server import DetectionService
+    from .stats import DetectorStats
+
 
 def _read_input(text: Optional[str], file: Optional[str]) -> str:
     if file:
@@ -69,40 +73,59 @@ def _parse_severity_overrides(pairs: Optional[List[str]]) -> Dict[str, str]:
     return out
 
 
-def main():
+def _package_version() -> str:
+    import importlib.metadata
+
     try:
-        version = importlib.metadata.version("hallucination-detector")
+        return importlib.metadata.version("hallucination-detector")
     except importlib.metadata.PackageNotFoundError:
-        version = "0.0.1"  # Fallback for development
+        return "0.0.1"  # Fallback for development
 
-    p = argparse.ArgumentParser(prog="hd", description="Hallucination Detector CLI")
-    p.add_argument("--version", action="version", version=f"hd {version}")
-    sub = p.add_subparsers(dest="cmd")
 
-    d = sub.add_parser("detect", help="Detect issues in a text blob")
-    d.add_argument("--text", help="Text to check (often JSON)")
-    d.add_argument("--file", help="File path to read (use '-' for stdin)")
-    d.add_argument(
+class _PipelineConfigError(Exception):
+    """Raised when pipeline flags cannot be turned into checks.
+
+    ``payload`` is the JSON object `hd detect` prints and ``code`` its exit code.
+    """
+
+    def __init__(self, payload: Dict[str, Any], code: int) -> None:
+        super().__init__(payload["reasons"][0])
+        self.payload = payload
+        self.code = code
+
+
+_SCHEMA_UNAVAILABLE = {
+    "ok": False,
+    "reasons": ["schema_validation_unavailable"],
+    "severity": "warn",
+}
+_INVALID_SCHEMA = {"ok": False, "reasons": ["invalid_schema"], "severity": "block"}
+_UNSAFE_PATTERN = {"ok": False, "reasons": ["unsafe_pattern"], "severity": "block"}
+
+
+def _add_pipeline_args(parser: argparse.ArgumentParser) -> None:
+    """Flags shared by every command that builds a detection pipeline."""
+    parser.add_argument(
         "--schema",
         help="JSON Schema file path (enables schema validation)",
     )
-    d.add_argument(
+    parser.add_argument(
         "--schema-severity",
         choices=["warn", "block"],
         default="block",
         help="Severity when schema validation fails",
     )
-    d.add_argument(
+    parser.add_argument(
         "--include",
         action="append",
         help="Comma-separated detector names to include (order respected)",
     )
-    d.add_argument(
+    parser.add_argument(
         "--exclude",
         action="append",
         help="Comma-separated detector names to exclude",
     )
-    d.add_argument(
+    parser.add_argument(
         "--severity",
         dest="severity_overrides",
         action="append",
@@ -111,115 +134,676 @@ def main():
             "'name=warn|block' (repeatable or comma-separated)"
         ),
     )
-    d.add_argument("--pretty", action="store_true", help="Pretty-print JSON output")
-    d.add_argument(
+    parser.add_argument(
         "--skip-json", action="store_true", help="Skip JSON validation (for raw text)"
     )
+    parser.add_argument("--rules", help="Path to YAML/JSON file with custom rules")
+    parser.add_argument(
+        "--unsafe-patterns",
+        choices=["warn", "reject", "allow"],
+        default="warn",
+        help="What to do with --rules patterns that may backtrack "
+        "catastrophically (nested or overlapping quantifiers)",
+    )
+    parser.add_argument(
+        "--time-budget-ms",
+        type=float,
+        help="Skip the remaining detectors once a text has used this much time "
+        "and report time_budget_exceeded",
+    )
+
+
+def _load_rules(args: argparse.Namespace) -> Optional[List[Callable[[str], Detection]]]:
+    if not args.rules:
+        return None
+    from hallucination_detector.detector import load_custom_rules
+    from hallucination_detector.redos import UnsafePattern
+
+    try:
+        return load_custom_rules(args.rules, unsafe_patterns=args.unsafe_patterns)
+    except UnsafePattern as e:
+        print(f"hd: {e}", file=sys.stderr)
+        raise _PipelineConfigError(_UNSAFE_PATTERN, 2)
+
+
+def _build_checks(
+    args: argparse.Namespace,
+) -> Optional[List[Callable[[str], Detection]]]:
+    """Resolve schema/registry flags into checks (``None`` means defaults)."""
+    # If schema is provided, we prioritize schema validation
+    # and ignore registry flags
+    if args.schema:
+        if not _jsonschema_available():
+            raise _PipelineConfigError(_SCHEMA_UNAVAILABLE, 1)
+        try:
+            with open(args.schema, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+        except Exception:
+            raise _PipelineConfigError(_INVALID_SCHEMA, 2)
+        try:
+            schema_guard = make_schema_guard(
+                schema, severity=args.schema_severity  # type: ignore[arg-type]
+            )
+        except SchemaValidationUnavailable:
+            raise _PipelineConfigError(_SCHEMA_UNAVAILABLE, 1)
+        except InvalidSchema:
+            raise _PipelineConfigError(_INVALID_SCHEMA, 2)
+        return [schema_guard]
+
+    # Build checks from registry based on CLI flags if any were provided
+    include = _split_csv(getattr(args, "include", None))
+    exclude = _split_csv(getattr(args, "exclude", None))
+    sev_map = _parse_severity_overrides(getattr(args, "severity_overrides", None))
+    if not (include or exclude or sev_map):
+        return None
+    # Cast CLI-parsed strings into the Severity literal type mapping
+    sev_map_typed = cast(Dict[str, Severity], sev_map)
+    from . import registry
+
+    return registry.build_checks(
+        include=include or None,
+        exclude=exclude or None,
+        severity_overrides=sev_map_typed or None,
+    )
+
+
+class _LazyVersionAction(argparse.Action):
+    """Like argparse's ``version`` action, but only resolves it when used.
+
+    Looking up package metadata costs more than the rest of CLI startup.
+    """
+
+    def __init__(self, option_strings: List[str], dest: str, **kwargs: Any) -> None:
+        kwargs.setdefault("nargs", 0)
+        kwargs.setdefault("default", argparse.SUPPRESS)
+        kwargs.setdefault("help", "show program's version number and exit")
+        super().__init__(option_strings, dest, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(f"hd {_package_version()}")
+        parser.exit()
+
+
+class _HelpFormatter(argparse.HelpFormatter):
+    """HelpFormatter that sizes itself without importing `shutil`.
+
+    argparse builds a formatter for every `add_argument` call, and the default
+    one imports `shutil` (and its compression modules) to read the terminal
+    width, which is a noticeable share of CLI startup.
+    """
+
+    def __init__(self, prog: str, *args: Any, **kwargs: Any) -> None:
+        if kwargs.get("width") is None and len(args) < 3:
+            kwargs["width"] = _terminal_columns() - 2
+        super().__init__(prog, *args, **kwargs)
+
+
+def _terminal_columns() -> int:
+    import os
+
+    try:
+        return int(os.environ["COLUMNS"])
+    except (KeyError, ValueError):
+        pass
+    stdout = sys.__stdout__
+    if stdout is None:
+        return 80
+    try:
+        return os.get_terminal_size(stdout.fileno()).columns
+    except (ValueError, OSError):
+        return 80
+
+
+def _make_service(args: argparse.Namespace, **options: Any) -> "DetectionService":
+    """Build the warm pipeline for long-running modes, or exit like `detect`."""
+    from .server import DetectionService
+
+    try:
+        checks = _build_checks(args)
+        custom_rules = _load_rules(args)
+    except _PipelineConfigError as e:
+        print(json.dumps(e.payload), flush=True)
+        raise SystemExit(e.code)
+    return DetectionService(
+        checks,
+        args.skip_json,
+        custom_rules,
+        rules_path=args.rules,
+        reload_interval=args.rules_reload_interval,
+        unsafe_patterns=args.unsafe_patterns,
+        time_budget_ms=args.time_budget_ms,
+        max_input_bytes=args.max_input_bytes,
+        max_input_policy=args.max_input_policy,
+        max_request_bytes=args.max_request_bytes,
+        dedup=args.dedup,
+        **options,
+    )
+
+
+def _add_reload_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--rules-reload-interval",
+        type=float,
+        default=1.0,
+        help="Check the --rules file for changes this often, in seconds, and "
+        "swap in the new rules without a restart (0 disables)",
+    )
+
+
+def _size_arg(value: str) -> int:
+    from .corpus import parse_size
+
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _add_input_limit_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-input-bytes",
+        type=_size_arg,
+        help="Largest input scanned in full, e.g. 64MB (default: no limit)",
+    )
+    parser.add_argument(
+        "--max-input-policy",
+        choices=["reject", "truncate", "sample"],
+        default="reject",
+        help="For larger inputs: block them with input_too_large, scan only "
+        "the start, or scan evenly spaced slices",
+    )
+
+
+def _add_dedup_arg(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Detect identical texts of a batch once and copy the result",
+    )
+
+
+def _add_request_limit_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-request-bytes",
+        type=_size_arg,
+        help="Refuse request bodies larger than this without reading them",
+    )
+
+
+def _large_input_file(args: argparse.Namespace) -> Optional[str]:
+    """The file to scan in bounded memory, if ``detect`` should do so."""
+    path: Optional[str] = args.file
+    if args.large and (not path or path == "-"):
+        detail = "--large needs --file PATH"
+        print(json.dumps({"error": "invalid_option", "detail": detail}), flush=True)
+        raise SystemExit(2)
+    if not path or path == "-" or args.batch:
+        return None
+    if args.large:
+        return path
+    limit = args.max_input_bytes
+    if limit is not None and os.path.getsize(path) > limit:
+        return path  # never read an oversized file whole
+    return None
+
+
+def _new_stats() -> "DetectorStats":
+    from .stats import DetectorStats
+
+    return DetectorStats()
+
+
+def _serve(args: argparse.Namespace) -> None:
+    from .server import make_server, serve
+
+    service = _make_service(
+        args,
+        batch_window_ms=args.batch_window_ms,
+        max_batch_size=args.max_batch_size,
+        adaptive_batching=args.adaptive_batching,
+        stats=_new_stats() if args.metrics else None,
+    )
+    server = make_server(
+        service,
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+        verbose=args.verbose,
+    )
+    if args.workers > 0:
+        from .prefork import PreforkServer
+
+        PreforkServer(server, args.workers, health_timeout=args.health_timeout).run()
+    else:
+        serve(server)
+    raise SystemExit(0)
+
+
+def _worker(args: argparse.Namespace) -> None:
+    from .worker import run_worker
+
+    service = _make_service(args)
+    run_worker(service, sys.stdin.buffer, sys.stdout.buffer, args.framing)
+    raise SystemExit(0)
+
+
+def _bench(args: argparse.Namespace) -> None:
+    from .bench import compare, format_table, run_benchmarks
+
+    report = run_benchmarks(
+        seed=args.seed,
+        corpus_size=args.corpus_size,
+        batch_sizes=[int(x) for x in _split_csv([args.batch_sizes])],
+        rule_count=args.rules,
+        min_time=args.min_time,
+        only=args.only,
+        thread_counts=[int(x) for x in _split_csv([args.threads])],
+        shm_records=args.shm_records,
+    )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(json.load(f), report)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_table(report))
+        for row in report.get("comparison", []):
+            print(f"{row['name']:<24} x{row['speedup']:.2f} vs baseline")
+    raise SystemExit(0)
+
+
+def _gen_corpus(args: argparse.Namespace) -> None:
+    from .corpus import CorpusSpec, generate_corpus, parse_size
+
+    try:
+        spec = CorpusSpec(
+            size_bytes=parse_size(args.size),
+            seed=args.seed,
+            format=args.format,
+            payload=args.payload,
+            invalid_json_ratio=args.invalid_json_ratio,
+            keyword_density=args.keyword_density,
+            numeric_ratio=args.numeric_ratio,
+            citation_ratio=args.citation_ratio,
+            pathological_ratio=args.pathological_ratio,
+            length_dist=args.length_dist,
+            mean_words=args.mean_words,
+        )
+    except ValueError as e:
+        print(json.dumps({"error": "invalid_option", "detail": str(e)}), flush=True)
+        raise SystemExit(2)
+    if args.out in (None, "-"):
+        summary = generate_corpus(spec, sys.stdout)
+        sys.stdout.flush()
+    else:
+        with open(args.out, "w", encoding="utf-8", newline="\n") as f:
+            summary = generate_corpus(spec, f)
+    print(
+        f"hd gen-corpus: wrote {summary['records']} records, "
+        f"{summary['bytes']} bytes",
+        file=sys.stderr,
+    )
+    raise SystemExit(0)
+
+
+def _write_result_log(path: str, write: Callable[[Any], None]) -> None:
+    """Append to the result log at ``path`` (``detect --out``) with ``write``."""
+    from .resultlog import ResultLogError, ResultLogWriter
+
+    try:
+        with ResultLogWriter(path) as log:
+            write(log)
+    except (OSError, ResultLogError) as e:
+        print(json.dumps({"error": "invalid_result_log", "detail": str(e)}), flush=True)
+        raise SystemExit(2)
+
+
+def _report(args: argparse.Namespace) -> None:
+    from .report import ReportAccumulator
+    from .resultlog import ResultLog, ResultLogError
+
+    reasons = _split_csv(args.reason)
+    filters: Dict[str, Any] = {
+        "min_severity": args.min_severity,
+        "reasons": set(reasons) if reasons else None,
+        "failed": args.failed,
+        "key_prefix": args.key_prefix,
+    }
+    acc = ReportAccumulator()
+    for path in args.logs:
+        try:
+            with ResultLog(path) as log:
+                if args.records:
+                    for record in log.records(**filters):
+                        line = {
+                            **record.result.__dict__,
+                            "key": record.key,
+                            "length": record.length,
+                        }
+                        print(json.dumps(line, separators=(",", ":")))
+                else:
+                    log.aggregate(acc, **filters)
+        except (OSError, ResultLogError) as e:
+            print(json.dumps({"error": "invalid_result_log", "detail": str(e)}))
+            raise SystemExit(2)
+    if not args.records:
+        acc.write(sys.stdout, args.format, details=args.details)
+        print()
+    raise SystemExit(0)
+
+
+def main():
+    p = argparse.ArgumentParser(
+        prog="hd",
+        description="Hallucination Detector CLI",
+        formatter_class=_HelpFormatter,
+    )
+    p.add_argument("--version", action=_LazyVersionAction)
+    sub = p.add_subparsers(dest="cmd")
+
+    d = sub.add_parser(
+        "detect",
+        help="Detect issues in a text blob",
+        formatter_class=_HelpFormatter,
+    )
+    d.add_argument("--text", help="Text to check (often JSON)")
+    d.add_argument("--file", help="File path to read (use '-' for stdin)")
+    _add_pipeline_args(d)
+    d.add_argument("--pretty", action="store_true", help="Pretty-print JSON output")
     d.add_argument(
         "--verbose", action="store_true", help="Include verbose details in output"
     )
-    d.add_argument("--rules", help="Path to YAML/JSON file with custom rules")
     d.add_argument(
         "--batch",
         action="store_true",
         help="Process batch from stdin",
     )
+    _add_dedup_arg(d)
+    d.add_argument(
+        "--batch-scan",
+        action="store_true",
+        help="Prefilter the whole batch at once and run detectors only on "
+        "texts that might fail them (faster for many short texts)",
+    )
     d.add_argument(
         "--report",
         choices=["json", "html"],
         help="Generate summary report",
     )
+    d.add_argument(
+        "--out",
+        help="Append results (with text lengths) to this binary result log "
+        "instead of printing them; summarise it later with `hd report`",
+    )
+    d.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print per-detector timing and hit counts to stderr",
+    )
+    d.add_argument(
+        "--large",
+        action="store_true",
+        help="Memory-map --file and scan it in overlapping windows (bounded "
+        "memory; whole-text checks such as JSON run only on small files)",
+    )
+    _add_input_limit_args(d)
+    d.add_argument(
+        "--metrics-file",
+        help="Atomically write Prometheus text-format metrics to this file "
+        "(for the node exporter textfile collector)",
+    )
+
+    sv = sub.add_parser(
+        "serve",
+        help="Run a local detection server with a warm pipeline",
+        formatter_class=_HelpFormatter,
+    )
+    sv.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    sv.add_argument("--port", type=int, default=8765, help="TCP port (0 = any)")
+    sv.add_argument(
+        "--unix-socket", help="Listen on this Unix socket path instead of TCP"
+    )
+    sv.add_argument("--verbose", action="store_true", help="Log every request")
+    sv.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Collect per-detector counters and latency histograms for "
+        "GET /metrics (add ?format=prometheus for Prometheus text format)",
+    )
+    sv.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Pre-fork this many worker processes sharing the compiled pipeline "
+        "and listening socket (0 = serve from this process)",
+    )
+    sv.add_argument(
+        "--health-timeout",
+        type=float,
+        default=10.0,
+        help="Restart a pre-forked worker after this many seconds without "
+        "a heartbeat",
+    )
+    sv.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=0.0,
+        help="Group concurrent /detect requests arriving within this window "
+        "into one batch run (0 disables micro-batching)",
+    )
+    sv.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="Dispatch a micro-batch as soon as it holds this many texts",
+    )
+    sv.add_argument(
+        "--no-adaptive-batching",
+        dest="adaptive_batching",
+        action="store_false",
+        help="Always wait for the full window, even when traffic is sequential",
+    )
+    _add_pipeline_args(sv)
+    _add_reload_args(sv)
+    _add_input_limit_args(sv)
+    _add_request_limit_args(sv)
+    _add_dedup_arg(sv)
+
+    w = sub.add_parser(
+        "worker",
+        help="Serve JSON requests over stdin/stdout with a warm pipeline",
+        formatter_class=_HelpFormatter,
+    )
+    w.add_argument(
+        "--framing",
+        choices=["ndjson", "length"],
+        default="ndjson",
+        help="Message framing: newline-delimited JSON or 4-byte big-endian "
+        "length prefix",
+    )
+    _add_pipeline_args(w)
+    _add_reload_args(w)
+    _add_input_limit_args(w)
+    _add_request_limit_args(w)
+    _add_dedup_arg(w)
+
+    b = sub.add_parser(
+        "bench",
+        help="Benchmark detectors on a fixed-seed corpus",
+        formatter_class=_HelpFormatter,
+    )
+    b.add_argument("--seed", type=int, default=1234, help="Corpus seed")
+    b.add_argument("--corpus-size", type=int, default=500, help="Texts in corpus")
+    b.add_argument(
+        "--batch-sizes",
+        default="1,16,256",
+        help="Comma-separated detect_batch sizes to benchmark",
+    )
+    b.add_argument("--rules", type=int, default=100, help="Size of the custom rule set")
+    b.add_argument(
+        "--threads",
+        default="1,2,4",
+        help="Comma-separated thread counts for the threads.* scaling benchmarks",
+    )
+    b.add_argument(
+        "--shm-records",
+        type=int,
+        default=100_000,
+        help="Batch size of the shm.* process-pool transport benchmarks "
+        "(run only when selected with --only shm)",
+    )
+    b.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimum seconds spent per benchmark",
+    )
+    b.add_argument(
+        "--only",
+        action="append",
+        help="Run benchmarks whose name contains this (repeatable)",
+    )
+    b.add_argument(
+        "--format",
+        choices=["table", "json"],
+        default="table",
+        help="Output format on stdout",
+    )
+    b.add_argument("--out", help="Also write the JSON report to this file")
+    b.add_argument(
+        "--compare",
+        help="Baseline JSON report; prints per-benchmark speedups",
+    )
+
+    rp = sub.add_parser(
+        "report",
+        help="Summarise result logs written by `hd detect --out`",
+        formatter_class=_HelpFormatter,
+    )
+    rp.add_argument("logs", nargs="+", help="Result log files")
+    rp.add_argument(
+        "--format", choices=["json", "html"], default="json", help="Report format"
+    )
+    rp.add_argument(
+        "--details",
+        action="store_true",
+        help="Add the text length histogram to the report",
+    )
+    rp.add_argument(
+        "--min-severity",
+        choices=["info", "warn", "block"],
+        help="Only count results at least this severe",
+    )
+    rp.add_argument(
+        "--reason",
+        action="append",
+        help="Only count results with this reason (repeatable, comma-separated)",
+    )
+    rp.add_argument(
+        "--failed", action="store_true", help="Only count results that are not ok"
+    )
+    rp.add_argument(
+        "--key-prefix", help="Only count records whose key starts with this"
+    )
+    rp.add_argument(
+        "--records",
+        action="store_true",
+        help="Print the matching records as JSON lines instead of a report",
+    )
+
+    g = sub.add_parser(
+        "gen-corpus",
+        help="Write a deterministic synthetic corpus for stress tests",
+        formatter_class=_HelpFormatter,
+    )
+    g.add_argument("--size", required=True, help="Target size, e.g. 512KB, 100MB, 20GB")
+    g.add_argument("--out", help="Output path (default: stdout)")
+    g.add_argument("--seed", type=int, default=0, help="Generator seed")
+    g.add_argument(
+        "--format",
+        choices=["jsonl", "text"],
+        default="jsonl",
+        help='One {"id", "text"} object per line, or one raw text per line',
+    )
+    g.add_argument(
+        "--payload",
+        choices=["json", "prose", "mixed"],
+        default="mixed",
+        help="Whether texts are JSON answers, prose, or a 50/50 mix",
+    )
+    g.add_argument(
+        "--invalid-json-ratio",
+        type=float,
+        default=0.1,
+        help="Share of JSON texts that are truncated (json and mixed payloads)",
+    )
+    g.add_argument(
+        "--keyword-density",
+        type=float,
+        default=0.01,
+        help="Probability that a word is an overconfidence keyword",
+    )
+    g.add_argument(
+        "--numeric-ratio",
+        type=float,
+        default=0.3,
+        help="Share of texts containing a year or percentage",
+    )
+    g.add_argument(
+        "--citation-ratio",
+        type=float,
+        default=0.2,
+        help="Share of texts ending with a citation link",
+    )
+    g.add_argument(
+        "--pathological-ratio",
+        type=float,
+        default=0.0,
+        help="Share of texts built to make backtracking regexes slow",
+    )
+    g.add_argument(
+        "--length-dist",
+        choices=["fixed", "uniform", "lognormal", "pareto"],
+        default="lognormal",
+        help="Distribution of text lengths",
+    )
+    g.add_argument(
+        "--mean-words", type=int, default=40, help="Mean text length in words"
+    )
 
     args = p.parse_args()
 
+    if args.cmd == "serve":
+        _serve(args)
+    if args.cmd == "worker":
+        _worker(args)
+    if args.cmd == "bench":
+        _bench(args)
+    if args.cmd == "gen-corpus":
+        _gen_corpus(args)
+    if args.cmd == "report":
+        _report(args)
+
     if args.cmd == "detect":
-        data = _read_input(args.text, args.file)
-
-        custom_rules = None
-        if args.rules:
-            from hallucination_detector.detector import load_custom_rules
-
-            custom_rules = load_custom_rules(args.rules)
-
-        checks = None
-        # If schema is provided, we prioritize schema validation
-        # and ignore registry flags
-        if args.schema:
-            if not _jsonschema_available():
-                print(
-                    json.dumps(
-                        {
-                            "ok": False,
-                            "reasons": ["schema_validation_unavailable"],
-                            "severity": "warn",
-                        }
-                    ),
-                    flush=True,
-                )
-                raise SystemExit(1)
-            try:
-                with open(args.schema, "r", encoding="utf-8") as f:
-                    schema = json.load(f)
-            except Exception:
-                print(
-                    json.dumps(
-                        {
-                            "ok": False,
-                            "reasons": ["invalid_schema"],
-                            "severity": "block",
-                        }
-                    ),
-                    flush=True,
-                )
-                raise SystemExit(2)
-            try:
-                schema_guard = make_schema_guard(
-                    schema, severity=args.schema_severity  # type: ignore[arg-type]
-                )
-                checks = [schema_guard]
-            except SchemaValidationUnavailable:
-                print(
-                    json.dumps(
-                        {
-                            "ok": False,
-                            "reasons": ["schema_validation_unavailable"],
-                            "severity": "warn",
-                        }
-                    ),
-                    flush=True,
-                )
-                raise SystemExit(1)
-            except InvalidSchema:
-                print(
-                    json.dumps(
-                        {
-                            "ok": False,
-                            "reasons": ["invalid_schema"],
-                            "severity": "block",
-                        }
-                    ),
-                    flush=True,
-                )
-                raise SystemExit(2)
-        else:
-            # Build checks from registry based on CLI flags if any were provided
-            include = _split_csv(getattr(args, "include", None))
-            exclude = _split_csv(getattr(args, "exclude", None))
-            sev_map = _parse_severity_overrides(
-                getattr(args, "severity_overrides", None)
-            )
-            if include or exclude or sev_map:
-                # Cast CLI-parsed strings into the Severity literal type mapping
-                sev_map_typed = cast(Dict[str, Severity], sev_map)
-                checks = registry.build_checks(
-                    include=include or None,
-                    exclude=exclude or None,
-                    severity_overrides=sev_map_typed or None,
-                )
+        large_file = _large_input_file(args)
+        # --batch reads its texts from stdin line by line below
+        data = ""
+        if large_file is None and not args.batch:
+            data = _read_input(args.text, args.file)
 
-        if args.batch:
-            import sys
+        try:
+            custom_rules = _load_rules(args)
+            checks = _build_checks(args)
+        except _PipelineConfigError as e:
+            print(json.dumps(e.payload), flush=True)
+            raise SystemExit(e.code)
+
+        stats = _new_stats() if args.stats or args.metrics_file else None
 
+        if args.batch:
             texts = []
             for line in sys.stdin:
                 stripped = line.strip()
@@ -227,18 +811,42 @@ def main():
                     texts.append(stripped)
             from hallucination_detector.detector import detect_batch
 
-            results = detect_batch(
-                texts,
-                checks=checks,
-                skip_json=args.skip_json,
-                custom_rules=custom_rules,
-            )
-            if args.report:
-                from hallucination_detector.detector import generate_report
+            def run_batch(kept: List[str]) -> List[Detection]:
+                return detect_batch(
+                    kept,
+                    checks=checks,
+                    skip_json=args.skip_json,
+                    custom_rules=custom_rules,
+                    stats=stats,
+                    time_budget_ms=args.time_budget_ms,
+                    batch_scan=args.batch_scan,
+                )
 
-                output = generate_report(results, args.report)
-                print(output)
+            def run_limited_batch(kept: List[str]) -> List[Detection]:
+                if args.max_input_bytes is None:
+                    return run_batch(kept)
+                from .largeinput import run_limited
+
+                return run_limited(
+                    kept, run_batch, args.max_input_bytes, args.max_input_policy
+                )
+
+            dedup = None
+            if args.dedup:
+                from .dedup import run_deduplicated
+
+                results, dedup = run_deduplicated(texts, run_limited_batch, stats)
             else:
+                results = run_limited_batch(texts)
+            if args.out:
+                _write_result_log(args.out, lambda log: log.write_all(results, texts))
+            if args.report:
+                from .report import ReportAccumulator
+
+                report = ReportAccumulator().add_all(results)
+                report.write(sys.stdout, args.report, dedup=dedup)
+                print()
+            elif not args.out:
                 payload = [r.__dict__ for r in results]
                 if args.pretty:
                     print(json.dumps(payload, indent=2))
@@ -246,23 +854,63 @@ def main():
                     print(json.dumps(payload, separators=(",", ":")))
             code = 1 if any(not r.ok for r in results) else 0
         else:
-            if checks is not None:
+            if large_file is not None:
+                from .largeinput import scan_file
+
+                res = scan_file(
+                    large_file,
+                    checks,
+                    args.skip_json,
+                    custom_rules,
+                    max_bytes=args.max_input_bytes,
+                    policy=args.max_input_policy,
+                    stats=stats,
+                )
+            elif args.max_input_bytes is not None:
+                from .largeinput import run_limited
+
+                (res,) = run_limited(
+                    [data],
+                    lambda kept: [
+                        detect_text(
+                            t,
+                            checks=checks,
+                            skip_json=args.skip_json,
+                            custom_rules=custom_rules,
+                            stats=stats,
+                            time_budget_ms=args.time_budget_ms,
+                        )
+                        for t in kept
+                    ],
+                    args.max_input_bytes,
+                    args.max_input_policy,
+                )
+            elif checks is not None:
                 res = detect_text(
                     data,
                     checks=checks,
                     skip_json=args.skip_json,
                     custom_rules=custom_rules,
+                    stats=stats,
+                    time_budget_ms=args.time_budget_ms,
                 )
             else:
                 res = detect_text(
-                    data, skip_json=args.skip_json, custom_rules=custom_rules
+                    data,
+                    skip_json=args.skip_json,
+                    custom_rules=custom_rules,
+                    stats=stats,
+                    time_budget_ms=args.time_budget_ms,
                 )
+            if args.out:
+                length = None if large_file else len(data)
+                _write_result_log(args.out, lambda log: log.write(res, length=length))
             if args.report:
                 from hallucination_detector.detector import generate_report
 
                 output = generate_report([res], args.report)
                 print(output)
-            else:
+            elif not args.out:
                 payload = res.__dict__
                 if args.pretty:
                     print(json.dumps(payload, indent=2))
@@ -279,6 +927,12 @@ def main():
                 print(f"Input length: {len(data)} characters", file=sys.stderr)
                 if not res.ok:
                     print(f"Issues detected: {', '.join(res.reasons)}", file=sys.stderr)
+        if stats is not None and args.stats:
+            print(stats.format_table(), file=sys.stderr)
+        if args.metrics_file:
+            from .metrics import render_prometheus, write_textfile
+
+            write_textfile(args.metrics_file, render_prometheus(stats))
         raise SystemExit(code)
 
     p.print_help()
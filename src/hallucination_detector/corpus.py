@@ -0,0 +1,210 @@
+"""Deterministic synthetic corpora for stress and scaling tests (``hd gen-corpus``).
+
+`generate_corpus` writes records to a stream until a byte budget is reached,
+so corpora from a few KB to tens of GB can be produced with constant memory.
+The same seed and options always produce the same bytes.
+
+Knobs (all ratios are per record, 0..1):
+
+- ``invalid_json_ratio``: share of JSON records that are deliberately broken
+  (with ``payload="json"`` or ``"mixed"``; prose records are never JSON).
+- ``keyword_density``: probability that any word is an overconfidence keyword.
+- ``numeric_ratio``: records containing years / percentages.
+- ``citation_ratio``: records ending with a citation link.
+- ``pathological_ratio``: records built to make backtracking regexes work
+  hard (long ``either ... or`` runs without a match, long digit runs, and so
+  on).
+- ``length_dist`` / ``mean_words``: record length distribution (``fixed``,
+  ``uniform``, ``lognormal`` or ``pareto``) around a mean word count.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+from dataclasses import dataclass
+from typing import IO, Callable, Dict, List
+
+FORMATS = ("jsonl", "text")
+PAYLOADS = ("json", "prose", "mixed")
+LENGTH_DISTS = ("fixed", "uniform", "lognormal", "pareto")
+
+_WORDS = (
+    "the model said that results were stable across runs and the answer is "
+    "based on the provided context while users asked about pricing support "
+    "availability latency regions customers revenue growth forecast policy "
+    "report analysis summary dataset quality accuracy baseline"
+).split()
+_KEYWORDS = (
+    "definitely",
+    "certainly",
+    "undeniably",
+    "absolutely",
+    "undoubtedly",
+    "clearly",
+    "obviously",
+)
+_CITES = (
+    "https://example.com/source",
+    "http://example.org/paper.pdf",
+    "doi.org/10.1000/182",
+)
+
+_UNITS = {"": 1, "B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes like ``512``, ``64KB``, ``1.5GB`` (binary units)."""
+    raw = value.strip().upper().replace(" ", "")
+    for unit in sorted(_UNITS, key=len, reverse=True):
+        if unit and raw.endswith(unit):
+            number = raw[: -len(unit)]
+            break
+    else:
+        unit, number = "", raw
+    try:
+        size = int(float(number) * _UNITS[unit])
+    except ValueError:
+        raise ValueError(f"invalid size: {value!r}")
+    if size <= 0:
+        raise ValueError(f"size must be positive: {value!r}")
+    return size
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    size_bytes: int
+    seed: int = 0
+    format: str = "jsonl"
+    payload: str = "mixed"
+    invalid_json_ratio: float = 0.1
+    keyword_density: float = 0.01
+    numeric_ratio: float = 0.3
+    citation_ratio: float = 0.2
+    pathological_ratio: float = 0.0
+    length_dist: str = "lognormal"
+    mean_words: int = 40
+
+    def __post_init__(self) -> None:
+        if self.format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        if self.payload not in PAYLOADS:
+            raise ValueError(f"payload must be one of {PAYLOADS}")
+        if self.length_dist not in LENGTH_DISTS:
+            raise ValueError(f"length_dist must be one of {LENGTH_DISTS}")
+        for name in (
+            "invalid_json_ratio",
+            "keyword_density",
+            "numeric_ratio",
+            "citation_ratio",
+            "pathological_ratio",
+        ):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if self.mean_words < 1:
+            raise ValueError("mean_words must be >= 1")
+
+
+def _length_sampler(spec: CorpusSpec, rng: random.Random) -> Callable[[], int]:
+    mean = spec.mean_words
+    if spec.length_dist == "fixed":
+        return lambda: mean
+    if spec.length_dist == "uniform":
+        return lambda: rng.randint(1, 2 * mean - 1) if mean > 1 else 1
+    if spec.length_dist == "lognormal":
+        sigma = 0.8
+        mu = math.log(mean) - sigma * sigma / 2
+        return lambda: max(1, int(rng.lognormvariate(mu, sigma)))
+    alpha = 1.5  # pareto: heavy tail, mean = scale * alpha / (alpha - 1)
+    scale = mean * (alpha - 1) / alpha
+    return lambda: max(1, int(scale * rng.paretovariate(alpha)))
+
+
+def _pathological(rng: random.Random, words: int) -> str:
+    n = max(words, 50)
+    kind = rng.randrange(4)
+    if kind == 0:
+        # "either ... or ... no ..." without "middle": polynomial backtracking
+        return " ".join(rng.choice(("either", "or", "no")) for _ in range(n))
+    if kind == 1:
+        # "you ... because ... you" without "are"
+        return " ".join(rng.choice(("you", "because")) for _ in range(n))
+    if kind == 2:
+        return "9" * (n * 4) + " %"  # long digit run next to a percent sign
+    return "a" * (n * 8)  # one huge token, no spaces
+
+
+def _prose(spec: CorpusSpec, rng: random.Random, words: int) -> str:
+    out = rng.choices(_WORDS, k=words)
+    density = spec.keyword_density
+    if density >= 1.0:
+        out = rng.choices(_KEYWORDS, k=words)
+    elif density > 0.0:
+        # Bernoulli(density) per word, drawn as geometric gaps between hits
+        log_miss = math.log(1.0 - density)
+        i = int(math.log(1.0 - rng.random()) / log_miss)
+        while i < words:
+            out[i] = rng.choice(_KEYWORDS)
+            i += 1 + int(math.log(1.0 - rng.random()) / log_miss)
+    if rng.random() < spec.numeric_ratio:
+        claim = (
+            f"{rng.randint(1, 99)}%"
+            if rng.random() < 0.5
+            else str(rng.randint(1990, 2030))
+        )
+        out.insert(rng.randrange(len(out) + 1), claim)
+    if rng.random() < spec.citation_ratio:
+        out.append(rng.choice(_CITES))
+    return " ".join(out)
+
+
+def _record(spec: CorpusSpec, rng: random.Random, sample_len: Callable[[], int]) -> str:
+    words = sample_len()
+    if spec.pathological_ratio and rng.random() < spec.pathological_ratio:
+        text = _pathological(rng, words)
+    else:
+        text = _prose(spec, rng, words)
+    as_json = spec.payload == "json" or (spec.payload == "mixed" and rng.random() < 0.5)
+    if not as_json:
+        return text
+    doc = json.dumps({"answer": text, "confidence": round(rng.random(), 3)})
+    if rng.random() < spec.invalid_json_ratio:
+        doc = doc[: rng.randrange(1, len(doc))]  # truncated object
+    return doc
+
+
+def generate_corpus(spec: CorpusSpec, out: IO[str]) -> Dict[str, int]:
+    """Write records to ``out`` until ``spec.size_bytes`` is reached.
+
+    ``jsonl`` writes one ``{"id": n, "text": ...}`` object per line; ``text``
+    writes one raw record per line (records never contain newlines, so
+    ``hd detect --batch`` can consume it directly).
+    Returns ``{"records": ..., "bytes": ...}``. Sizes are counted in UTF-8
+    bytes; the output is ASCII.
+    """
+    rng = random.Random(spec.seed)
+    sample_len = _length_sampler(spec, rng)
+    written = 0
+    records = 0
+    buf: List[str] = []
+    buffered = 0
+    flush_at = 1 << 20
+    while written + buffered < spec.size_bytes:
+        text = _record(spec, rng, sample_len)
+        if spec.format == "jsonl":
+            line = json.dumps({"id": records, "text": text}) + "\n"
+        else:
+            line = text + "\n"
+        buf.append(line)
+        buffered += len(line)
+        records += 1
+        if buffered >= flush_at:
+            out.write("".join(buf))
+            written += buffered
+            buf.clear()
+            buffered = 0
+    if buf:
+        out.write("".join(buf))
+        written += buffered
+    return {"records": records, "bytes": written}
@@ -0,0 +1,73 @@
+"""Opt-in deduplication of identical texts within a batch.
+
+Agent fleets send many identical outputs ("I cannot help with that", ``{}``).
+With ``dedup=True`` (`detect_batch`, `Pipeline.run_batch`, ``hd detect
+--batch --dedup``, ``hd serve/worker --dedup``) each distinct text is
+detected once and its result is copied to every position it occupies, so the
+output is the same list, in the same order, as without deduplication.
+
+Texts are compared by value through a dict (hash, then equality), so two
+different texts never share a result. Detection stats then count the
+distinct texts actually run; `DetectorStats` and ``hd detect --report``
+also report how many texts a batch had and how many were distinct.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence, Tuple
+
+from .detector import Detection
+
+if TYPE_CHECKING:
+    from .stats import DetectorStats
+
+
+def dedup_summary(texts: int, unique: int) -> Dict[str, Any]:
+    """Batch summary: texts seen, distinct texts run and the duplicate ratio."""
+    duplicates = texts - unique
+    return {
+        "texts": texts,
+        "unique": unique,
+        "duplicates": duplicates,
+        "ratio": round(duplicates / texts, 4) if texts else 0.0,
+    }
+
+
+def _copy(res: Detection) -> Detection:
+    # Callers may annotate results in place (e.g. size patches), so copies
+    # must not share the mutable parts
+    patches = dict(res.patches) if res.patches is not None else None
+    return Detection(res.ok, list(res.reasons), res.severity, patches)
+
+
+def run_deduplicated(
+    texts: Sequence[str],
+    run_batch: Callable[[List[str]], List[Detection]],
+    stats: "DetectorStats | None" = None,
+) -> Tuple[List[Detection], Dict[str, Any]]:
+    """``run_batch`` on the distinct ``texts``, fanned back out in order.
+
+    Returns the results and the `dedup_summary` of the batch, which is also
+    added to ``stats`` when given.
+    """
+    slots: Dict[str, int] = {}
+    unique: List[str] = []
+    positions = []
+    for text in texts:
+        slot = slots.get(text)
+        if slot is None:
+            slot = slots[text] = len(unique)
+            unique.append(text)
+        positions.append(slot)
+    ran = run_batch(unique)
+    used = [False] * len(ran)
+    results = []
+    for slot in positions:
+        if used[slot]:
+            results.append(_copy(ran[slot]))
+        else:
+            used[slot] = True
+            results.append(ran[slot])
+    if stats is not None:
+        stats.record_dedup(len(positions), len(unique))
+    return results, dedup_summary(len(positions), len(unique))
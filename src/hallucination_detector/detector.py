@@ -1,7 +1,26 @@
 import json
 import re
+import threading
+import time
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Literal, Sequence, Set
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from . import tracing
+
+if TYPE_CHECKING:
+    from .prefilter import Gate
+    from .stats import DetectorStats
 
 Severity = Literal["info", "warn", "block"]
 
@@ -24,8 +43,9 @@ class Detection:
 
 FACT_PATTERN = re.compile(r"\b\d{4}\b|\b\d{1,3}%(?!\w)")
 
-# Configurable list of overconfidence keywords
-CONFIDENT_KEYWORDS = [
+# Configurable overconfidence keywords. Never mutated in place: readers in
+# other threads see either the old or the new tuple, never a mix.
+CONFIDENT_KEYWORDS: Tuple[str, ...] = (
     "definitely",
     "certainly",
     "undeniably",
@@ -33,28 +53,41 @@ CONFIDENT_KEYWORDS = [
     "undoubtedly",
     "clearly",
     "obviously",
-]
+)
 
 
-def set_confident_keywords(keywords: List[str]) -> None:
-    """Set the list of keywords that trigger overconfidence detection."""
+def set_confident_keywords(keywords: Iterable[str]) -> None:
+    """Set the keywords that trigger overconfidence detection.
+
+    The keywords are copied, so later changes to ``keywords`` have no effect.
+    """
     global CONFIDENT_KEYWORDS
-    CONFIDENT_KEYWORDS = keywords
+    CONFIDENT_KEYWORDS = tuple(keywords)
 
 
-# Cache compiled JSON Schema validators by canonicalized schema string
+# Cache compiled JSON Schema validators by canonicalized schema string. The
+# lock covers the dict and the counters; validators are compiled outside it.
 _VALIDATOR_CACHE: Dict[str, Any] = {}
+_VALIDATOR_CACHE_COUNTS = {"hits": 0, "misses": 0}
+_VALIDATOR_LOCK = threading.Lock()
 
 
 def clear_schema_cache() -> None:
-    _VALIDATOR_CACHE.clear()
+    with _VALIDATOR_LOCK:
+        _VALIDATOR_CACHE.clear()
+
+
+def schema_cache_info() -> Dict[str, int]:
+    """Hits, misses (since start) and current size of the validator cache."""
+    with _VALIDATOR_LOCK:
+        return {**_VALIDATOR_CACHE_COUNTS, "size": len(_VALIDATOR_CACHE)}
 
 
 def guard_json(text: str) -> Detection:
     try:
         json.loads(text)
         return Detection(True, [])
-    except json.JSONDecodeError:
+    except ValueError:  # also raised for integers too long to convert
         return Detection(False, ["invalid_json"], "block")
 
 
@@ -71,37 +104,51 @@ def guard_overconfidence(text: str) -> Detection:
     return Detection(True, [])
 
 
+# Simple check for obvious contradictions like "A > B and B > A"
+_CONTRADICTIONS = (
+    r"A > B and B > A",
+    r"true and false",
+    r"yes and no",
+    r"positive and negative",
+    r"good and bad",
+    r"all and some",
+    r"none and some",
+    r"always and sometimes",
+    r"never and occasionally",
+    # Add more as needed
+)
+
+
 def guard_contradictions(text: str) -> Detection:
-    # Simple check for obvious contradictions like "A > B and B > A"
-    contradictions = [
-        r"A > B and B > A",
-        r"true and false",
-        r"yes and no",
-        r"positive and negative",
-        r"good and bad",
-        r"all and some",
-        r"none and some",
-        r"always and sometimes",
-        r"never and occasionally",
-        # Add more as needed
-    ]
-    for pattern in contradictions:
+    for pattern in _CONTRADICTIONS:
         if re.search(pattern, text, re.IGNORECASE):
             return Detection(False, ["possible_contradiction"], "warn")
     return Detection(True, [])
 
 
+# Simple checks for common logical fallacies
+_FALLACIES = (
+    r"everyone (knows|thinks|agrees)",  # Ad populum
+    r"obviously|clearly|of course",  # Appeal to obviousness
+    r"either.*or.*no.*middle",  # False dichotomy
+    r"you.*because.*you.*are",  # Ad hominem
+    # Add more as needed
+)
+_FALLACY_SEARCHES: Tuple[Callable[[str], Any], ...] = ()
+
+
 def guard_logical_fallacies(text: str) -> Detection:
-    # Simple check for common logical fallacies
-    fallacies = [
-        r"everyone (knows|thinks|agrees)",  # Ad populum
-        r"obviously|clearly|of course",  # Appeal to obviousness
-        r"either.*or.*no.*middle",  # False dichotomy
-        r"you.*because.*you.*are",  # Ad hominem
-        # Add more as needed
-    ]
-    for pattern in fallacies:
-        if re.search(pattern, text, re.IGNORECASE):
+    global _FALLACY_SEARCHES
+    searches = _FALLACY_SEARCHES
+    if not searches:
+        # The ``.*`` chains backtrack polynomially in the regex engine (a
+        # few KB of "either or no ..." took over a minute); compile_search
+        # runs them as linear literal scans instead.
+        from .redos import compile_search
+
+        searches = _FALLACY_SEARCHES = tuple(compile_search(p) for p in _FALLACIES)
+    for search in searches:
+        if search(text):
             return Detection(False, ["possible_logical_fallacy"], "info")
     return Detection(True, [])
 
@@ -158,22 +205,28 @@ def make_schema_guard(
     except TypeError:
         key = None
 
-    validator = None
-    if key is not None and key in _VALIDATOR_CACHE:
-        validator = _VALIDATOR_CACHE[key]
-    else:
-        try:
-            Draft202012Validator.check_schema(schema)
-            validator = Draft202012Validator(schema)
-        except Exception as e:
-            raise InvalidSchema("Provided schema is not a valid JSON Schema") from e
+    with _VALIDATOR_LOCK:
+        validator = _VALIDATOR_CACHE.get(key) if key is not None else None
+        _VALIDATOR_CACHE_COUNTS["misses" if validator is None else "hits"] += 1
+    if validator is None:
+        attributes = {"schema_size": len(key) if key is not None else 0}
+        with tracing.span(tracing.get_tracer(), "hd.schema_compile", attributes) as out:
+            try:
+                Draft202012Validator.check_schema(schema)
+                validator = Draft202012Validator(schema)
+            except Exception as e:
+                out["valid"] = False
+                raise InvalidSchema("Provided schema is not a valid JSON Schema") from e
+            out["valid"] = True
         if key is not None:
-            _VALIDATOR_CACHE[key] = validator
+            # Another thread may have compiled the same schema meanwhile
+            with _VALIDATOR_LOCK:
+                validator = _VALIDATOR_CACHE.setdefault(key, validator)
 
     def guard(text: str) -> Detection:
         try:
             data = json.loads(text)
-        except json.JSONDecodeError:
+        except ValueError:
             return Detection(False, ["invalid_json"], "block")
         try:
             validator.validate(data)  # type: ignore[union-attr]
@@ -186,34 +239,116 @@ def make_schema_guard(
             patches = {"missing_fields": missing} if missing else None
             return Detection(False, ["schema_validation_failed"], sev, patches)
 
+    guard.detector_name = "schema"  # type: ignore[attr-defined]
     return guard
 
 
-def load_custom_rules(rules_file: str) -> List[Callable[[str], Detection]]:
-    """Load custom rules from YAML or JSON file."""
-    try:
-        import yaml
-    except ImportError:
-        yaml = None
-
-    with open(rules_file, "r", encoding="utf-8") as f:
-        if rules_file.endswith(".yaml") or rules_file.endswith(".yml"):
-            if yaml is None:
-                raise ImportError("PyYAML required for YAML rules")
-            rules = yaml.safe_load(f)
+_DEFAULT_CHECKS: Sequence[Callable[[str], Detection]] = (
+    guard_json,
+    guard_overconfidence,
+    guard_contradictions,
+    guard_logical_fallacies,
+    guard_fact_check,
+    guard_numeric_claims,
+)
+
+
+UnsafePatternPolicy = Literal["warn", "reject", "allow"]
+
+
+def load_custom_rules(
+    rules_file: str,
+    *,
+    cache: bool = True,
+    unsafe_patterns: UnsafePatternPolicy = "warn",
+) -> List[Callable[[str], Detection]]:
+    """Load custom rules from YAML or JSON file.
+
+    With ``cache`` the compiled rule set is reused while the file is
+    unchanged, and parsed YAML is cached on disk by content hash (see
+    ``rulecache.py``).
+
+    Patterns that may backtrack catastrophically (see ``redos.py``) emit a
+    `RegexRiskWarning` by default; ``unsafe_patterns="reject"`` raises
+    `UnsafePattern` instead and ``"allow"`` accepts them silently.
+    """
+    if unsafe_patterns not in ("warn", "reject", "allow"):
+        raise ValueError(f"unknown unsafe_patterns policy: {unsafe_patterns!r}")
+    attributes = {"path": rules_file}
+    with tracing.span(tracing.get_tracer(), "hd.load_custom_rules", attributes) as out:
+        if cache:
+            from .rulecache import load_cached
+
+            detectors = load_cached(rules_file)
         else:
-            rules = json.load(f)
+            with open(rules_file, "rb") as f:
+                detectors = _compile_rules(_parse_rules(f.read(), rules_file))
+        out["rules"] = len(detectors)
+    if unsafe_patterns != "allow":
+        _check_patterns(detectors, rules_file, unsafe_patterns)
+    return detectors
+
+
+def _check_patterns(
+    detectors: Sequence[Callable[[str], Detection]],
+    rules_file: str,
+    policy: UnsafePatternPolicy,
+) -> None:
+    import warnings
+
+    from .redos import RegexRiskWarning, UnsafePattern
+
+    for detector in detectors:
+        risks = getattr(detector, "regex_risks", ())
+        if not risks:
+            continue
+        message = (
+            f"{rules_file}: pattern {detector.pattern!r} of "  # type: ignore[attr-defined]
+            f"{detector.detector_name!r} may backtrack "  # type: ignore[attr-defined]
+            f"catastrophically ({', '.join(risks)})"
+        )
+        if policy == "reject":
+            raise UnsafePattern(message)
+        warnings.warn(message, RegexRiskWarning, stacklevel=3)
+
+
+def _is_yaml(rules_file: str) -> bool:
+    return rules_file.endswith(".yaml") or rules_file.endswith(".yml")
+
+
+def _parse_rules(data: bytes, rules_file: str) -> List[Dict[str, Any]]:
+    """Decode a rule file's contents into its list of rule mappings."""
+    if _is_yaml(rules_file):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML required for YAML rules")
+        rules = yaml.safe_load(data)
+    else:
+        rules = json.loads(data)
+    return list(rules.get("rules", []))
+
+
+def _compile_rules(rules: Sequence[Dict[str, Any]]) -> List[Callable[[str], Detection]]:
+    from .prefilter import literal_prefilter
+    from .redos import analyze_pattern, compile_bytes_search, compile_search
 
     detectors = []
-    for rule in rules.get("rules", []):
+    for rule in rules:
         pattern = rule.get("pattern", "")
         severity = rule.get("severity", "warn")
         reason = rule.get("reason", "custom_rule_violation")
         require_citation = rule.get("require_citation", False)
 
         def make_detector(pat=pattern, sev=severity, rea=reason, cit=require_citation):
+            # Compiled on first use: large rule sets would otherwise overflow
+            # the `re` module cache and recompile on every search.
+            compiled: List[Callable[[str], Any]] = []
+
             def detector(text: str) -> Detection:
-                if re.search(pat, text, re.IGNORECASE):
+                if not compiled:
+                    compiled.append(compile_search(pat, re.IGNORECASE))
+                if compiled[0](text):
                     cites = "http://" in text or "https://" in text or "doi.org" in text
                     if not cit or not cites:
                         return Detection(False, [rea], sev)
@@ -221,46 +356,147 @@ def load_custom_rules(rules_file: str) -> List[Callable[[str], Detection]]:
 
             return detector
 
-        detectors.append(make_detector())
+        def make_bytes_check(fn: Callable[[str], Detection], pat: str = pattern) -> Any:
+            searches: List[Callable[[Any], Any] | None] = []
+
+            # ASCII input only (see bytesinput.py); matches are re-checked on
+            # text so the result is exactly the detector's
+            def bytes_check(data: Any) -> Detection:
+                if not searches:
+                    searches.append(compile_bytes_search(pat, re.IGNORECASE))
+                search = searches[0]
+                if search is None or search(data):
+                    return fn(str(data, "ascii"))
+                return Detection(True, [])
+
+            return bytes_check
+
+        detector = make_detector()
+        detector.bytes_check = make_bytes_check(detector)  # type: ignore[attr-defined]
+        # Citation-gated rules stay pending while streaming (see streaming.py)
+        mode = "citation" if require_citation else "window"
+        detector.stream_mode = mode  # type: ignore[attr-defined]
+        detector.detector_name = f"rule:{reason}"  # type: ignore[attr-defined]
+        detector.pattern = pattern  # type: ignore[attr-defined]
+        try:
+            risks = analyze_pattern(pattern, re.IGNORECASE)
+        except re.error:
+            risks = []  # reported when the rule first runs, as before
+        detector.regex_risks = tuple(risks)  # type: ignore[attr-defined]
+        detector.prefilter = literal_prefilter([pattern])  # type: ignore[attr-defined]
+        detectors.append(detector)
 
     return detectors
 
 
+_SEVERITY_ORDER: Dict[str, int] = {"info": 0, "warn": 1, "block": 2}
+
+
+def _resolve_detectors(
+    checks: Sequence[Callable[[str], Detection]] | None,
+    skip_json: bool,
+    custom_rules: Sequence[Callable[[str], Detection]] | None,
+) -> List[Callable[[str], Detection]]:
+    """Return the detectors `detect_text` runs for the given arguments."""
+    if checks is not None:
+        detectors = list(checks)
+    elif skip_json:
+        detectors = list(_DEFAULT_CHECKS[1:])
+    else:
+        detectors = list(_DEFAULT_CHECKS)
+    if custom_rules:
+        detectors.extend(custom_rules)
+    return detectors
+
+
 def detect_text(
     text: str,
     checks: Sequence[Callable[[str], Detection]] | None = None,
     skip_json: bool = False,
     custom_rules: Sequence[Callable[[str], Detection]] | None = None,
+    stats: "DetectorStats | None" = None,
+    time_budget_ms: float | None = None,
+) -> Detection:
+    """Run the detectors on ``text`` and merge their results.
+
+    With ``time_budget_ms``, detectors that would start after the budget is
+    spent are skipped and the result reports ``time_budget_exceeded`` with
+    their names in ``patches["skipped_detectors"]``. A detector that is
+    already running is never interrupted (Python's `re` cannot be).
+    """
+    detectors = _resolve_detectors(checks, skip_json, custom_rules)
+    return _detect_resolved(text, detectors, stats, time_budget_ms, _gates(detectors))
+
+
+def _gates(detectors: Sequence[Callable[[str], Detection]]) -> Any:
+    """Prefilter checks for ``detectors`` (see ``prefilter.py``)."""
+    from .prefilter import gates
+
+    return gates(tuple(detectors))
+
+
+def _detect_resolved(
+    text: str,
+    detectors: Sequence[Callable[[str], Detection]],
+    stats: "DetectorStats | None",
+    time_budget_ms: float | None = None,
+    gates: "Sequence[Gate | None] | None" = None,
+) -> Detection:
+    """`detect_text` over an already resolved detector list.
+
+    ``gates`` holds one prefilter check (or None) per detector; detectors
+    whose check rejects the text are skipped.
+    """
+    tracer = tracing._TRACER
+    if tracer is None:
+        return _run_detectors(text, detectors, stats, None, time_budget_ms, gates)
+    attributes = {"input_size": len(text)}
+    with tracing.span(tracer, "hd.detect_text", attributes) as outcome:
+        result = _run_detectors(text, detectors, stats, tracer, time_budget_ms, gates)
+        outcome.update(tracing.detection_outcome(result))
+    return result
+
+
+def _run_detectors(
+    text: str,
+    detectors: Sequence[Callable[[str], Detection]],
+    stats: "DetectorStats | None",
+    tracer: "tracing.Tracer | None",
+    time_budget_ms: float | None = None,
+    gates: "Sequence[Gate | None] | None" = None,
 ) -> Detection:
-    detectors = (
-        list(checks)
-        if checks is not None
-        else [
-            guard_json,
-            guard_overconfidence,
-            guard_contradictions,
-            guard_logical_fallacies,
-            guard_fact_check,
-            guard_numeric_claims,
-        ]
-    )
-    if custom_rules:
-        detectors.extend(custom_rules)  # type: ignore
-    if skip_json and checks is None:
-        detectors = [
-            guard_overconfidence,
-            guard_contradictions,
-            guard_logical_fallacies,
-            guard_fact_check,
-            guard_numeric_claims,
-        ] + (list(custom_rules) if custom_rules else [])
     reasons: List[str] = []
     seen: Set[str] = set()
     severity: Severity = "info"
     patches: Dict[str, Any] = {}
-    order = {"info": 0, "warn": 1, "block": 2}
-    for check in detectors:
-        r = check(text)
+    order = _SEVERITY_ORDER
+    deadline = None
+    if time_budget_ms is not None:
+        deadline = time.perf_counter() + time_budget_ms / 1000.0
+    facts = None
+    for i, check in enumerate(detectors):
+        if deadline is not None and i and time.perf_counter() > deadline:
+            reasons.append("time_budget_exceeded")
+            if order[severity] < order["warn"]:
+                severity = "warn"
+            patches["skipped_detectors"] = [
+                tracing.span_detector_name(d) for d in detectors[i:]
+            ]
+            break
+        gate = gates[i] if gates is not None else None
+        if gate is not None:
+            if facts is None:
+                from .prefilter import TextFacts
+
+                facts = TextFacts(text)
+            if not gate(facts):
+                if stats is not None:
+                    stats.record_skip(check)
+                continue
+        if stats is None and tracer is None:
+            r = check(text)
+        else:
+            r = _run_instrumented(check, text, stats, tracer)
         if not r.ok:
             for reason in r.reasons:
                 if reason not in seen:
@@ -270,12 +506,40 @@ def detect_text(
                 severity = r.severity
             if r.patches:
                 patches.update(r.patches)
-    return Detection(
+    result = Detection(
         ok=(len(reasons) == 0),
         reasons=reasons,
         severity=severity,
         patches=patches or None,
     )
+    if stats is not None:
+        stats.record_result(result)
+    return result
+
+
+def _run_instrumented(
+    check: Callable[[str], Detection],
+    text: str,
+    stats: "DetectorStats | None",
+    tracer: "tracing.Tracer | None",
+) -> Detection:
+    if tracer is None:
+        t0 = time.perf_counter()
+        r = check(text)
+        if stats is not None:
+            stats.record(check, time.perf_counter() - t0, r)
+        return r
+    attributes = {
+        "detector": tracing.span_detector_name(check),
+        "input_size": len(text),
+    }
+    with tracing.span(tracer, "hd.detector", attributes) as outcome:
+        t0 = time.perf_counter()
+        r = check(text)
+        if stats is not None:
+            stats.record(check, time.perf_counter() - t0, r)
+        outcome.update(tracing.detection_outcome(r))
+    return r
 
 
 def detect_batch(
@@ -283,42 +547,100 @@ def detect_batch(
     checks: Sequence[Callable[[str], Detection]] | None = None,
     skip_json: bool = False,
     custom_rules: Sequence[Callable[[str], Detection]] | None = None,
+    stats: "DetectorStats | None" = None,
+    time_budget_ms: float | None = None,
+    dedup: bool = False,
+    batch_scan: bool = False,
+) -> List[Detection]:
+    """Detect on a batch of texts with parallelism.
+
+    With ``dedup`` each distinct text is detected once (see ``dedup.py``).
+    With ``batch_scan`` the batch is prefiltered as a whole and run on the
+    calling thread instead (see ``batchscan.py``).
+    """
+    if dedup:
+        from .dedup import run_deduplicated
+
+        def run_unique(unique: List[str]) -> List[Detection]:
+            return detect_batch(
+                unique,
+                checks,
+                skip_json,
+                custom_rules,
+                stats,
+                time_budget_ms,
+                batch_scan=batch_scan,
+            )
+
+        return run_deduplicated(texts, run_unique, stats)[0]
+    args = (texts, checks, skip_json, custom_rules, stats, time_budget_ms)
+    run = _scan_batch if batch_scan else _detect_batch
+    tracer = tracing._TRACER
+    if tracer is None:
+        return run(*args)
+    with tracing.span(tracer, "hd.detect_batch", {"batch_size": len(texts)}) as out:
+        results = run(*args)
+        out["texts"] = len(results)
+        out["failed"] = sum(1 for r in results if not r.ok)
+    return results
+
+
+def _scan_batch(
+    texts: List[str],
+    checks: Sequence[Callable[[str], Detection]] | None,
+    skip_json: bool,
+    custom_rules: Sequence[Callable[[str], Detection]] | None,
+    stats: "DetectorStats | None",
+    time_budget_ms: float | None,
+) -> List[Detection]:
+    from .batchscan import scan_batch
+
+    detectors = _resolve_detectors(checks, skip_json, custom_rules)
+    return scan_batch(texts, detectors, stats, time_budget_ms)
+
+
+def _detect_batch(
+    texts: List[str],
+    checks: Sequence[Callable[[str], Detection]] | None,
+    skip_json: bool,
+    custom_rules: Sequence[Callable[[str], Detection]] | None,
+    stats: "DetectorStats | None",
+    time_budget_ms: float | None,
 ) -> List[Detection]:
-    """Detect on a batch of texts with parallelism."""
+    import contextvars
     from concurrent.futures import ThreadPoolExecutor
 
     with ThreadPoolExecutor() as executor:
+        # Each text runs in a copy of the caller's context so tracers that
+        # track the current span in a context variable can parent per-text
+        # spans under the batch span.
         futures = [
-            executor.submit(detect_text, t, checks, skip_json, custom_rules)
+            executor.submit(
+                contextvars.copy_context().run,
+                detect_text,
+                t,
+                checks,
+                skip_json,
+                custom_rules,
+                stats,
+                time_budget_ms,
+            )
             for t in texts
         ]
         return [f.result() for f in futures]
 
 
-def generate_report(results: List[Detection], format: str = "json") -> str:
-    """Generate a summary report."""
-    total = len(results)
-    ok = sum(1 for r in results if r.ok)
-    warns = sum(1 for r in results if not r.ok and r.severity == "warn")
-    blocks = sum(1 for r in results if r.severity == "block")
-    reasons = {}
-    for r in results:
-        for reason in r.reasons:
-            reasons[reason] = reasons.get(reason, 0) + 1
-
-    report = {
-        "total_texts": total,
-        "ok": ok,
-        "warn": warns,
-        "block": blocks,
-        "reason_counts": reasons,
-    }
-    if format == "html":
-        html = (
-            f"<h1>Report</h1><p>Total {total}, OK {ok}, Warn {warns}, Block {blocks}</p><ul>"
-        )
-        for reason, count in reasons.items():
-            html += f"<li>{reason}: {count}</li>"
-        html += "</ul>"
-        return html
-    return json.dumps(report, indent=2)
+def generate_report(
+    results: List[Detection],
+    format: str = "json",
+    *,
+    dedup: Dict[str, Any] | None = None,
+) -> str:
+    """Generate a summary report.
+
+    ``dedup`` is the `dedup.dedup_summary` of a deduplicated batch. For
+    results that do not fit in memory, feed a `report.ReportAccumulator`.
+    """
+    from .report import ReportAccumulator
+
+    return ReportAccumulator().add_all(results).render(format, dedup=dedup)
@@ -0,0 +1,395 @@
+"""Bounded-memory detection for very large inputs.
+
+`scan_file` memory-maps a file and runs the detectors over overlapping
+windows of decoded text (``hd detect --large``), so memory use stays around
+one window however large the file is. Detectors run according to their
+stream mode (see ``streaming.py``):
+
+- window detectors (contradictions, fallacies, plain custom rules) run on
+  every window. Windows start and end at whitespace where possible and
+  overlap by ``overlap`` characters, so a match shorter than that is found
+  wherever it occurs;
+- citation-gated detectors note whether their claim appears in any window
+  and fire at the end only if no citation marker was seen anywhere;
+- whole-text detectors (JSON, schema, user detectors without a mode) run
+  only when the input fits in one window; otherwise they are skipped and
+  listed in ``patches["skipped_detectors"]``.
+
+Invalid UTF-8 is replaced rather than rejected.
+
+A max-input policy bounds the work done per input, in UTF-8 bytes:
+
+- ``reject``: larger inputs are not scanned and get reason
+  ``input_too_large`` (``block``);
+- ``truncate``: only the first ``max_bytes`` are scanned;
+- ``sample``: ``max_bytes`` are scanned as evenly spaced slices that include
+  the start and the end of the input.
+
+Truncated and sampled results carry ``patches["input_bytes"]`` and
+``patches["scanned_bytes"]``. `limit_text` applies the same policy to text
+already in memory (``hd serve`` / ``hd worker``).
+"""
+
+from __future__ import annotations
+
+import codecs
+import mmap
+import os
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Sequence,
+    Tuple,
+)
+
+from .detector import (
+    _SEVERITY_ORDER,
+    Detection,
+    Severity,
+    _detect_resolved,
+    _resolve_detectors,
+    _run_instrumented,
+)
+from .streaming import has_citation, stream_mode
+from .tracing import span_detector_name
+
+if TYPE_CHECKING:
+    from .stats import DetectorStats
+
+MaxInputPolicy = Literal["reject", "truncate", "sample"]
+POLICIES = ("reject", "truncate", "sample")
+
+DEFAULT_WINDOW = 1 << 20  # bytes decoded per window
+DEFAULT_OVERLAP = 4096  # characters re-scanned at each window boundary
+# Upper bound on slices taken by the ``sample`` policy
+_MAX_SAMPLES = 64
+
+_SPACE = re.compile(r"\s")
+
+Check = Callable[[str], Detection]
+
+
+def too_large(size: int, limit: int) -> Detection:
+    """The result reported for inputs refused by the ``reject`` policy."""
+    return Detection(
+        False,
+        ["input_too_large"],
+        "block",
+        {"input_bytes": size, "max_input_bytes": limit},
+    )
+
+
+def _check_policy(policy: str) -> None:
+    if policy not in POLICIES:
+        raise ValueError(f"unknown max-input policy: {policy!r}")
+
+
+def sample_spans(size: int, budget: int, slice_size: int) -> List[Tuple[int, int]]:
+    """Evenly spaced ``(start, end)`` byte ranges totalling about ``budget``."""
+    if size <= budget:
+        return [(0, size)]
+    count = max(1, min(_MAX_SAMPLES, budget // max(1, slice_size)))
+    if count == 1:
+        return [(0, budget)]
+    length = budget // count
+    step = (size - length) / (count - 1)
+    return [(round(i * step), round(i * step) + length) for i in range(count)]
+
+
+def _spans(
+    size: int, max_bytes: int | None, policy: MaxInputPolicy, overlap: int
+) -> List[Tuple[int, int]]:
+    if max_bytes is None or size <= max_bytes:
+        return [(0, size)]
+    if policy == "truncate":
+        return [(0, max_bytes)]
+    # Slices much longer than the overlap, so most matches are not split
+    return sample_spans(size, max_bytes, 16 * overlap)
+
+
+def _decode_span(buf: Any, start: int, end: int, block: int) -> Iterator[str]:
+    """Decode ``buf[start:end]`` as UTF-8, one block at a time."""
+    # A sampled slice can start inside a multi-byte character
+    while start < end and buf[start] & 0xC0 == 0x80:
+        start += 1
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    for pos in range(start, end, block):
+        piece = decoder.decode(buf[pos : min(pos + block, end)])
+        if piece:
+            yield piece
+    # A truncated character at the end is dropped rather than replaced
+
+
+def _windows(chunks: Iterable[str], overlap: int) -> Iterator[str]:
+    """Re-chunk text into windows cut at whitespace, overlapping by ``overlap``.
+
+    Cutting at whitespace keeps ``\\b`` and similar assertions from seeing a
+    word boundary in the middle of a word at either edge of a window.
+    """
+    carry = ""
+    pending = False  # carry holds text no window has covered yet
+    for chunk in chunks:
+        buf = carry + chunk
+        cut = max(buf.rfind(" "), buf.rfind("\n"), buf.rfind("\t")) + 1
+        if len(buf) - cut > overlap:
+            cut = len(buf)  # no usable whitespace: cut anyway, memory first
+        if cut == 0:
+            carry, pending = buf, True
+            continue
+        yield buf[:cut]
+        start = max(0, cut - overlap)
+        m = _SPACE.search(buf, start, cut)
+        carry = buf[m.start() if m else start :]
+        pending = cut < len(buf)
+    if pending:
+        yield carry
+
+
+class _WindowScan:
+    """Accumulates per-detector outcomes over a sequence of windows."""
+
+    def __init__(
+        self, detectors: Sequence[Check], stats: "DetectorStats | None"
+    ) -> None:
+        self.plan = [(fn, stream_mode(fn)) for fn in detectors]
+        self.stats = stats
+        self.hits: Dict[int, Detection] = {}
+        self.cited = False
+
+    def run(self, fn: Check, text: str) -> Detection:
+        if self.stats is None:
+            return fn(text)
+        return _run_instrumented(fn, text, self.stats, None)
+
+    def feed(self, window: str) -> None:
+        if not self.cited and has_citation(window):
+            self.cited = True
+        for idx, (fn, mode) in enumerate(self.plan):
+            if mode == "end" or idx in self.hits:
+                continue
+            if mode == "citation" and self.cited:
+                continue
+            res = self.run(fn, window)
+            if not res.ok:
+                self.hits[idx] = res
+
+    def settled(self) -> bool:
+        """Nothing later in the input can change the result."""
+        if not self.cited:
+            return False
+        return all(
+            idx in self.hits
+            for idx, (_, mode) in enumerate(self.plan)
+            if mode == "window"
+        )
+
+    def result(self) -> Detection:
+        reasons: List[str] = []
+        severity: Severity = "info"
+        patches: Dict[str, Any] = {}
+        skipped = []
+        for idx, (fn, mode) in enumerate(self.plan):
+            if mode == "end":
+                skipped.append(span_detector_name(fn))
+                continue
+            r = self.hits.get(idx)
+            if r is None or (mode == "citation" and self.cited):
+                continue
+            for reason in r.reasons:
+                if reason not in reasons:
+                    reasons.append(reason)
+            if _SEVERITY_ORDER[r.severity] > _SEVERITY_ORDER[severity]:
+                severity = r.severity
+            if r.patches:
+                patches.update(r.patches)
+        if skipped:
+            patches["skipped_detectors"] = skipped
+        result = Detection(not reasons, reasons, severity, patches or None)
+        if self.stats is not None:
+            self.stats.record_result(result)
+        return result
+
+
+def scan_chunks(
+    chunks: Iterable[str],
+    detectors: Sequence[Check],
+    *,
+    overlap: int = DEFAULT_OVERLAP,
+    stats: "DetectorStats | None" = None,
+) -> Detection:
+    """Run resolved ``detectors`` over a stream of text in bounded windows."""
+    scan = _WindowScan(detectors, stats)
+    for window in _windows(chunks, overlap):
+        scan.feed(window)
+        if scan.settled():
+            break
+    return scan.result()
+
+
+def _with_size_patches(res: Detection, size: int, scanned: int) -> Detection:
+    if scanned >= size:
+        return res
+    patches = dict(res.patches or {})
+    patches["input_bytes"] = size
+    patches["scanned_bytes"] = scanned
+    return Detection(res.ok, res.reasons, res.severity, patches)
+
+
+def scan_buffer(
+    buf: Any,
+    detectors: Sequence[Check],
+    *,
+    window: int = DEFAULT_WINDOW,
+    overlap: int = DEFAULT_OVERLAP,
+    max_bytes: int | None = None,
+    policy: MaxInputPolicy = "reject",
+    stats: "DetectorStats | None" = None,
+) -> Detection:
+    """`scan_file` over any buffer of UTF-8 bytes (``bytes``, ``mmap``...)."""
+    _check_policy(policy)
+    if window <= 2 * overlap:
+        raise ValueError("window must be more than twice the overlap")
+    size = len(buf)
+    if max_bytes is not None and size > max_bytes and policy == "reject":
+        return too_large(size, max_bytes)
+    spans = _spans(size, max_bytes, policy, overlap)
+    scanned = sum(end - start for start, end in spans)
+    if scanned <= window:
+        # Fits in one window: exact, whole-text semantics
+        parts = ["".join(_decode_span(buf, start, end, window)) for start, end in spans]
+        res = _detect_resolved("\n".join(parts), detectors, stats)
+        return _with_size_patches(res, size, scanned)
+
+    def chunks() -> Iterator[str]:
+        for i, (start, end) in enumerate(spans):
+            if i:
+                yield "\n"  # keep matches from spanning two samples
+            yield from _decode_span(buf, start, end, window)
+
+    res = scan_chunks(chunks(), detectors, overlap=overlap, stats=stats)
+    return _with_size_patches(res, size, scanned)
+
+
+def scan_file(
+    path: str,
+    checks: Sequence[Check] | None = None,
+    skip_json: bool = False,
+    custom_rules: Sequence[Check] | None = None,
+    *,
+    window: int = DEFAULT_WINDOW,
+    overlap: int = DEFAULT_OVERLAP,
+    max_bytes: int | None = None,
+    policy: MaxInputPolicy = "reject",
+    stats: "DetectorStats | None" = None,
+) -> Detection:
+    """Detect on a file without reading it into memory.
+
+    Arguments mirror `detect_text`; see the module docstring for how
+    windows, ``max_bytes`` and ``policy`` behave.
+    """
+    detectors = _resolve_detectors(checks, skip_json, custom_rules)
+    return scan_path(
+        path,
+        detectors,
+        window=window,
+        overlap=overlap,
+        max_bytes=max_bytes,
+        policy=policy,
+        stats=stats,
+    )
+
+
+def scan_path(
+    path: str,
+    detectors: Sequence[Check],
+    *,
+    window: int = DEFAULT_WINDOW,
+    overlap: int = DEFAULT_OVERLAP,
+    max_bytes: int | None = None,
+    policy: MaxInputPolicy = "reject",
+    stats: "DetectorStats | None" = None,
+) -> Detection:
+    """`scan_file` with an already resolved detector list."""
+    options: Dict[str, Any] = {
+        "window": window,
+        "overlap": overlap,
+        "max_bytes": max_bytes,
+        "policy": policy,
+        "stats": stats,
+    }
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return scan_buffer(b"", detectors, **options)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return scan_buffer(mm, detectors, **options)
+
+
+def utf8_size(text: str, limit: int | None = None) -> int:
+    """UTF-8 length of ``text``, without encoding it when the answer is clear.
+
+    With ``limit``, any value above it may be returned once the text is
+    known to exceed it.
+    """
+    n = len(text)
+    if text.isascii():
+        return n
+    if limit is not None and n > limit:
+        return n  # at least one byte per character: already over
+    return len(text.encode("utf-8", "surrogatepass"))
+
+
+def limit_text(
+    text: str, max_bytes: int | None, policy: MaxInputPolicy = "reject"
+) -> Tuple[str | None, Dict[str, int] | None]:
+    """Apply the max-input policy to in-memory text.
+
+    Returns ``(text_to_scan, size_patches)``: ``text_to_scan`` is None when
+    the input is rejected, and ``size_patches`` is None when it is scanned
+    whole.
+    """
+    _check_policy(policy)
+    if max_bytes is None:
+        return text, None
+    size = utf8_size(text, max_bytes)
+    if size <= max_bytes:
+        return text, None
+    if policy == "reject":
+        return None, {"input_bytes": size, "max_input_bytes": max_bytes}
+    data = text.encode("utf-8", "surrogatepass")
+    spans = _spans(len(data), max_bytes, policy, DEFAULT_OVERLAP)
+    kept = "\n".join(
+        "".join(_decode_span(data, start, end, len(data) or 1)) for start, end in spans
+    )
+    scanned = sum(end - start for start, end in spans)
+    return kept, {"input_bytes": len(data), "scanned_bytes": scanned}
+
+
+def run_limited(
+    texts: Sequence[str],
+    run_batch: Callable[[List[str]], List[Detection]],
+    max_bytes: int | None,
+    policy: MaxInputPolicy = "reject",
+) -> List[Detection]:
+    """``run_batch(texts)`` with `limit_text` applied to every text first."""
+    limited = [limit_text(t, max_bytes, policy) for t in texts]
+    ran = iter(run_batch([t for t, _ in limited if t is not None]))
+    results = []
+    for text, sizes in limited:
+        if text is None:
+            results.append(Detection(False, ["input_too_large"], "block", sizes))
+            continue
+        res = next(ran)
+        if sizes is not None:
+            res.patches = {**(res.patches or {}), **sizes}
+        results.append(res)
+    return results
@@ -0,0 +1,171 @@
+"""Prometheus text-format metrics (standard library only).
+
+`render_prometheus` turns a `DetectorStats` collector, the schema validator
+and rule-set cache counters and (in server mode) micro-batching statistics
+into the Prometheus text exposition format, version 0.0.4. It is served by
+``hd serve --metrics`` at ``GET /metrics?format=prometheus`` and written by
+``hd detect --metrics-file`` for the node exporter textfile collector.
+
+Exported series:
+
+- ``hd_texts_total``, ``hd_results_total{severity}``,
+  ``hd_detections_total{reason}``
+- ``hd_detector_calls_total{detector}``,
+  ``hd_detector_skipped_total{detector}`` (texts ruled out by the prefilter),
+  ``hd_detector_fired_total{detector,severity}``,
+  ``hd_detector_latency_seconds{detector}`` (histogram)
+- ``hd_dedup_texts_total``, ``hd_dedup_unique_total`` (deduplicated batches)
+- ``hd_schema_cache_hits_total``, ``hd_schema_cache_misses_total``,
+  ``hd_schema_cache_size``
+- ``hd_rule_cache_hits_total``, ``hd_rule_cache_misses_total`` (rule files
+  compiled), ``hd_rule_cache_size`` (see ``rulecache.py``)
+- ``hd_batcher_batches_total``, ``hd_batcher_items_total`` (server only)
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Any, Dict, List, Mapping
+
+from .detector import schema_cache_info
+from .rulecache import rule_cache_info
+from .stats import DetectorStats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_prometheus(
+    stats: DetectorStats | None = None,
+    *,
+    batching: Mapping[str, Any] | None = None,
+) -> str:
+    """Render the available metrics in Prometheus text format."""
+    w = _Writer()
+    if stats is not None:
+        snap = stats.snapshot()
+        detectors: Dict[str, Dict[str, Any]] = snap["detectors"]
+        w.family("hd_texts_total", "counter", "Texts run through the pipeline.")
+        w.sample("hd_texts_total", snap["texts"])
+        w.family("hd_results_total", "counter", "Texts by aggregated severity.")
+        for severity, count in snap["severities"].items():
+            w.sample("hd_results_total", count, severity=severity)
+        w.family("hd_detections_total", "counter", "Aggregated reasons reported.")
+        for reason, count in sorted(snap["reasons"].items()):
+            w.sample("hd_detections_total", count, reason=reason)
+        w.family("hd_detector_calls_total", "counter", "Detector invocations.")
+        for name, d in detectors.items():
+            w.sample("hd_detector_calls_total", d["calls"], detector=name)
+        w.family(
+            "hd_detector_skipped_total",
+            "counter",
+            "Texts a detector skipped because its prefilter ruled them out.",
+        )
+        for name, d in detectors.items():
+            w.sample("hd_detector_skipped_total", d["skipped"], detector=name)
+        w.family(
+            "hd_detector_fired_total", "counter", "Detector results that were not ok."
+        )
+        for name, d in detectors.items():
+            for severity, count in d["severities"].items():
+                w.sample(
+                    "hd_detector_fired_total", count, detector=name, severity=severity
+                )
+        w.family(
+            "hd_detector_latency_seconds", "histogram", "Time spent per detector call."
+        )
+        for name, d in detectors.items():
+            for bound, count in d["latency_buckets"].items():
+                w.sample(
+                    "hd_detector_latency_seconds_bucket", count, detector=name, le=bound
+                )
+            w.sample(
+                "hd_detector_latency_seconds_sum", d["total_ms"] / 1000.0, detector=name
+            )
+            w.sample("hd_detector_latency_seconds_count", d["calls"], detector=name)
+        dedup = snap["dedup"]
+        w.family("hd_dedup_texts_total", "counter", "Texts in deduplicated batches.")
+        w.sample("hd_dedup_texts_total", dedup["texts"])
+        w.family(
+            "hd_dedup_unique_total",
+            "counter",
+            "Distinct texts run from deduplicated batches.",
+        )
+        w.sample("hd_dedup_unique_total", dedup["unique"])
+
+    cache = schema_cache_info()
+    w.family("hd_schema_cache_hits_total", "counter", "Schema validator cache hits.")
+    w.sample("hd_schema_cache_hits_total", cache["hits"])
+    w.family(
+        "hd_schema_cache_misses_total", "counter", "Schema validator cache misses."
+    )
+    w.sample("hd_schema_cache_misses_total", cache["misses"])
+    w.family("hd_schema_cache_size", "gauge", "Compiled schema validators cached.")
+    w.sample("hd_schema_cache_size", cache["size"])
+    rules = rule_cache_info()
+    w.family(
+        "hd_rule_cache_hits_total", "counter", "Rule file loads served from cache."
+    )
+    w.sample("hd_rule_cache_hits_total", rules["hits"])
+    w.family(
+        "hd_rule_cache_misses_total", "counter", "Rule file loads that compiled rules."
+    )
+    w.sample("hd_rule_cache_misses_total", rules["misses"])
+    w.family("hd_rule_cache_size", "gauge", "Compiled rule sets cached in memory.")
+    w.sample("hd_rule_cache_size", rules["size"])
+
+    if batching is not None:
+        w.family("hd_batcher_batches_total", "counter", "Micro-batches dispatched.")
+        w.sample("hd_batcher_batches_total", batching["batches"])
+        w.family("hd_batcher_items_total", "counter", "Texts sent through batches.")
+        w.sample("hd_batcher_items_total", batching["items"])
+    return w.text()
+
+
+def write_textfile(path: str, text: str) -> None:
+    """Atomically replace ``path`` so a collector never reads a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".hd-metrics-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
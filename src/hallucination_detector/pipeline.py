@@ -0,0 +1,327 @@
+"""Frozen, reusable detection pipelines.
+
+A `Pipeline` resolves its configuration once (registry names, severity
+overrides, custom rule file, JSON schema, ``skip_json``) into a fixed tuple
+of detectors, so `run` goes straight to the detectors instead of rebuilding
+the list on every call the way `detect_text` does.
+
+Pipelines built from a `PipelineConfig` pickle by reference: only the
+configuration is sent, and the receiving process rebuilds the detectors
+from its own registry and rule file. Registered detectors must therefore be
+registered (and the rule file readable) in that process too. Pipelines
+built from raw callables with `Pipeline.from_checks` pickle those callables,
+which works for module-level functions only.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+)
+
+from . import tracing
+from .batchscan import scan_batch
+from .bytesinput import BytesLike, _detect_bytes_resolved
+from .detector import (
+    Detection,
+    Severity,
+    UnsafePatternPolicy,
+    _detect_resolved,
+    _gates,
+    _resolve_detectors,
+    load_custom_rules,
+    make_schema_guard,
+)
+from .largeinput import (
+    DEFAULT_OVERLAP,
+    DEFAULT_WINDOW,
+    MaxInputPolicy,
+    scan_path,
+)
+from .prefilter import Gate
+from .stats import DetectorStats
+from .streaming import StreamDetector
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+Check = Callable[[str], Detection]
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """Everything needed to rebuild a pipeline in another process.
+
+    ``include``/``exclude``/``severity_overrides`` follow
+    `registry.build_checks`; a ``schema`` takes precedence over them, as in
+    the CLI. ``rules`` is the path of a custom rule file, loaded with the
+    ``unsafe_patterns`` policy of `load_custom_rules`. ``time_budget_ms``
+    is passed to `detect_text`.
+    """
+
+    include: Tuple[str, ...] | None = None
+    exclude: Tuple[str, ...] = ()
+    severity_overrides: Tuple[Tuple[str, Severity], ...] = ()
+    skip_json: bool = False
+    rules: str | None = None
+    schema: Mapping[str, Any] | None = field(default=None, hash=False)
+    schema_severity: Severity = "block"
+    unsafe_patterns: UnsafePatternPolicy = "warn"
+    time_budget_ms: float | None = None
+
+    def build_checks(self) -> List[Check] | None:
+        """Registry/schema checks for this config (``None`` means defaults)."""
+        if self.schema is not None:
+            return [make_schema_guard(dict(self.schema), severity=self.schema_severity)]
+        if self.include is None and not self.exclude and not self.severity_overrides:
+            return None
+        from . import registry
+
+        return registry.build_checks(
+            include=self.include,
+            exclude=self.exclude or None,
+            severity_overrides=dict(self.severity_overrides) or None,
+        )
+
+
+class Pipeline:
+    """An immutable detector pipeline with `run`, `run_batch` and `stream`."""
+
+    __slots__ = (
+        "config",
+        "checks",
+        "skip_json",
+        "custom_rules",
+        "detectors",
+        "time_budget_ms",
+        "_gates",
+    )
+
+    config: PipelineConfig | None
+    checks: Tuple[Check, ...] | None
+    skip_json: bool
+    custom_rules: Tuple[Check, ...] | None
+    detectors: Tuple[Check, ...]
+    time_budget_ms: float | None
+    _gates: Tuple[Gate | None, ...] | None
+
+    def __init__(
+        self,
+        *,
+        include: Sequence[str] | None = None,
+        exclude: Sequence[str] | None = None,
+        severity_overrides: Mapping[str, Severity] | None = None,
+        skip_json: bool = False,
+        rules: str | None = None,
+        schema: Mapping[str, Any] | None = None,
+        schema_severity: Severity = "block",
+        unsafe_patterns: UnsafePatternPolicy = "warn",
+        time_budget_ms: float | None = None,
+    ) -> None:
+        config = PipelineConfig(
+            include=tuple(include) if include is not None else None,
+            exclude=tuple(exclude or ()),
+            severity_overrides=tuple((severity_overrides or {}).items()),
+            skip_json=skip_json,
+            rules=rules,
+            schema=schema,
+            schema_severity=schema_severity,
+            unsafe_patterns=unsafe_patterns,
+            time_budget_ms=time_budget_ms,
+        )
+        self._init(config, *_compile(config))
+
+    @classmethod
+    def from_config(cls, config: PipelineConfig) -> "Pipeline":
+        pipeline = cls.__new__(cls)
+        pipeline._init(config, *_compile(config))
+        return pipeline
+
+    @classmethod
+    def from_checks(
+        cls,
+        checks: Sequence[Check] | None = None,
+        skip_json: bool = False,
+        custom_rules: Sequence[Check] | None = None,
+        time_budget_ms: float | None = None,
+    ) -> "Pipeline":
+        """Freeze already built detectors (arguments mirror `detect_text`)."""
+        pipeline = cls.__new__(cls)
+        pipeline._init(None, checks, skip_json, custom_rules, time_budget_ms)
+        return pipeline
+
+    def with_rules(
+        self,
+        custom_rules: Sequence[Check] | None,
+        rules_path: str | None = None,
+        unsafe_patterns: UnsafePatternPolicy = "warn",
+    ) -> "Pipeline":
+        """This pipeline with ``custom_rules`` in place of its own.
+
+        ``rules_path`` and ``unsafe_patterns`` name the file the rules were
+        loaded from, so a pipeline built from a config keeps one and still
+        pickles by configuration.
+        """
+        config = self.config
+        if config is not None:
+            config = replace(config, rules=rules_path, unsafe_patterns=unsafe_patterns)
+        pipeline = Pipeline.__new__(Pipeline)
+        pipeline._init(
+            config, self.checks, self.skip_json, custom_rules, self.time_budget_ms
+        )
+        return pipeline
+
+    def _init(
+        self,
+        config: PipelineConfig | None,
+        checks: Sequence[Check] | None,
+        skip_json: bool,
+        custom_rules: Sequence[Check] | None,
+        time_budget_ms: float | None,
+    ) -> None:
+        frozen_checks = tuple(checks) if checks is not None else None
+        frozen_rules = tuple(custom_rules) if custom_rules else None
+        detectors = tuple(_resolve_detectors(frozen_checks, skip_json, frozen_rules))
+        set_ = object.__setattr__
+        set_(self, "config", config)
+        set_(self, "checks", frozen_checks)
+        set_(self, "skip_json", skip_json)
+        set_(self, "custom_rules", frozen_rules)
+        set_(self, "detectors", detectors)
+        set_(self, "time_budget_ms", time_budget_ms)
+        set_(self, "_gates", _gates(detectors))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Pipeline is frozen; cannot set {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Pipeline is frozen; cannot delete {name!r}")
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        if self.config is not None:
+            return (Pipeline.from_config, (self.config,))
+        return (
+            Pipeline.from_checks,
+            (self.checks, self.skip_json, self.custom_rules, self.time_budget_ms),
+        )
+
+    def __repr__(self) -> str:
+        names = ", ".join(tracing.span_detector_name(d) for d in self.detectors)
+        return f"Pipeline([{names}])"
+
+    def run(self, text: str, *, stats: DetectorStats | None = None) -> Detection:
+        """Same result as `detect_text` with this pipeline's arguments."""
+        return _detect_resolved(
+            text, self.detectors, stats, self.time_budget_ms, self._gates
+        )
+
+    def run_batch(
+        self,
+        texts: Iterable[str],
+        *,
+        stats: DetectorStats | None = None,
+        dedup: bool = False,
+        batch_scan: bool = False,
+    ) -> List[Detection]:
+        """Run every text in order on the calling thread.
+
+        Unlike `detect_batch` this does not start a thread pool: detectors
+        hold the GIL, so for typical batch sizes the pool only adds overhead.
+        With ``dedup`` each distinct text runs once (see ``dedup.py``); with
+        ``batch_scan`` the batch is prefiltered as a whole (see
+        ``batchscan.py``).
+        """
+        if dedup:
+            from .dedup import run_deduplicated
+
+            def run_unique(unique: List[str]) -> List[Detection]:
+                return self.run_batch(unique, stats=stats, batch_scan=batch_scan)
+
+            return run_deduplicated(list(texts), run_unique, stats)[0]
+        detectors = self.detectors
+        budget = self.time_budget_ms
+        gates = self._gates
+
+        def run(texts: Iterable[str]) -> List[Detection]:
+            if batch_scan:
+                return scan_batch(texts, detectors, stats, budget)
+            return [_detect_resolved(t, detectors, stats, budget, gates) for t in texts]
+
+        tracer = tracing._TRACER
+        if tracer is None:
+            return run(texts)
+        texts = list(texts)
+        with tracing.span(tracer, "hd.detect_batch", {"batch_size": len(texts)}) as out:
+            results = run(texts)
+            out["texts"] = len(results)
+            out["failed"] = sum(1 for r in results if not r.ok)
+        return results
+
+    def run_shared(
+        self,
+        texts: Iterable[str],
+        executor: Executor | None = None,
+        *,
+        chunk_size: int | None = None,
+    ) -> List[Detection]:
+        """`run_batch` in worker processes through shared memory.
+
+        See ``sharedbatch.py``; ``executor`` is typically a
+        `ProcessPoolExecutor` (one is started for the call if omitted).
+        """
+        from .sharedbatch import run_shared
+
+        return run_shared(self, texts, executor, chunk_size=chunk_size)
+
+    def run_bytes(
+        self, data: BytesLike, *, stats: DetectorStats | None = None
+    ) -> Detection:
+        """`run` on UTF-8 bytes, decoding only where needed (see ``bytesinput.py``)."""
+        return _detect_bytes_resolved(
+            data, self.detectors, stats, self.time_budget_ms, self._gates
+        )
+
+    def run_file(
+        self,
+        path: str,
+        *,
+        stats: DetectorStats | None = None,
+        window: int = DEFAULT_WINDOW,
+        overlap: int = DEFAULT_OVERLAP,
+        max_bytes: int | None = None,
+        policy: MaxInputPolicy = "reject",
+    ) -> Detection:
+        """Memory-mapped, windowed scan of a file (see ``largeinput.py``)."""
+        return scan_path(
+            path,
+            self.detectors,
+            window=window,
+            overlap=overlap,
+            max_bytes=max_bytes,
+            policy=policy,
+            stats=stats,
+        )
+
+    def stream(self, *, overlap: int = 256) -> StreamDetector:
+        """A fresh `StreamDetector` running this pipeline."""
+        return StreamDetector(
+            self.checks, self.skip_json, self.custom_rules, overlap=overlap
+        )
+
+
+def _compile(
+    config: PipelineConfig,
+) -> Tuple[List[Check] | None, bool, List[Check] | None, float | None]:
+    checks = config.build_checks()
+    rules = None
+    if config.rules:
+        rules = load_custom_rules(config.rules, unsafe_patterns=config.unsafe_patterns)
+    return checks, config.skip_json, rules, config.time_budget_ms
@@ -0,0 +1,129 @@
+"""Lazy discovery of third-party detectors through entry points.
+
+A package exposes detectors by declaring entry points in the
+``hallucination_detector.detectors`` group::
+
+    [project.entry-points."hallucination_detector.detectors"]
+    pii = "my_package.detectors:detect_pii"
+
+Plugins are never imported up front. `plugin_index` lists the declared
+names without importing anything, and a plugin module is imported only when
+one of its names is selected through ``build_checks(include=...)`` (or
+``hd detect --include``).
+
+Scanning installed distributions for entry points is slow, so the index is
+cached in memory and on disk, keyed by the ``sys.path`` entries and their
+modification times; installing or removing a package changes the mtime of
+its site-packages directory and invalidates the cache. The cache lives in
+``$HD_CACHE_DIR`` (default ``$XDG_CACHE_HOME/hallucination_detector`` or
+``~/.cache/hallucination_detector``). Set ``HD_DISABLE_PLUGINS=1`` to skip
+discovery entirely.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from ._cache import cache_dir, read_json, write_json
+from .detector import Detection
+
+ENTRY_POINT_GROUP = "hallucination_detector.detectors"
+
+_INDEX_CACHE: Tuple[str, Dict[str, str]] | None = None
+_LOADED: Dict[str, Callable[[str], Detection]] = {}
+_LOAD_LOCK = threading.Lock()
+
+
+class PluginLoadError(Exception):
+    pass
+
+
+def _disabled() -> bool:
+    return os.environ.get("HD_DISABLE_PLUGINS", "") not in ("", "0")
+
+
+def _index_key() -> str:
+    import hashlib
+
+    h = hashlib.sha1(sys.version.encode("utf-8"))
+    for entry in sys.path:
+        try:
+            mtime = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            mtime = -1
+        h.update(f"{entry}\0{mtime}\n".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def _scan() -> Dict[str, str]:
+    from importlib.metadata import entry_points
+
+    index: Dict[str, str] = {}
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        index.setdefault(ep.name, ep.value)  # first on sys.path wins
+    return index
+
+
+def _read_disk(path: str) -> Dict[str, str] | None:
+    data = read_json(path)
+    if not isinstance(data, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in data.items()
+    ):
+        return None
+    return data
+
+
+def plugin_index(*, refresh: bool = False) -> Dict[str, str]:
+    """Map of plugin name -> ``module:attr`` reference, without importing."""
+    global _INDEX_CACHE
+    if _disabled():
+        return {}
+    key = _index_key()
+    cached = _INDEX_CACHE
+    if not refresh and cached is not None and cached[0] == key:
+        return dict(cached[1])
+    path = os.path.join(cache_dir(), f"plugins-{key[:16]}.json")
+    index = None if refresh else _read_disk(path)
+    if index is None:
+        index = _scan()
+        write_json(path, index)
+    _INDEX_CACHE = (key, index)
+    return dict(index)
+
+
+def list_plugins() -> List[str]:
+    return sorted(plugin_index())
+
+
+def load_plugin(name: str) -> Callable[[str], Detection] | None:
+    """Import and return the detector published as ``name`` (None if unknown)."""
+    fn = _LOADED.get(name)
+    if fn is not None:
+        return fn
+    reference = plugin_index().get(name)
+    if reference is None:
+        return None
+    with _LOAD_LOCK:
+        fn = _LOADED.get(name)
+        if fn is None:
+            fn = _import_reference(name, reference)
+            _LOADED[name] = fn
+    return fn
+
+
+def _import_reference(name: str, reference: str) -> Callable[[str], Detection]:
+    from importlib import import_module
+
+    module_name, _, attrs = reference.partition(":")
+    try:
+        obj = import_module(module_name.strip())
+        for attr in filter(None, attrs.strip().split(".")):
+            obj = getattr(obj, attr)
+    except Exception as e:
+        raise PluginLoadError(f"cannot load detector plugin {name!r}: {e}") from e
+    if not callable(obj):
+        raise PluginLoadError(f"detector plugin {name!r} is not callable")
+    return obj  # type: ignore[no-any-return]
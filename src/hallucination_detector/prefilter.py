@@ -0,0 +1,225 @@
+"""Cheap necessary conditions for detectors to fire.
+
+A `Prefilter` names literals (or a regex) one of which every text a detector
+can fire on contains, and optionally a minimum text length. A text that
+fails it cannot fail that detector, so the detector need not run on it.
+`prefilter_of` knows the conditions of the built-in guards; custom rules get
+one from their pattern at load time (`redos.required_literals`); user
+detectors can declare one with a ``prefilter`` attribute, set before first
+use. Other detectors always run.
+
+`detect_text`, `detect_batch` and `Pipeline` check the prefilters before
+each detector and skip the ones a text cannot fire. What the checks look at
+(the lower-cased text, whether it is ASCII) is computed once per text and
+shared by all of them; `DetectorStats` counts the skips per detector.
+``batchscan.py`` evaluates the same conditions over a whole batch.
+
+Conditions may over-approximate (the overconfidence guard's keywords are
+searched without looking for citations) but never under-approximate: a
+detector skipped because of its prefilter would have returned ok.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Literal, Sequence, Tuple
+
+from .detector import Detection
+
+PrefilterCase = Literal["exact", "ignore", "lower"]
+
+
+class TextFacts:
+    """One text with the views prefilters need, each made on first use."""
+
+    __slots__ = ("text", "_lower", "_ascii")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._lower: str | None = None
+        self._ascii: bool | None = None
+
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    def isascii(self) -> bool:
+        if self._ascii is None:
+            self._ascii = self.text.isascii()
+        return self._ascii
+
+
+@dataclass(frozen=True)
+class Prefilter:
+    """Text a detector can fire on contains one of ``literals`` or ``pattern``.
+
+    ``case`` says how the literals are found: ``"exact"`` as substrings,
+    ``"ignore"`` as ``re.IGNORECASE`` matches, ``"lower"`` as substrings of
+    ``text.lower()``. ``pattern`` is searched as is and must not match text
+    containing ``"\\x00"`` (batches are scanned joined with it). With
+    ``non_ascii`` any text with a non-ASCII character passes too, which lets
+    a condition such as "has a ``\\d`` digit" be written as ASCII literals.
+    Texts shorter than ``min_length`` characters never pass. An empty
+    prefilter means the detector never fires.
+    """
+
+    literals: Tuple[str, ...] = ()
+    case: PrefilterCase = "exact"
+    pattern: "re.Pattern[str] | None" = None
+    non_ascii: bool = False
+    min_length: int = 0
+    # Lower-cased literals when case is "ignore" and they are all ASCII:
+    # on ASCII text IGNORECASE is the same as comparing lower case
+    _folded: Tuple[str, ...] | None = field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    def __post_init__(self) -> None:
+        if self.case == "ignore" and all(lit.isascii() for lit in self.literals):
+            folded = tuple(lit.lower() for lit in self.literals)
+            object.__setattr__(self, "_folded", folded)
+
+    def admits(self, facts: TextFacts) -> bool:
+        """False when the detector cannot fire on ``facts.text``."""
+        text = facts.text
+        if len(text) < self.min_length:
+            return False
+        if self.non_ascii and not facts.isascii():
+            return True
+        literals = self.literals
+        if literals:
+            if self.case == "exact":
+                haystack = text
+            elif self.case == "lower":
+                haystack = facts.lower()
+            elif self._folded is not None and facts.isascii():
+                haystack, literals = facts.lower(), self._folded
+            else:
+                if _ignorecase(literals).search(text):
+                    return True
+                literals = ()
+            for literal in literals:
+                if literal in haystack:
+                    return True
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def _ignorecase(literals: Tuple[str, ...]) -> "re.Pattern[str]":
+    return re.compile("|".join(map(re.escape, literals)), re.IGNORECASE)
+
+
+def literal_prefilter(
+    patterns: Sequence[str], flags: int = re.IGNORECASE
+) -> Prefilter | None:
+    """Prefilter for a detector that fires when any of ``patterns`` matches."""
+    from .redos import required_literals
+
+    literals: List[str] = []
+    for pattern in patterns:
+        found = required_literals(pattern, flags)
+        if found is None:
+            return None
+        literals.extend(found)
+    case: PrefilterCase = "ignore" if flags & re.IGNORECASE else "exact"
+    # A match is at least as long as the literal it contains, in any case
+    return Prefilter(tuple(literals), case, min_length=min(map(len, literals)))
+
+
+# Keyword list the cached prefilter was built from, and the prefilter
+_KEYWORDS: Tuple[Tuple[str, ...], Prefilter] = ((), Prefilter())
+
+
+def _keyword_prefilter() -> Prefilter:
+    global _KEYWORDS
+    from . import detector
+
+    keywords = tuple(detector.CONFIDENT_KEYWORDS)
+    cached = _KEYWORDS
+    if cached[0] != keywords:
+        # No min_length: lower-casing can make a text longer ("İ")
+        cached = _KEYWORDS = (keywords, Prefilter(keywords, "lower"))
+    return cached[1]
+
+
+_Getter = Callable[[], "Prefilter | None"]
+# Published whole on first use, so no thread sees a partly filled table
+_BUILTINS: Dict[Callable[[str], Detection], _Getter] = {}
+
+
+def _builtins() -> Dict[Callable[[str], Detection], _Getter]:
+    global _BUILTINS
+    builtins = _BUILTINS
+    if not builtins:
+        from . import detector as d
+
+        contradictions = literal_prefilter(d._CONTRADICTIONS)
+        fallacies = literal_prefilter(d._FALLACIES)
+        fact = Prefilter(("fact",), "lower")
+        # FACT_PATTERN needs a ``\d`` and two characters ("5%"); searching
+        # for ASCII digits is far faster than any regex scan, and other
+        # digits are non-ASCII
+        numeric = Prefilter(tuple("0123456789"), non_ascii=True, min_length=2)
+        builtins = _BUILTINS = {
+            # Keywords can be replaced at any time, so that one is looked up
+            # on every use
+            d.guard_overconfidence: _keyword_prefilter,
+            d.guard_contradictions: lambda: contradictions,
+            d.guard_logical_fallacies: lambda: fallacies,
+            d.guard_fact_check: lambda: fact,
+            d.guard_numeric_claims: lambda: numeric,
+        }
+    return builtins
+
+
+def _getter(fn: Callable[[str], Detection]) -> _Getter | None:
+    inner = getattr(fn, "__wrapped__", None)
+    if inner is not None:
+        # Registry severity overrides only change failing results; other
+        # wrappers may do anything
+        if getattr(fn, "severity_floor", None) is None:
+            return None
+        return _getter(inner)
+    builtin = _builtins().get(fn)
+    if builtin is not None:
+        return builtin
+    found = getattr(fn, "prefilter", None)
+    if not isinstance(found, Prefilter):
+        return None
+    return lambda: found
+
+
+def prefilter_of(fn: Callable[[str], Detection]) -> Prefilter | None:
+    """The `Prefilter` of detector ``fn``, or None if it must always run."""
+    getter = _getter(fn)
+    return getter() if getter is not None else None
+
+
+Gate = Callable[[TextFacts], bool]
+
+
+def _gate(getter: _Getter) -> Gate:
+    if getter is not _keyword_prefilter:
+        fixed = getter()
+        if fixed is not None:
+            return fixed.admits
+
+    def admits(facts: TextFacts) -> bool:
+        prefilter = getter()
+        return prefilter is None or prefilter.admits(facts)
+
+    return admits
+
+
+@functools.lru_cache(maxsize=256)
+def gates(
+    detectors: Tuple[Callable[[str], Detection], ...],
+) -> Tuple[Gate | None, ...] | None:
+    """Per-detector prefilter checks, or None when no detector has one."""
+    found = [_getter(fn) for fn in detectors]
+    if not any(found):
+        return None
+    return tuple(_gate(getter) if getter is not None else None for getter in found)
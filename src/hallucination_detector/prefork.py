@@ -0,0 +1,218 @@
+"""Pre-fork multi-process mode for ``hd serve`` (POSIX only).
+
+The parent builds the `DetectionService` (registry checks, compiled regexes,
+keyword sets, schema validators, custom rules) and binds the listening socket
+once, then forks ``workers`` children that serve connections from that shared
+socket. Workers inherit the compiled state copy-on-write; `gc.freeze()` keeps
+the collector from touching (and thereby copying) those pages.
+
+The parent only supervises:
+
+- a worker that exits or crashes is reaped and replaced;
+- each worker's serve loop writes a heartbeat to a pipe on every poll; a
+  worker whose heartbeats stop for ``health_timeout`` seconds (for example
+  stuck in a runaway regex while holding the GIL) is killed and replaced.
+
+SIGTERM or SIGINT to the parent stops all workers and removes the socket.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import select
+import signal
+import sys
+import time
+from typing import Any, Dict, List
+
+from .server import DetectionHTTPServer
+
+
+def _log(message: str) -> None:
+    print(f"hd serve: {message}", file=sys.stderr, flush=True)
+
+
+class _Stop(Exception):
+    pass
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        server: DetectionHTTPServer,
+        workers: int,
+        *,
+        health_interval: float = 0.5,
+        health_timeout: float = 10.0,
+        restart_delay: float = 0.1,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.server = server
+        self.workers = workers
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.restart_delay = restart_delay
+        # pid -> (heartbeat read fd, monotonic time of the last heartbeat)
+        self._children: Dict[int, List[Any]] = {}
+        self.restarts = 0
+
+    @property
+    def pids(self) -> List[int]:
+        return sorted(self._children)
+
+    def start(self) -> None:
+        gc.collect()
+        gc.freeze()  # keep shared pipeline objects out of GC bookkeeping writes
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # worker
+            os.close(read_fd)
+            code = 0
+            try:
+                self._run_worker(write_fd)
+            except BaseException:
+                code = 1
+            finally:
+                # Never run the parent's cleanup (it would unlink the socket)
+                os._exit(code)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        self._children[pid] = [read_fd, time.monotonic()]
+        _log(f"worker {pid} started")
+        return pid
+
+    def _run_worker(self, heartbeat_fd: int) -> None:
+        for fd, _ in self._children.values():
+            os.close(fd)
+        self._children = {}
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        def _terminate(signum: int, frame: Any) -> None:
+            raise _Stop
+
+        signal.signal(signal.SIGTERM, _terminate)
+        os.set_blocking(heartbeat_fd, False)
+        server = self.server
+
+        def heartbeat() -> None:
+            try:
+                os.write(heartbeat_fd, b".")
+            except (BlockingIOError, BrokenPipeError):
+                pass
+
+        # socketserver calls service_actions() once per poll of the serve loop
+        server.service_actions = heartbeat  # type: ignore[method-assign]
+        try:
+            server.serve_forever(poll_interval=self.health_interval)
+        except _Stop:
+            pass
+
+    def _reap(self) -> None:
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            entry = self._children.pop(pid, None)
+            if entry is None:
+                continue
+            os.close(entry[0])
+            if os.WIFSIGNALED(status):
+                how = f"killed by signal {os.WTERMSIG(status)}"
+            else:
+                how = f"exited with status {os.waitstatus_to_exitcode(status)}"
+            _log(f"worker {pid} {how}; restarting")
+            self.restarts += 1
+            time.sleep(self.restart_delay)
+            self._spawn()
+
+    def _read_heartbeats(self, timeout: float) -> None:
+        fds = {entry[0]: pid for pid, entry in self._children.items()}
+        if not fds:
+            return
+        try:
+            ready, _, _ = select.select(list(fds), [], [], timeout)
+        except InterruptedError:
+            return
+        now = time.monotonic()
+        for fd in ready:
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                continue
+            entry = self._children.get(fds[fd])
+            if data and entry is not None:
+                entry[1] = now
+
+    def _kill_unhealthy(self) -> None:
+        now = time.monotonic()
+        for pid, (_, last) in list(self._children.items()):
+            if now - last > self.health_timeout:
+                _log(f"worker {pid} missed heartbeats for {now - last:.1f}s")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def supervise_once(self, timeout: float | None = None) -> None:
+        """One supervision step: wait for heartbeats, check health, reap."""
+        self._read_heartbeats(self.health_interval if timeout is None else timeout)
+        self._kill_unhealthy()
+        self._reap()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while self._children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.05)
+                continue
+            entry = self._children.pop(pid, None)
+            if entry is not None:
+                os.close(entry[0])
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            os.close(self._children.pop(pid)[0])
+
+    def run(self) -> None:
+        """Start workers and supervise them until SIGTERM or SIGINT."""
+
+        def _terminate(signum: int, frame: Any) -> None:
+            raise _Stop
+
+        previous = {
+            sig: signal.signal(sig, _terminate)
+            for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+        _log(f"listening on {self.server.url} with {self.workers} workers")
+        try:
+            self.start()
+            while True:
+                self.supervise_once()
+        except _Stop:
+            pass
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            self.stop()
+            self.server.server_close()
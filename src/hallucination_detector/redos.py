@@ -0,0 +1,450 @@
+"""Backtracking risk analysis for regular expressions.
+
+Python's `re` is a backtracking engine and cannot interrupt a running match,
+so a single bad custom rule can stall a worker on adversarial input. This
+module inspects a pattern's parse tree at rule load time and reports the
+shapes known to backtrack badly:
+
+- ``nested_quantifier``: a repeated group containing another unbounded
+  repeat, e.g. ``(a+)+`` or ``(\\w+\\s?)*`` (exponential).
+- ``overlapping_alternation``: a repeated group whose iterations can split
+  the same input in several ways, e.g. ``(a|aa)*`` or ``(\\w|\\d\\w)*``
+  (exponential).
+- ``wildcard_chain``: two or more unbounded wildcards in one sequence, e.g.
+  ``a.*b.*c`` (polynomial: every wildcard multiplies the work by the line
+  length).
+
+Plain literal chains such as ``either.*or.*no.*middle`` are not reported:
+`compile_search` runs them with one left-to-right scan per literal instead
+of the regex engine, which gives the same answer in linear time.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from typing import Any, Callable, List, Sequence, Set, Tuple
+
+try:  # Python 3.11+
+    from re import _parser as _sre  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover - Python 3.10
+    import sre_parse as _sre  # type: ignore[no-redef]
+
+RISKS = ("nested_quantifier", "overlapping_alternation", "wildcard_chain")
+
+_REPEATS = {_sre.MAX_REPEAT, _sre.MIN_REPEAT}
+# Possessive repeats and atomic groups never backtrack into their body
+_ATOMIC = {
+    op
+    for op in (
+        getattr(_sre, "POSSESSIVE_REPEAT", None),
+        getattr(_sre, "ATOMIC_GROUP", None),
+    )
+    if op is not None
+}
+_MAXREPEAT = _sre.MAXREPEAT
+# Repeats with more iterations than this count as unbounded
+_LARGE = 16
+_ANY_CHAR = None  # first-character set meaning "could be anything"
+
+
+class RegexRiskWarning(UserWarning):
+    """A custom rule pattern that may backtrack catastrophically."""
+
+
+class UnsafePattern(ValueError):
+    """Raised when a rule pattern is rejected by the ``reject`` policy."""
+
+
+def analyze_pattern(pattern: str, flags: int = re.IGNORECASE) -> List[str]:
+    """Backtracking risks found in ``pattern`` (empty when it looks safe).
+
+    Raises `re.error` for invalid patterns.
+    """
+    return list(_analyze(pattern, flags))
+
+
+@functools.lru_cache(maxsize=4096)
+def _analyze(pattern: str, flags: int) -> Tuple[str, ...]:
+    # Every risk needs two quantifiers, or one plus an alternation or an
+    # optional part; most rules have neither and skip the (slow) parser.
+    quantifiers = pattern.count("*") + pattern.count("+") + pattern.count("{")
+    if quantifiers == 0 or (
+        quantifiers == 1 and "|" not in pattern and "?" not in pattern
+    ):
+        return ()
+    parsed = _sre.parse(pattern, flags)
+    if _chain_pieces(parsed) is not None:
+        return ()
+    found: Set[str] = set()
+    _scan(list(parsed), found, inside_repeat=False)
+    return tuple(risk for risk in RISKS if risk in found)
+
+
+def _is_large(hi: int) -> bool:
+    return hi == _MAXREPEAT or hi > _LARGE
+
+
+def _is_wildcard(body: Sequence[Any]) -> bool:
+    """``.``, ``[^x]``, ``\\S`` and the like: matches nearly anything."""
+    if len(body) != 1:
+        return False
+    op, av = body[0]
+    if op is _sre.ANY or op is _sre.NOT_LITERAL:
+        return True
+    if op is _sre.IN:
+        return any(
+            o is _sre.NEGATE or (o is _sre.CATEGORY and "_NOT_" in str(a))
+            for o, a in av
+        )
+    return False
+
+
+def _scan(items: List[Any], found: Set[str], inside_repeat: bool) -> None:
+    wildcards = 0
+    for i, (op, av) in enumerate(items):
+        if op in _ATOMIC:
+            continue
+        if op in _REPEATS:
+            _lo, hi, body = av
+            body = list(body)
+            if _is_large(hi):
+                if inside_repeat:
+                    found.add("nested_quantifier")
+                if _is_wildcard(body) and _overlaps(body, items[i + 1 :]):
+                    wildcards += 1
+                if _ambiguous(body):
+                    found.add("overlapping_alternation")
+            _scan(body, found, inside_repeat or _is_large(hi))
+        elif op is _sre.SUBPATTERN:
+            _scan(list(av[-1]), found, inside_repeat)
+        elif op is _sre.BRANCH:
+            for branch in av[1]:
+                _scan(list(branch), found, inside_repeat)
+        elif op is _sre.ASSERT or op is _sre.ASSERT_NOT:
+            _scan(list(av[1]), found, inside_repeat)
+    if wildcards >= 2:
+        found.add("wildcard_chain")
+
+
+def _overlaps(body: List[Any], rest: List[Any]) -> bool:
+    """Can the repeated ``body`` also match how ``rest`` starts?"""
+    a, b = _first_chars(body), _first_chars(rest)
+    if b is not _ANY_CHAR and not b:
+        return False  # nothing follows: the repeat never has to give back
+    return a is _ANY_CHAR or b is _ANY_CHAR or bool(a & b)
+
+
+def _flatten(items: Sequence[Any]) -> List[Any]:
+    """Items of a sequence with plain groups inlined."""
+    out: List[Any] = []
+    for op, av in items:
+        if op is _sre.SUBPATTERN:
+            out.extend(_flatten(list(av[-1])))
+        else:
+            out.append((op, av))
+    return out
+
+
+def _ambiguous(body: List[Any]) -> bool:
+    """Can a repeated ``body`` split the same input in more than one way?
+
+    True when two alternatives can start alike (``(\\w|\\d\\w)*``), or when
+    an iteration ends in something optional that could equally start the
+    next iteration (``(a|aa)*``, which the parser turns into ``(aa?)*``).
+    """
+    items = _flatten(body)
+    for op, av in items:
+        if op is _sre.BRANCH and _branches_overlap([b for b in av[1] if b]):
+            return True
+    start = _first_chars(body)
+    for op, av in reversed(items):
+        if op is _sre.AT:
+            continue
+        if op is _sre.BRANCH and any(not b for b in av[1]):
+            tail = _first_chars([(op, (None, [b for b in av[1] if b]))])
+        elif op in _REPEATS and av[0] == 0:
+            tail = _first_chars(list(av[2]))
+        else:
+            return False  # a mandatory item ends the iteration
+        if tail is _ANY_CHAR or start is _ANY_CHAR or tail & start:
+            return True
+    return False
+
+
+def _branches_overlap(branches: Sequence[Any]) -> bool:
+    seen: Set[int] = set()
+    for branch in branches:
+        first = _first_chars(list(branch))
+        if first is _ANY_CHAR:
+            return True
+        if seen & first:
+            return True
+        seen |= first
+    return False
+
+
+def _first_chars(items: List[Any]) -> Set[int] | None:
+    """Characters a sequence can start with (None: any or unknown)."""
+    chars: Set[int] = set()
+    for op, av in items:
+        if op is _sre.AT:
+            continue  # anchors consume nothing
+        if op is _sre.LITERAL:
+            return chars | _fold(av)
+        if op is _sre.IN:
+            sub = _class_chars(av)
+            return _ANY_CHAR if sub is _ANY_CHAR else chars | sub
+        if op is _sre.NOT_LITERAL:
+            return chars | (_LATIN1 - _fold(av))
+        if op is _sre.SUBPATTERN:
+            inner = _first_chars(list(av[-1]))
+            return _ANY_CHAR if inner is _ANY_CHAR else chars | inner
+        if op is _sre.BRANCH:
+            for branch in av[1]:
+                inner = _first_chars(list(branch))
+                if inner is _ANY_CHAR:
+                    return _ANY_CHAR
+                chars |= inner
+            return chars
+        if op in _REPEATS:
+            inner = _first_chars(list(av[2]))
+            if inner is _ANY_CHAR:
+                return _ANY_CHAR
+            chars |= inner
+            if av[0] > 0:
+                return chars
+            continue  # optional: the next item may come first
+        return _ANY_CHAR
+    return chars
+
+
+# Character classes are compared over Latin-1, which is enough to tell e.g.
+# ``\\s`` from ``\\w`` apart
+_LATIN1 = frozenset(range(256))
+_CATEGORIES = {
+    name: frozenset(c for c in _LATIN1 if re.match(regex, chr(c)))
+    for name, regex in (
+        ("CATEGORY_DIGIT", r"\d"),
+        ("CATEGORY_NOT_DIGIT", r"\D"),
+        ("CATEGORY_SPACE", r"\s"),
+        ("CATEGORY_NOT_SPACE", r"\S"),
+        ("CATEGORY_WORD", r"\w"),
+        ("CATEGORY_NOT_WORD", r"\W"),
+    )
+}
+
+
+def _class_chars(items: Sequence[Any]) -> Set[int] | None:
+    chars: Set[int] = set()
+    negate = False
+    for op, av in items:
+        if op is _sre.NEGATE:
+            negate = True
+        elif op is _sre.LITERAL:
+            chars |= _fold(av)
+        elif op is _sre.RANGE and av[1] - av[0] <= 1024:
+            for code in range(av[0], av[1] + 1):
+                chars |= _fold(code)
+        elif op is _sre.CATEGORY and str(av) in _CATEGORIES:
+            chars |= _CATEGORIES[str(av)]
+        else:
+            return _ANY_CHAR
+    return set(_LATIN1 - chars) if negate else chars
+
+
+def _fold(code: int) -> Set[int]:
+    ch = chr(code)
+    return {ord(c) for c in (ch, ch.lower(), ch.upper()) if len(c) == 1}
+
+
+class LiteralChain:
+    """Linear-time matcher for ``lit1.*lit2.*...`` patterns.
+
+    The regex engine retries every split point of every ``.*`` and is
+    polynomial in the line length. Because each piece is a plain literal,
+    taking the leftmost occurrence of each piece in turn finds a match
+    whenever one exists, so one scan per piece and line is enough.
+    """
+
+    __slots__ = ("pattern", "_pieces", "_dotall", "_newline")
+
+    def __init__(
+        self,
+        pattern: str,
+        pieces: Sequence["re.Pattern[Any]"],
+        dotall: bool,
+        newline: "re.Pattern[Any]" = re.compile("\n"),
+    ):
+        self.pattern = pattern
+        self._pieces = tuple(pieces)
+        self._dotall = dotall
+        # A pattern rather than ``text.find`` so that any buffer works
+        self._newline = newline
+
+    def __repr__(self) -> str:
+        return f"LiteralChain({self.pattern!r})"
+
+    def search(self, text: Any) -> bool:
+        first, rest = self._pieces[0], self._pieces[1:]
+        end = len(text)
+        pos = 0
+        while True:
+            m = first.search(text, pos)
+            if m is None:
+                return False
+            # ``.`` stops at newlines, so the chain must finish on this line
+            line_end = end
+            if not self._dotall:
+                nl = self._newline.search(text, m.end())
+                if nl is not None:
+                    line_end = nl.start()
+            cur = m.end()
+            for piece in rest:
+                hit = piece.search(text, cur, line_end)
+                if hit is None:
+                    break
+                cur = hit.end()
+            else:
+                return True
+            # The leftmost start on this line left the most room; a later
+            # start on the same line cannot succeed either.
+            if line_end >= end:
+                return False
+            pos = line_end + 1
+
+
+def literal_chain(pattern: str, flags: int = re.IGNORECASE) -> LiteralChain | None:
+    """A `LiteralChain` equivalent to ``pattern``, or None if it is not one."""
+    if ".*" not in pattern:
+        return None
+    try:
+        parsed = _sre.parse(pattern, flags)
+    except re.error:
+        return None
+    found = _chain_pieces(parsed)
+    if found is None:
+        return None
+    pieces, all_flags = found
+    dotall = bool(all_flags & re.DOTALL)
+    # The scan works line by line, which a literal newline would straddle
+    if not dotall and any("\n" in piece for piece in pieces):
+        return None
+    literal_flags = all_flags & (re.IGNORECASE | re.ASCII | re.UNICODE)
+    compiled = [re.compile(re.escape(piece), literal_flags) for piece in pieces]
+    return LiteralChain(pattern, compiled, dotall)
+
+
+def _chain_pieces(parsed: Any) -> Tuple[List[str], int] | None:
+    """Literals of a parsed ``lit.*lit...`` pattern and its flags, if it is one."""
+    pieces: List[List[int]] = [[]]
+    for op, av in parsed:
+        if op is _sre.LITERAL:
+            pieces[-1].append(av)
+        elif (
+            op is _sre.MAX_REPEAT
+            and av[0] == 0
+            and av[1] == _MAXREPEAT
+            and len(av[2]) == 1
+            and av[2][0][0] is _sre.ANY
+        ):
+            if not pieces[-1]:
+                return None  # leading or doubled ``.*``
+            pieces.append([])
+        else:
+            return None
+    if len(pieces) < 2 or not pieces[-1]:
+        return None
+    state = getattr(parsed, "state", None) or parsed.pattern
+    return ["".join(map(chr, piece)) for piece in pieces], state.flags
+
+
+def compile_search(pattern: str, flags: int = re.IGNORECASE) -> Callable[[str], Any]:
+    """``re.compile(pattern, flags).search`` or an equivalent linear matcher.
+
+    The result is truthy exactly when the pattern matches somewhere.
+    """
+    chain = literal_chain(pattern, flags)
+    if chain is not None:
+        return chain.search
+    return re.compile(pattern, flags).search
+
+
+@functools.lru_cache(maxsize=1024)
+def required_literals(
+    pattern: str, flags: int = re.IGNORECASE
+) -> Tuple[str, ...] | None:
+    """Literals one of which occurs in every match of ``pattern``, if found.
+
+    Matched with the case handling of ``flags``. Used as a cheap test that
+    rules out most texts before the pattern runs (see ``prefilter.py``);
+    None when the pattern is invalid or has no such literals.
+    """
+    try:
+        parsed = _sre.parse(pattern, flags)
+    except re.error:
+        return None
+    found = _required(list(parsed))
+    return tuple(found) if found else None
+
+
+def _required(items: Sequence[Any]) -> List[str] | None:
+    """Best set of literals one of which every match of ``items`` contains."""
+    best: List[str] | None = None
+
+    def consider(found: List[str] | None) -> None:
+        nonlocal best
+        # Prefer long literals, then fewer alternatives
+        if found and (best is None or _rank(found) > _rank(best)):
+            best = found
+
+    run: List[int] = []
+    for op, av in [*items, (None, None)]:
+        if op is _sre.LITERAL:
+            run.append(av)
+            continue
+        if run:
+            consider(["".join(map(chr, run))])
+            run = []
+        if op is _sre.SUBPATTERN:
+            consider(_required(av[-1]))
+        elif op is _sre.BRANCH:
+            branches = [_required(branch) for branch in av[1]]
+            if all(branches):
+                consider([lit for found in branches for lit in found])  # type: ignore[union-attr]
+        elif op in _REPEATS and av[0] >= 1:
+            consider(_required(av[2]))
+    return best
+
+
+def _rank(literals: List[str]) -> Tuple[int, int]:
+    return min(map(len, literals)), -len(literals)
+
+
+_BYTES_NEWLINE = re.compile(b"\n")
+
+
+def compile_bytes_search(
+    pattern: str, flags: int = re.IGNORECASE
+) -> Callable[[Any], Any] | None:
+    """`compile_search` for ASCII-only bytes-like input (see ``bytesinput.py``).
+
+    Returns None when ``pattern`` has no bytes equivalent (non-ASCII source
+    or literals, or escapes only text patterns accept).
+    """
+    if not pattern.isascii():
+        return None
+    flags &= ~re.UNICODE
+    chain = literal_chain(pattern, flags)
+    if chain is not None:
+        sources = [p.pattern for p in chain._pieces]
+        if not all(src.isascii() for src in sources):
+            return None  # e.g. ``\xe9``: cannot occur in ASCII input
+        pieces = [
+            re.compile(src.encode("ascii"), flags & re.IGNORECASE) for src in sources
+        ]
+        return LiteralChain(pattern, pieces, chain._dotall, _BYTES_NEWLINE).search
+    try:
+        return re.compile(pattern.encode("ascii"), flags).search
+    except re.error:
+        return None
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from collections import OrderedDict
+import functools
+import threading
+from types import MappingProxyType
 from typing import (
     Callable,
     Dict,
+    FrozenSet,
     List,
     Mapping,
+    NamedTuple,
     Sequence,
+    Tuple,
 )
 
 from .detector import (
@@ -20,9 +25,6 @@ from .detector import (
     guard_overconfidence,
 )
 
-# User-defined detectors registry (in insertion order)
-_USER_DETECTORS: "OrderedDict[str, Callable[[str], Detection]]" = OrderedDict()
-
 _BUILTIN_ORDER: List[str] = [
     "json",
     "overconfidence",
@@ -44,26 +46,88 @@ def _builtin_detectors() -> Dict[str, Callable[[str], Detection]]:
     }
 
 
+_BuildKey = Tuple[Tuple[str, ...] | None, FrozenSet[str], Tuple[Tuple[str, str], ...]]
+
+# Upper bound on memoised build_checks configurations per registry version
+_MAX_CACHED_BUILDS = 1024
+
+
+class _Snapshot(NamedTuple):
+    """One immutable registry state.
+
+    ``register_detector`` and ``clear_registry`` publish a new snapshot
+    (with a higher ``version`` and an empty build cache) instead of mutating
+    this one, so readers never lock: they read the module global once and
+    work with a consistent view.
+    """
+
+    version: int
+    user: Mapping[str, Callable[[str], Detection]]  # in registration order
+    combined: Mapping[str, Callable[[str], Detection]]
+    builds: Dict[_BuildKey, Tuple[Callable[[str], Detection], ...]]
+
+
+def _make_snapshot(
+    version: int, user: Dict[str, Callable[[str], Detection]]
+) -> _Snapshot:
+    combined = {**_builtin_detectors(), **user}
+    return _Snapshot(
+        version, MappingProxyType(dict(user)), MappingProxyType(combined), {}
+    )
+
+
+_SNAPSHOT = _make_snapshot(0, {})
+_WRITE_LOCK = threading.Lock()
+
+
+def _snapshot() -> _Snapshot:
+    return _SNAPSHOT
+
+
+def registry_version() -> int:
+    """Counter bumped by every `register_detector` / `clear_registry`."""
+    return _SNAPSHOT.version
+
+
 def register_detector(name: str, fn: Callable[[str], Detection]) -> None:
     """Register or replace a detector under a unique name.
 
     Detectors should accept a string and return a Detection.
     """
+    global _SNAPSHOT
     if not isinstance(name, str) or not name:
         raise ValueError("Detector name must be a non-empty string")
-    _USER_DETECTORS[name] = fn
+    with _WRITE_LOCK:
+        user = dict(_SNAPSHOT.user)
+        user[name] = fn
+        _SNAPSHOT = _make_snapshot(_SNAPSHOT.version + 1, user)
 
 
 def clear_registry() -> None:
     """Clear user-registered detectors (built-ins remain available)."""
-    _USER_DETECTORS.clear()
+    global _SNAPSHOT
+    with _WRITE_LOCK:
+        _SNAPSHOT = _make_snapshot(_SNAPSHOT.version + 1, {})
+
 
+def list_detectors(
+    include_builtin: bool = True, include_plugins: bool = True
+) -> List[str]:
+    """Names of available detectors.
 
-def list_detectors(include_builtin: bool = True) -> List[str]:
+    Installed plugins (see `plugins.py`) are listed from the cached entry
+    point index, after built-ins and registered detectors, without being
+    imported.
+    """
     names: List[str] = []
     if include_builtin:
         names.extend(_BUILTIN_ORDER)
-    names.extend(_USER_DETECTORS.keys())
+    names.extend(_SNAPSHOT.user.keys())
+    if include_plugins:
+        from .plugins import list_plugins
+
+        known = set(_SNAPSHOT.combined)
+        names.extend(n for n in list_plugins() if n not in known)
     return names
 
 
@@ -74,6 +138,7 @@ def _wrap_with_severity(
 ) -> Callable[[str], Detection]:
     order = {"info": 0, "warn": 1, "block": 2}
 
+    @functools.wraps(fn)
     def wrapped(text: str) -> Detection:
         res = fn(text)
         if not res.ok:
@@ -88,6 +153,8 @@ def _wrap_with_severity(
                 )
         return res
 
+    # Lets other input paths (bytesinput.py) re-apply the override
+    wrapped.severity_floor = target  # type: ignore[attr-defined]
     return wrapped
 
 
@@ -99,18 +166,49 @@ def build_checks(
 ) -> List[Callable[[str], Detection]]:
     """Build an ordered list of detector callables.
 
-    - include: if provided, use these names in this exact order
+    - include: if provided, use these names in this exact order (names
+      published by installed plugins are imported on first use)
     - exclude: omit these names
     - severity_overrides: escalate severities for these detectors (never downgrades)
+
+    Results are memoised per registry version, so repeated calls with the
+    same arguments return the same callables without rebuilding wrappers.
     """
-    builtins = _builtin_detectors()
-    combined: Dict[str, Callable[[str], Detection]] = {**builtins, **_USER_DETECTORS}
+    snap = _SNAPSHOT
+    key: _BuildKey = (
+        tuple(include) if include is not None else None,
+        frozenset(exclude or ()),
+        tuple(sorted((severity_overrides or {}).items())),
+    )
+    checks = snap.builds.get(key)
+    if checks is None:
+        checks = _build(snap, include, exclude, severity_overrides)
+        if len(snap.builds) < _MAX_CACHED_BUILDS:
+            snap.builds[key] = checks
+    return list(checks)
+
+
+def _build(
+    snap: _Snapshot,
+    include: Sequence[str] | None,
+    exclude: Sequence[str] | None,
+    severity_overrides: Mapping[str, Severity] | None,
+) -> Tuple[Callable[[str], Detection], ...]:
+    combined = snap.combined
 
     if include is not None:
+        # Names that are neither built-in nor registered may be plugins; they
+        # are imported here, only once explicitly selected.
+        missing = [n for n in include if n not in combined]
+        if missing:
+            from .plugins import load_plugin
+
+            found = {n: fn for n in missing if (fn := load_plugin(n)) is not None}
+            combined = {**combined, **found}
         ordered_names = [n for n in include if n in combined]
     else:
         ordered_names = [n for n in _BUILTIN_ORDER if n in combined]
-        ordered_names.extend([n for n in _USER_DETECTORS.keys() if n in combined])
+        ordered_names.extend([n for n in snap.user.keys() if n in combined])
 
     if exclude:
         excluded = set(exclude)
@@ -122,4 +220,4 @@ def build_checks(
         if severity_overrides and name in severity_overrides:
             fn = _wrap_with_severity(name, fn, severity_overrides[name])
         checks.append(fn)
-    return checks
+    return tuple(checks)
@@ -0,0 +1,352 @@
+"""Online, mergeable summaries of detection results.
+
+`generate_report` takes a list of results. A `ReportAccumulator` takes them
+one at a time (`add`) and keeps only counters: totals, severity counts,
+per-reason counts, a histogram of text lengths and, folded in from
+`DetectorStats`, per-detector calls and latency histograms. Its memory is
+constant per distinct reason and detector however many results it sees.
+
+Accumulators for separate shards, threads or processes combine with
+`merge`. They pickle, and `to_dict` / `from_dict` give a JSON form for
+shipping state between machines. `write` streams the JSON or HTML report to
+a text file; without ``details`` the output is exactly what
+`generate_report` returns for the same results.
+"""
+
+from __future__ import annotations
+
+import html
+import io
+import json
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    TextIO,
+)
+
+from .stats import LATENCY_BUCKETS
+
+if TYPE_CHECKING:
+    from .detector import Detection
+    from .stats import DetectorStats
+
+_BOUNDS = LATENCY_BUCKETS + (float("inf"),)
+_DETECTOR_COLUMNS = (
+    "calls",
+    "fired",
+    "skipped",
+    "total_ms",
+    "mean_us",
+    "p50_us",
+    "p95_us",
+    "p99_us",
+)
+
+
+class _Latency:
+    """Counters and latency histogram (`stats.LATENCY_BUCKETS`) of a detector."""
+
+    __slots__ = ("calls", "fired", "skipped", "total_s", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fired = 0
+        self.skipped = 0
+        self.total_s = 0.0
+        self.buckets = [0] * len(_BOUNDS)  # last one is +Inf
+
+    def merge(self, other: "_Latency") -> None:
+        self.calls += other.calls
+        self.fired += other.fired
+        self.skipped += other.skipped
+        self.total_s += other.total_s
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile_us(self, pct: float) -> float | None:
+        """Upper bound of the bucket holding the percentile (None if +Inf)."""
+        if not self.calls:
+            return 0.0
+        rank = max(1, round(pct / 100.0 * self.calls))
+        running = 0
+        for bound, count in zip(_BOUNDS, self.buckets):
+            running += count
+            if running >= rank:
+                break
+        return None if bound == float("inf") else round(bound * 1e6, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        calls = self.calls
+        return {
+            "calls": calls,
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "total_ms": round(self.total_s * 1000.0, 3),
+            "mean_us": round(self.total_s / calls * 1e6, 3) if calls else 0.0,
+            "p50_us": self.percentile_us(50),
+            "p95_us": self.percentile_us(95),
+            "p99_us": self.percentile_us(99),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "fired": self.fired,
+            "skipped": self.skipped,
+            "total_s": self.total_s,
+            "buckets": list(self.buckets),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_Latency":
+        entry = cls()
+        entry.calls = int(data["calls"])
+        entry.fired = int(data["fired"])
+        entry.skipped = int(data["skipped"])
+        entry.total_s = float(data["total_s"])
+        buckets = [int(n) for n in data["buckets"]]
+        if len(buckets) != len(_BOUNDS):
+            raise ValueError("latency histogram does not match LATENCY_BUCKETS")
+        entry.buckets = buckets
+        return entry
+
+
+def _length_label(index: int) -> str:
+    # Bucket ``index`` holds lengths whose bit_length is ``index``
+    if index < 2:
+        return str(index)
+    return f"{1 << (index - 1)}-{(1 << index) - 1}"
+
+
+class ReportAccumulator:
+    """Report counters updated one result at a time; see the module docs."""
+
+    __slots__ = ("total", "ok", "warn", "block", "reasons", "lengths", "detectors")
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.ok = 0
+        self.warn = 0  # failed with severity "warn"
+        self.block = 0  # severity "block"
+        self.reasons: Dict[str, int] = {}
+        # lengths[i] counts texts whose length has bit_length i: 0, 1, 2-3, ...
+        self.lengths: List[int] = []
+        self.detectors: Dict[str, _Latency] = {}
+
+    def add(
+        self, result: "Detection", length: int | None = None, *, count: int = 1
+    ) -> None:
+        """Count ``count`` copies of a result (and of its text's length)."""
+        self.total += count
+        if result.ok:
+            self.ok += count
+        elif result.severity == "warn":
+            self.warn += count
+        if result.severity == "block":
+            self.block += count
+        reasons = self.reasons
+        for reason in result.reasons:
+            reasons[reason] = reasons.get(reason, 0) + count
+        if length is not None:
+            self.add_length(length, count)
+
+    def add_length(self, length: int, count: int = 1) -> None:
+        index = length.bit_length()
+        lengths = self.lengths
+        if index >= len(lengths):
+            lengths.extend([0] * (index + 1 - len(lengths)))
+        lengths[index] += count
+
+    def add_all(
+        self,
+        results: Iterable["Detection"],
+        texts: Iterable[str] | None = None,
+    ) -> "ReportAccumulator":
+        """`add` every result (with the lengths of ``texts``); returns self."""
+        if texts is not None:
+            for result, text in zip(results, texts):
+                self.add(result, len(text))
+            return self
+        # `add` inlined: this is the loop behind `generate_report`
+        total = ok = warn = block = 0
+        reasons = self.reasons
+        get = reasons.get
+        for result in results:
+            total += 1
+            severity = result.severity
+            if result.ok:
+                ok += 1
+            elif severity == "warn":
+                warn += 1
+            if severity == "block":
+                block += 1
+            for reason in result.reasons:
+                reasons[reason] = get(reason, 0) + 1
+        self.total += total
+        self.ok += ok
+        self.warn += warn
+        self.block += block
+        return self
+
+    def add_stats(self, stats: "DetectorStats") -> "ReportAccumulator":
+        """Fold in the per-detector counters of ``stats``; returns self.
+
+        Add each `DetectorStats` once, when its shard is done: its counters
+        are cumulative.
+        """
+        detectors = stats.snapshot()["detectors"]
+        for name, d in detectors.items():
+            entry = _Latency()
+            entry.calls = d["calls"]
+            entry.fired = d["fired"]
+            entry.skipped = d["skipped"]
+            entry.total_s = d["total_ms"] / 1000.0
+            previous = 0
+            for i, running in enumerate(d["latency_buckets"].values()):
+                entry.buckets[i] = running - previous
+                previous = running
+            self._merge_detector(name, entry)
+        return self
+
+    def _merge_detector(self, name: str, entry: _Latency) -> None:
+        mine = self.detectors.get(name)
+        if mine is None:
+            mine = self.detectors[name] = _Latency()
+        mine.merge(entry)
+
+    def merge(self, other: "ReportAccumulator") -> "ReportAccumulator":
+        """Add the counts of ``other`` (e.g. another shard); returns self."""
+        self.total += other.total
+        self.ok += other.ok
+        self.warn += other.warn
+        self.block += other.block
+        reasons = self.reasons
+        for reason, count in other.reasons.items():
+            reasons[reason] = reasons.get(reason, 0) + count
+        if len(other.lengths) > len(self.lengths):
+            self.lengths.extend([0] * (len(other.lengths) - len(self.lengths)))
+        for i, count in enumerate(other.lengths):
+            self.lengths[i] += count
+        for name, entry in other.detectors.items():
+            self._merge_detector(name, entry)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable state; `from_dict` restores it."""
+        return {
+            "total": self.total,
+            "ok": self.ok,
+            "warn": self.warn,
+            "block": self.block,
+            "reasons": dict(self.reasons),
+            "lengths": list(self.lengths),
+            "detectors": {n: e.to_dict() for n, e in self.detectors.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReportAccumulator":
+        acc = cls()
+        acc.total = int(data["total"])
+        acc.ok = int(data["ok"])
+        acc.warn = int(data["warn"])
+        acc.block = int(data["block"])
+        acc.reasons = {str(k): int(v) for k, v in data["reasons"].items()}
+        acc.lengths = [int(n) for n in data.get("lengths", [])]
+        acc.detectors = {
+            str(name): _Latency.from_dict(entry)
+            for name, entry in data.get("detectors", {}).items()
+        }
+        return acc
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        restored = ReportAccumulator.from_dict(state)
+        for name in self.__slots__:
+            setattr(self, name, getattr(restored, name))
+
+    def length_histogram(self) -> Dict[str, int]:
+        return {_length_label(i): n for i, n in enumerate(self.lengths) if n}
+
+    def summary(
+        self, *, dedup: Dict[str, Any] | None = None, details: bool = False
+    ) -> Dict[str, Any]:
+        """The report as a dict (the `generate_report` keys, then details)."""
+        report: Dict[str, Any] = {
+            "total_texts": self.total,
+            "ok": self.ok,
+            "warn": self.warn,
+            "block": self.block,
+            "reason_counts": self.reasons,
+        }
+        if dedup is not None:
+            report["dedup"] = dedup
+        if details:
+            report["length_histogram"] = self.length_histogram()
+            report["detectors"] = {
+                name: entry.summary() for name, entry in self.detectors.items()
+            }
+        return report
+
+    def write(
+        self,
+        out: TextIO,
+        format: str = "json",
+        *,
+        dedup: Dict[str, Any] | None = None,
+        details: bool = False,
+    ) -> None:
+        """Stream the report to ``out`` (``format`` "html", otherwise JSON)."""
+        if format != "html":
+            encoder = json.JSONEncoder(indent=2)
+            for chunk in encoder.iterencode(self.summary(dedup=dedup, details=details)):
+                out.write(chunk)
+            return
+        out.write(
+            f"<h1>Report</h1><p>Total {self.total}, OK {self.ok}, "
+            f"Warn {self.warn}, Block {self.block}</p><ul>"
+        )
+        for reason, count in self.reasons.items():
+            out.write(f"<li>{html.escape(reason)}: {count}</li>")
+        out.write("</ul>")
+        if dedup is not None:
+            out.write(
+                f"<p>Unique {dedup['unique']}, Duplicates {dedup['duplicates']}"
+                f" ({dedup['ratio']:.1%})</p>"
+            )
+        if details:
+            self._write_html_details(out)
+
+    def _write_html_details(self, out: TextIO) -> None:
+        out.write("<h2>Text lengths</h2><table><tr><th>chars</th><th>texts</th></tr>")
+        for label, count in self.length_histogram().items():
+            out.write(f"<tr><td>{label}</td><td>{count}</td></tr>")
+        out.write("</table>")
+        if not self.detectors:
+            return
+        out.write("<h2>Detectors</h2><table><tr><th>detector</th>")
+        out.write("".join(f"<th>{c}</th>" for c in _DETECTOR_COLUMNS))
+        out.write("</tr>")
+        for name, entry in self.detectors.items():
+            row = entry.summary()
+            cells = "".join(
+                f"<td>{'&gt;1s' if row[c] is None else row[c]}</td>"
+                for c in _DETECTOR_COLUMNS
+            )
+            out.write(f"<tr><td>{html.escape(name)}</td>{cells}</tr>")
+        out.write("</table>")
+
+    def render(
+        self,
+        format: str = "json",
+        *,
+        dedup: Dict[str, Any] | None = None,
+        details: bool = False,
+    ) -> str:
+        """`write` into a string."""
+        out = io.StringIO()
+        self.write(out, format, dedup=dedup, details=details)
+        return out.getvalue()
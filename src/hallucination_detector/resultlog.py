@@ -0,0 +1,458 @@
+"""Append-only binary log of detection results.
+
+`ResultLogWriter` (behind ``hd detect --batch --out``) appends results to a
+file that `ResultLog` memory-maps and reads back without parsing JSON
+(``hd report``). The file starts with the 8-byte ``MAGIC``. Every record
+after it is a little-endian ``uint32`` size (the bytes after that field), a
+kind byte and a payload:
+
+    S  segment   (empty) a writer starts here; forget earlier IDs
+    N  name      UTF-8 reason name
+    D  result    flags u8 (bit 0 ok, bits 1-2 severity, bit 3 patches),
+                 count u16, reason IDs u32 x count,
+                 [u32 length + compact JSON patches]
+    B  block     (result ID u32, text length u32) x n
+    K  keyed     result ID u32, text length u32, UTF-8 key
+
+Names and results are interned per segment, with IDs counting from 0 in
+the order their records appear, always before first use. A writer defines
+each distinct result (reasons, severity and patches) once and logs each
+text as 8 bytes in a block, or as a keyed record when it has a key. A text
+length of 0xFFFFFFFF means unknown. Each writer starts a segment, so later
+runs append to a log without knowing its IDs. A torn last record (a crash
+mid-write) is ignored.
+
+Because blocks are fixed-width, `ResultLog.aggregate` counts their
+``(result ID, length)`` entries as 64-bit integers with a
+`collections.Counter` straight from the mapped bytes, then feeds each
+distinct entry to a `ReportAccumulator` once. Filters on severity, reasons
+and ok are decided once per result ID; a key prefix filter reads records
+one by one.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from itertools import repeat
+from typing import (
+    Any,
+    BinaryIO,
+    Collection,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Tuple,
+)
+
+from .dedup import _copy
+from .detector import Detection, Severity
+from .report import ReportAccumulator
+
+MAGIC = b"HDRLOG\x00\x01"
+
+_HEAD = struct.Struct("<IB")  # record size and kind
+_DEFINITION = struct.Struct("<BH")
+_U32 = struct.Struct("<I")
+_ENTRY = struct.Struct("<II")
+_SEGMENT, _NAME, _RESULT, _BLOCK, _KEYED = b"SNDBK"
+_NO_LENGTH = 0xFFFFFFFF
+_MAX_REASONS = 0xFFFF
+_BLOCK_ENTRIES = 8192
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+_OK = 0x01
+_PATCHES = 0x08
+_SEVERITIES: Tuple[Severity, ...] = ("info", "warn", "block")
+_CODES: Dict[str, int] = {s: i for i, s in enumerate(_SEVERITIES)}
+
+
+class ResultLogError(ValueError):
+    """The file is not a result log, or has a malformed or dangling record."""
+
+
+class LogRecord(NamedTuple):
+    result: Detection
+    key: str | None
+    length: int | None
+
+
+def _check_magic(header: bytes, path: str) -> None:
+    if header != MAGIC:
+        raise ResultLogError(f"{path}: not a result log")
+
+
+def _scan(buf: Any) -> Iterator[Tuple[int, int, int]]:
+    """``(kind, start, stop)`` of every whole record's payload in ``buf``."""
+    end = len(buf)
+    pos = len(MAGIC)
+    unpack = _HEAD.unpack_from
+    while pos + _HEAD.size <= end:
+        size, kind = unpack(buf, pos)
+        stop = pos + 4 + size
+        if size < 1 or stop > end:
+            return  # torn tail
+        yield kind, pos + _HEAD.size, stop
+        pos = stop
+
+
+def _whole_size(path: str) -> int:
+    """Bytes of ``path`` up to the end of its last whole record."""
+    with open(path, "rb") as f:
+        _check_magic(f.read(len(MAGIC)), path)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            end = len(MAGIC)
+            for _, _, end in _scan(buf):
+                pass
+            return end
+
+
+def _patches_key(patches: Dict[str, Any] | None) -> Hashable:
+    if not patches:
+        return None
+    key = tuple(patches.items())
+    try:
+        hash(key)
+    except TypeError:  # list values, e.g. missing_fields
+        return json.dumps(patches, sort_keys=True)
+    return key
+
+
+class ResultLogWriter:
+    """Append results to the log at ``path`` (created if missing).
+
+    Use as a context manager, or `close` when done: texts are buffered and
+    written a block at a time.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path):
+            # Drop a torn record left by a crash: the reader would otherwise
+            # read its claimed size across the segment appended here
+            end = _whole_size(path)
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+        self._file: BinaryIO = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._file.write(_HEAD.pack(1, _SEGMENT))
+        self._names: Dict[str, int] = {}
+        self._results: Dict[Tuple[Any, ...], int] = {}
+        self._pending = array("I")
+
+    def _define(self, result: Detection) -> int:
+        key = (
+            result.ok,
+            result.severity,
+            tuple(result.reasons),
+            _patches_key(result.patches),
+        )
+        found = self._results.get(key)
+        if found is not None:
+            return found
+        reasons = result.reasons
+        if len(reasons) > _MAX_REASONS:
+            raise ValueError(f"a logged result holds at most {_MAX_REASONS} reasons")
+        write = self._file.write
+        names = self._names
+        for reason in reasons:
+            if reason not in names:
+                names[reason] = len(names)
+                name = reason.encode("utf-8")
+                write(_HEAD.pack(1 + len(name), _NAME) + name)
+        flags = (_OK if result.ok else 0) | _CODES[result.severity] << 1
+        if result.patches:
+            flags |= _PATCHES
+        payload = _DEFINITION.pack(flags, len(reasons)) + struct.pack(
+            f"<{len(reasons)}I", *(names[r] for r in reasons)
+        )
+        if result.patches:
+            data = json.dumps(
+                result.patches, separators=(",", ":"), ensure_ascii=False
+            ).encode("utf-8")
+            payload += _U32.pack(len(data)) + data
+        write(_HEAD.pack(1 + len(payload), _RESULT) + payload)
+        found = self._results[key] = len(self._results)
+        return found
+
+    def write(
+        self, result: Detection, *, key: str | None = None, length: int | None = None
+    ) -> None:
+        """Append ``result``, with an optional key and text length."""
+        rid = self._define(result)
+        chars = _NO_LENGTH if length is None else min(length, _NO_LENGTH - 1)
+        if key is None:
+            pending = self._pending
+            pending.append(rid)
+            pending.append(chars)
+            if len(pending) >= 2 * _BLOCK_ENTRIES:
+                self._write_block()
+            return
+        self._write_block()  # keep file order
+        data = _ENTRY.pack(rid, chars) + key.encode("utf-8")
+        self._file.write(_HEAD.pack(1 + len(data), _KEYED) + data)
+
+    def write_all(
+        self,
+        results: Iterable[Detection],
+        texts: Iterable[str] | None = None,
+    ) -> None:
+        """`write` every result (with the lengths of ``texts``)."""
+        # `write` without keys, inlined
+        define = self._define
+        lengths: Iterable[int | None] = (
+            repeat(None) if texts is None else map(len, texts)
+        )
+        pending = self._pending
+        for result, length in zip(results, lengths):
+            pending.append(define(result))
+            pending.append(
+                _NO_LENGTH if length is None else min(length, _NO_LENGTH - 1)
+            )
+            if len(pending) >= 2 * _BLOCK_ENTRIES:
+                self._write_block()
+                pending = self._pending
+
+    def _write_block(self) -> None:
+        pending = self._pending
+        if not pending:
+            return
+        if not _LITTLE_ENDIAN:
+            pending.byteswap()
+        data = pending.tobytes()
+        self._file.write(_HEAD.pack(1 + len(data), _BLOCK) + data)
+        self._pending = array("I")
+
+    def flush(self) -> None:
+        self._write_block()
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._write_block()
+            self._file.close()
+
+    def __enter__(self) -> "ResultLogWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _matches(
+    result: Detection,
+    min_severity: int,
+    reasons: Collection[str] | None,
+    failed: bool,
+) -> bool:
+    if failed and result.ok:
+        return False
+    if _CODES[result.severity] < min_severity:
+        return False
+    if reasons is not None and not any(r in reasons for r in result.reasons):
+        return False
+    return True
+
+
+class ResultLog:
+    """A result log opened for reading (memory-mapped).
+
+    Iterating yields a `LogRecord` per logged text. `records` and
+    `aggregate` take the same filters: ``min_severity`` (keep results at
+    least this severe), ``reasons`` (keep results with any of them),
+    ``failed`` (keep only results that are not ok) and ``key_prefix``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            _check_magic(f.read(len(MAGIC)), path)
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        self._buf.close()
+
+    def __enter__(self) -> "ResultLog":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        return self.records()
+
+    def _scan(self) -> Iterator[Tuple[int, int, int]]:
+        return _scan(self._buf)
+
+    def _damaged(self, start: int, error: object) -> ResultLogError:
+        offset = start - _HEAD.size
+        return ResultLogError(f"{self.path}: bad record at offset {offset}: {error}")
+
+    def _result(self, names: List[str], start: int, stop: int) -> Detection:
+        payload = self._buf[start:stop]
+        try:
+            flags, count = _DEFINITION.unpack_from(payload)
+            at = _DEFINITION.size
+            ids = struct.unpack_from(f"<{count}I", payload, at)
+            patches = None
+            if flags & _PATCHES:
+                at += 4 * count
+                (n,) = _U32.unpack_from(payload, at)
+                if at + 4 + n > len(payload):
+                    raise ValueError("patches run past the record")
+                patches = json.loads(payload[at + 4 : at + 4 + n])
+                if not isinstance(patches, dict):
+                    raise ValueError("patches are not an object")
+        except (struct.error, ValueError) as e:  # incl. UnicodeDecodeError
+            raise self._damaged(start, e) from None
+        if any(i >= len(names) for i in ids):
+            raise ResultLogError(f"{self.path}: undefined reason ID")
+        return Detection(
+            bool(flags & _OK),
+            [names[i] for i in ids],
+            _SEVERITIES[flags >> 1 & 3],
+            patches,
+        )
+
+    def _text(self, start: int, stop: int, skip: int = 0) -> str:
+        try:
+            return self._buf[start + skip : stop].decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise self._damaged(start, e) from None
+
+    def _entries(self, start: int, stop: int) -> bytes:
+        if (stop - start) % _ENTRY.size:
+            raise self._damaged(start, "block size is not a multiple of 8")
+        return self._buf[start:stop]
+
+    def _entry(self, start: int, stop: int) -> Tuple[int, int]:
+        if stop - start < _ENTRY.size:
+            raise self._damaged(start, "keyed record too short")
+        rid, chars = _ENTRY.unpack_from(self._buf, start)
+        return rid, chars
+
+    def _check(self, results: List[Detection], rid: int) -> None:
+        if rid >= len(results):
+            raise ResultLogError(f"{self.path}: undefined result ID {rid}")
+
+    def records(
+        self,
+        *,
+        min_severity: str | None = None,
+        reasons: Collection[str] | None = None,
+        failed: bool = False,
+        key_prefix: str | None = None,
+    ) -> Iterator[LogRecord]:
+        """The matching records, in file order, patches included."""
+        minimum = _CODES[min_severity] if min_severity else 0
+        names: List[str] = []
+        results: List[Detection] = []
+        keep: List[bool] = []
+        for kind, start, stop in self._scan():
+            if kind == _BLOCK:
+                if key_prefix is not None:
+                    continue
+                for rid, chars in _ENTRY.iter_unpack(self._entries(start, stop)):
+                    self._check(results, rid)
+                    if keep[rid]:
+                        length = None if chars == _NO_LENGTH else chars
+                        yield LogRecord(_copy(results[rid]), None, length)
+            elif kind == _KEYED:
+                rid, chars = self._entry(start, stop)
+                self._check(results, rid)
+                key = self._text(start, stop, _ENTRY.size)
+                if keep[rid] and (key_prefix is None or key.startswith(key_prefix)):
+                    length = None if chars == _NO_LENGTH else chars
+                    yield LogRecord(_copy(results[rid]), key, length)
+            elif kind == _RESULT:
+                results.append(self._result(names, start, stop))
+                keep.append(_matches(results[-1], minimum, reasons, failed))
+            elif kind == _NAME:
+                names.append(self._text(start, stop))
+            elif kind == _SEGMENT:
+                names, results, keep = [], [], []
+
+    def aggregate(
+        self,
+        acc: ReportAccumulator | None = None,
+        *,
+        min_severity: str | None = None,
+        reasons: Collection[str] | None = None,
+        failed: bool = False,
+        key_prefix: str | None = None,
+    ) -> ReportAccumulator:
+        """Add the matching results (and lengths) to ``acc``; returns it."""
+        acc = ReportAccumulator() if acc is None else acc
+        if key_prefix is not None:
+            for record in self.records(
+                min_severity=min_severity,
+                reasons=reasons,
+                failed=failed,
+                key_prefix=key_prefix,
+            ):
+                acc.add(record.result, record.length)
+            return acc
+        minimum = _CODES[min_severity] if min_severity else 0
+        names: List[str] = []
+        results: List[Detection] = []
+        # Entries packed as one int, ``rid | chars << 32``: cheaper to count
+        counts: Counter[int] = Counter()
+        for kind, start, stop in self._scan():
+            if kind == _BLOCK:
+                block = self._entries(start, stop)
+                if _LITTLE_ENDIAN:
+                    counts.update(memoryview(block).cast("Q"))
+                else:
+                    entries = _ENTRY.iter_unpack(block)
+                    counts.update(rid | chars << 32 for rid, chars in entries)
+            elif kind == _KEYED:
+                rid, chars = self._entry(start, stop)
+                counts[rid | chars << 32] += 1
+            elif kind == _RESULT:
+                results.append(self._result(names, start, stop))
+            elif kind == _NAME:
+                names.append(self._text(start, stop))
+            elif kind == _SEGMENT:
+                self._add_counts(acc, counts, results, minimum, reasons, failed)
+                names, results = [], []
+                counts.clear()
+        self._add_counts(acc, counts, results, minimum, reasons, failed)
+        return acc
+
+    def _add_counts(
+        self,
+        acc: ReportAccumulator,
+        counts: Counter[int],
+        results: List[Detection],
+        minimum: int,
+        reasons: Collection[str] | None,
+        failed: bool,
+    ) -> None:
+        # Distinct entries can run to thousands per segment: fold them into
+        # per-result totals and length buckets, then add those
+        totals = [0] * len(results)
+        keep = [_matches(r, minimum, reasons, failed) for r in results]
+        buckets: Dict[int, int] = {}
+        for packed, n in counts.items():
+            rid = packed & 0xFFFFFFFF
+            if rid >= len(totals):
+                raise ResultLogError(f"{self.path}: undefined result ID {rid}")
+            totals[rid] += n
+            chars = packed >> 32
+            if keep[rid] and chars != _NO_LENGTH:
+                index = chars.bit_length()
+                buckets[index] = buckets.get(index, 0) + n
+        for rid, n in enumerate(totals):
+            if n and keep[rid]:
+                acc.add(results[rid], count=n)
+        for index, n in buckets.items():
+            acc.add_length((1 << index) >> 1, n)  # a length in bucket ``index``
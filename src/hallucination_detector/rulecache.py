@@ -0,0 +1,155 @@
+"""Compiled rule-set cache and hot reload for custom rule files.
+
+`load_cached` (used by ``load_custom_rules``) keeps compiled rule sets in
+memory keyed by absolute path and file stamp (mtime, size, inode), so an
+unchanged file is never re-read. When the stamp changes the file is hashed;
+identical content reuses the compiled rules. Parsed YAML, the slow part for
+large rule files, is also cached on disk by SHA-256 of the content (see
+``_cache.cache_dir``), so later processes skip PyYAML entirely.
+
+`RuleFileWatcher` lets long-running modes (``hd serve``, ``hd worker``)
+notice edits: `poll` stats the file at most once per ``interval`` and
+returns the new rule set when it changed. Callers swap it in atomically;
+requests already running keep the rule set they started with.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from ._cache import cache_dir, read_json, write_json
+from .detector import (
+    Detection,
+    UnsafePatternPolicy,
+    _compile_rules,
+    _is_yaml,
+    _parse_rules,
+    load_custom_rules,
+)
+
+Stamp = Tuple[int, int, int]
+Rules = Tuple[Callable[[str], Detection], ...]
+
+# Bumped whenever the on-disk representation changes
+_DISK_FORMAT = 1
+
+_MEMORY: Dict[str, Tuple[Stamp, str, Rules]] = {}
+_COUNTS = {"hits": 0, "misses": 0}
+_LOCK = threading.Lock()
+
+
+def file_stamp(path: str) -> Stamp:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _disk_path(digest: str) -> str:
+    return os.path.join(cache_dir(), f"rules-v{_DISK_FORMAT}-{digest}.json")
+
+
+def _parse_with_disk_cache(data: bytes, path: str, digest: str) -> List[Dict[str, Any]]:
+    if not _is_yaml(path):
+        return _parse_rules(data, path)  # JSON parses as fast as the cache would
+    cached = read_json(_disk_path(digest))
+    if isinstance(cached, list):
+        return cached
+    rules = _parse_rules(data, path)
+    write_json(_disk_path(digest), rules)
+    return rules
+
+
+def load_cached(path: str) -> List[Callable[[str], Detection]]:
+    """Compiled detectors for ``path``, reusing earlier work when possible."""
+    key = os.path.abspath(path)
+    stamp = file_stamp(key)
+    entry = _MEMORY.get(key)
+    if entry is not None and entry[0] == stamp:
+        with _LOCK:
+            _COUNTS["hits"] += 1
+        return list(entry[2])
+    with open(key, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    hit = False
+    if entry is not None and entry[1] == digest:
+        hit, rules = True, entry[2]  # touched but unchanged
+    else:
+        rules = tuple(_compile_rules(_parse_with_disk_cache(data, key, digest)))
+    with _LOCK:
+        _MEMORY[key] = (stamp, digest, rules)
+        _COUNTS["hits" if hit else "misses"] += 1
+    return list(rules)
+
+
+def rule_cache_info() -> Dict[str, int]:
+    """Hits, misses (since start) and current size of the in-memory cache."""
+    with _LOCK:
+        return {**_COUNTS, "size": len(_MEMORY)}
+
+
+def clear_rule_cache() -> None:
+    """Forget compiled rule sets held in memory (the disk cache is kept)."""
+    with _LOCK:
+        _MEMORY.clear()
+
+
+class RuleFileWatcher:
+    """Detect changes to a rule file and load the new rule set."""
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 1.0,
+        unsafe_patterns: UnsafePatternPolicy = "warn",
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self.unsafe_patterns = unsafe_patterns
+        self.reloads = 0
+        self._stamp = self._current_stamp()
+        self._next_check = time.monotonic() + interval
+        self._lock = threading.Lock()
+
+    def _current_stamp(self) -> Stamp | None:
+        try:
+            return file_stamp(self.path)
+        except OSError:
+            return None
+
+    def poll(self) -> List[Callable[[str], Detection]] | None:
+        """New rules if the file changed since the last successful load.
+
+        Cheap to call on every request: it returns immediately until
+        ``interval`` has passed, and only one thread checks at a time. A file
+        that is missing or fails to load is reported on stderr and the
+        caller keeps its current rules.
+        """
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._next_check = now + self.interval
+            stamp = self._current_stamp()
+            if stamp is None or stamp == self._stamp:
+                return None
+            self._stamp = stamp
+            try:
+                rules = load_custom_rules(
+                    self.path, unsafe_patterns=self.unsafe_patterns
+                )
+            except Exception as e:
+                print(
+                    f"hd: keeping previous rules; reloading {self.path} failed: {e}",
+                    file=sys.stderr,
+                    flush=True,
+                )
+                return None
+            self.reloads += 1
+            return rules
+        finally:
+            self._lock.release()
@@ -0,0 +1,368 @@
+"""Long-running local detection server (``hd serve``).
+
+The server compiles the pipeline (registry checks, schema validator, custom
+rules) once at startup and answers requests over localhost HTTP or a Unix
+socket, so each detection only pays for the detectors themselves. It uses the
+standard library only and is meant to run as a sidecar next to an agent.
+
+Endpoints (JSON in, JSON out):
+
+- ``POST /detect`` with ``{"text": "..."}`` returns the same object as
+  ``hd detect``.
+- ``POST /detect/batch`` with ``{"texts": ["...", ...]}`` returns the same
+  list as ``hd detect --batch``.
+- ``GET /healthz`` returns ``{"ok": true, "pid": ...}``.
+- ``GET /metrics`` returns server counters, e.g. micro-batching statistics
+  and, when the service has a `DetectorStats`, per-detector counters;
+  ``GET /metrics?format=prometheus`` returns them in Prometheus text format.
+
+Malformed requests get ``400`` with ``{"error": "bad_request", "detail":
+...}``; a detector raising gets ``500`` with ``"error": "internal_error"``.
+
+With ``batch_window_ms > 0`` concurrent ``/detect`` requests are grouped by a
+`MicroBatcher` into one batch run (see ``batching.py``).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .batching import MicroBatcher
+from .detector import Detection, UnsafePatternPolicy
+from .largeinput import MaxInputPolicy, run_limited
+from .pipeline import Pipeline
+from .rulecache import RuleFileWatcher
+from .stats import DetectorStats
+
+_COMPACT = (",", ":")
+
+
+class DetectionService:
+    """A warm, immutable `Pipeline` shared by all requests.
+
+    Pass either a prebuilt ``pipeline`` or the `detect_text` arguments.
+    """
+
+    def __init__(
+        self,
+        checks: Sequence[Callable[[str], Detection]] | None = None,
+        skip_json: bool = False,
+        custom_rules: Sequence[Callable[[str], Detection]] | None = None,
+        *,
+        batch_window_ms: float = 0.0,
+        max_batch_size: int = 64,
+        adaptive_batching: bool = True,
+        stats: DetectorStats | None = None,
+        pipeline: Pipeline | None = None,
+        rules_path: str | None = None,
+        reload_interval: float = 0.0,
+        unsafe_patterns: UnsafePatternPolicy = "warn",
+        time_budget_ms: float | None = None,
+        max_input_bytes: int | None = None,
+        max_input_policy: MaxInputPolicy = "reject",
+        max_request_bytes: int | None = None,
+        dedup: bool = False,
+    ) -> None:
+        if pipeline is None:
+            pipeline = Pipeline.from_checks(
+                checks, skip_json, custom_rules, time_budget_ms
+            )
+        self.pipeline = pipeline
+        self.checks = pipeline.checks
+        self.skip_json = pipeline.skip_json
+        # Edits to the rule file are picked up between requests; a request
+        # always runs on the pipeline it read when it started.
+        self.rules_watcher = (
+            RuleFileWatcher(rules_path, reload_interval, unsafe_patterns)
+            if rules_path and reload_interval > 0
+            else None
+        )
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+        self.adaptive_batching = adaptive_batching
+        self.stats = stats
+        # Per-text limit (see largeinput.py) and cap on raw request size
+        self.max_input_bytes = max_input_bytes
+        self.max_input_policy = max_input_policy
+        self.max_request_bytes = max_request_bytes
+        # Run identical texts of a batch once (see dedup.py)
+        self.dedup = dedup
+        # Started on first use so that no thread exists before a pre-fork
+        # server forks its workers (see prefork.py).
+        self.batcher: MicroBatcher | None = None
+        self._batcher_lock = threading.Lock()
+
+    @property
+    def custom_rules(self) -> Tuple[Callable[[str], Detection], ...] | None:
+        return self.pipeline.custom_rules
+
+    def _maybe_reload_rules(self) -> None:
+        watcher = self.rules_watcher
+        if watcher is not None:
+            rules = watcher.poll()
+            if rules is not None:
+                self.pipeline = self.pipeline.with_rules(
+                    rules, watcher.path, watcher.unsafe_patterns
+                )
+
+    def detect(self, text: str) -> Detection:
+        """Detect a single text, through the micro-batcher when enabled."""
+        self._maybe_reload_rules()
+        if self.batch_window_ms > 0:
+            return self._get_batcher().detect(text)
+        return self._detect(text)
+
+    def _get_batcher(self) -> MicroBatcher:
+        batcher = self.batcher
+        if batcher is None:
+            with self._batcher_lock:
+                if self.batcher is None:
+                    self.batcher = MicroBatcher(
+                        self.detect_many,
+                        window_ms=self.batch_window_ms,
+                        max_batch_size=self.max_batch_size,
+                        adaptive=self.adaptive_batching,
+                    )
+                batcher = self.batcher
+        return batcher
+
+    def _detect(self, text: str) -> Detection:
+        if self.max_input_bytes is not None:
+            return self._detect_limited([text])[0]
+        return self.pipeline.run(text, stats=self.stats)
+
+    def detect_many(self, texts: Sequence[str]) -> List[Detection]:
+        self._maybe_reload_rules()
+        if self.max_input_bytes is not None:
+            return self._detect_limited(texts)
+        return self.pipeline.run_batch(texts, stats=self.stats, dedup=self.dedup)
+
+    def _detect_limited(self, texts: Sequence[str]) -> List[Detection]:
+        def run_batch(kept: List[str]) -> List[Detection]:
+            return self.pipeline.run_batch(kept, stats=self.stats, dedup=self.dedup)
+
+        return run_limited(
+            texts, run_batch, self.max_input_bytes, self.max_input_policy
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "batching": self.batcher.stats() if self.batcher else None,
+            "detectors": self.stats.snapshot() if self.stats else None,
+        }
+
+    def prometheus(self) -> str:
+        from .metrics import render_prometheus
+
+        batching = self.batcher.stats() if self.batcher else None
+        return render_prometheus(self.stats, batching=batching)
+
+    def close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _parse_request(path: str, body: bytes) -> Any:
+    try:
+        payload = json.loads(body)
+    except ValueError:  # bad JSON, bad UTF-8 or an oversized integer
+        raise BadRequest("request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise BadRequest("request body must be a JSON object")
+    if path == "/detect":
+        text = payload.get("text")
+        if not isinstance(text, str):
+            raise BadRequest("'text' must be a string")
+        return text
+    texts = payload.get("texts")
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        raise BadRequest("'texts' must be a list of strings")
+    return texts
+
+
+class DetectionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: clients reuse one connection
+    server_version = "hd-serve"
+
+    server: DetectionHTTPServer
+
+    def setup(self) -> None:
+        super().setup()
+        if self.server.address_family in (socket.AF_INET, socket.AF_INET6):
+            # Headers and body are written separately; without this Nagle's
+            # algorithm adds tens of milliseconds per response.
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/healthz":
+            self._send_json(200, {"ok": True, "pid": os.getpid()})
+        elif url.path == "/metrics":
+            if parse_qs(url.query).get("format", [""])[-1] == "prometheus":
+                from .metrics import CONTENT_TYPE
+
+                data = self.server.service.prometheus().encode("utf-8")
+                self._send(200, CONTENT_TYPE, data)
+            else:
+                self._send_json(200, self.server.service.metrics())
+        else:
+            self._send_json(404, {"error": "not_found"})
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Where the body ends is unknown, so the connection cannot be reused
+            self.close_connection = True
+            detail = "Content-Length must be a non-negative integer"
+            self._send_json(400, {"error": "bad_request", "detail": detail})
+            return
+        limit = self.server.service.max_request_bytes
+        if limit is not None and length > limit:
+            # The body is never read, so the connection cannot be reused
+            self.close_connection = True
+            detail = f"request body exceeds {limit} bytes"
+            self._send_json(413, {"error": "too_large", "detail": detail})
+            return
+        body = self.rfile.read(length)
+        if self.path not in ("/detect", "/detect/batch"):
+            self._send_json(404, {"error": "not_found"})
+            return
+        try:
+            request = _parse_request(self.path, body)
+        except BadRequest as e:
+            self._send_json(400, {"error": "bad_request", "detail": str(e)})
+            return
+        service = self.server.service
+        try:
+            if self.path == "/detect":
+                payload: Any = service.detect(request).__dict__
+            else:
+                payload = [r.__dict__ for r in service.detect_many(request)]
+        except Exception as e:  # a failing detector must not drop the connection
+            self.log_error("detection failed: %r", e)
+            detail = f"{type(e).__name__}: {e}"
+            self._send_json(500, {"error": "internal_error", "detail": detail})
+            return
+        self._send_json(200, payload)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload, separators=_COMPACT).encode("utf-8")
+        self._send(status, "application/json", data)
+
+    def _send(self, status: int, content_type: str, data: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class DetectionHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Any,
+        service: DetectionService,
+        *,
+        verbose: bool = False,
+        bind_and_activate: bool = True,
+    ) -> None:
+        self.service = service
+        self.verbose = verbose
+        super().__init__(address, DetectionRequestHandler, bind_and_activate)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.service.close()
+
+    @property
+    def url(self) -> str:
+        host, port = self.socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+
+class UnixDetectionHTTPServer(DetectionHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def __init__(
+        self, path: str, service: DetectionService, *, verbose: bool = False
+    ) -> None:
+        self.socket_path = path
+        super().__init__(path, service, verbose=verbose)
+
+    def server_bind(self) -> None:
+        path = self.socket_path
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)  # stale socket from a previous run
+        socketserver.TCPServer.server_bind(self)
+        # HTTPServer.server_bind would resolve a host name; there is none here
+        self.server_name = "localhost"
+        self.server_port = 0
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    @property
+    def url(self) -> str:
+        return f"unix:{self.socket_path}"
+
+
+def make_server(
+    service: DetectionService,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    unix_socket: str | None = None,
+    verbose: bool = False,
+) -> DetectionHTTPServer:
+    if unix_socket:
+        return UnixDetectionHTTPServer(unix_socket, service, verbose=verbose)
+    return DetectionHTTPServer((host, port), service, verbose=verbose)
+
+
+def serve(server: DetectionHTTPServer) -> None:
+    """Run until interrupted (Ctrl-C or SIGTERM), then clean up."""
+    import signal
+
+    def _terminate(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    previous = signal.signal(signal.SIGTERM, _terminate)
+    print(f"hd serve listening on {server.url}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        server.server_close()
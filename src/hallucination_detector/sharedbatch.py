@@ -0,0 +1,279 @@
+"""Process-pool batches through shared memory.
+
+Submitting a batch to worker processes the usual way pickles every text on
+the way out and every `Detection` on the way back, and holds both copies in
+memory at once. `run_shared` (and `Pipeline.run_shared`) instead writes the
+batch once into a `multiprocessing.shared_memory` block:
+
+    offsets  int64 x (n + 1)   text i is data[offsets[i]:offsets[i + 1]]
+    masks    uint64 x n        reason bitmask of result i
+    codes    uint8 x n         severity code of result i
+    data     UTF-8 texts, back to back
+
+Each task names a range of records. The worker attaches to the block,
+decodes each text straight from a zero-copy slice of ``data``, runs it and
+writes a severity code and a reason bitmask per record into the same block.
+The only pickled traffic is the pipeline (by configuration), the range, and
+per task the table mapping bits to reasons and their patches.
+
+Bits are assigned per task: the built-in reasons come first in detector
+order, other reasons in the order the worker meets them. A reason's patches
+are learned from the first result that has only that reason. A result the
+code cannot reproduce exactly (reasons out of bit order, patches that vary
+like ``missing_fields``, more than 64 reasons) is marked and sent back
+pickled, so results are always those of `Pipeline.run_batch`.
+
+Texts that cannot be encoded as UTF-8 (lone surrogates) run in the calling
+process. Stats and tracing are not collected in workers.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from array import array
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import accumulate
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Sequence, Tuple
+
+from .dedup import _copy
+from .detector import Detection, Severity
+
+if TYPE_CHECKING:
+    from .pipeline import Pipeline
+
+_SEVERITIES: Tuple[Severity, ...] = ("info", "warn", "block")
+_CODES: Dict[str, int] = {s: i for i, s in enumerate(_SEVERITIES)}
+# Code of a record whose result comes back pickled
+_SPILLED = 0xFF
+_MAX_REASONS = 64
+
+# Reasons of the built-in guards, in the order `detect_text` reports them
+_BUILTIN_REASONS = (
+    "invalid_json",
+    "overconfident_no_citations",
+    "possible_contradiction",
+    "possible_logical_fallacy",
+    "unverified_fact",
+    "numeric_claims_without_citation",
+)
+
+_UNKNOWN: Any = object()  # patches not learned yet
+
+# Reasons in bit order, each with its patches (or None)
+ReasonTable = List[Tuple[str, Dict[str, Any] | None]]
+
+
+def _layout(count: int) -> Tuple[int, int, int]:
+    """Byte offsets of the masks, codes and data of a ``count``-record block."""
+    masks = (count + 1) * 8
+    codes = masks + count * 8
+    return masks, codes, codes + count
+
+
+class _Codec:
+    """Bit assignment of one task, built up as results are encoded."""
+
+    def __init__(self) -> None:
+        self.reasons: List[str] = list(_BUILTIN_REASONS)
+        self.patches: List[Any] = [_UNKNOWN] * len(self.reasons)
+        self.bits = {reason: bit for bit, reason in enumerate(self.reasons)}
+        self._decoded: Dict[Tuple[int, int], Detection] = {}
+
+    def encode(self, res: Detection) -> Tuple[int, int] | None:
+        """``(mask, code)`` that decodes to ``res``, or None."""
+        mask = 0
+        bit = -1
+        for reason in res.reasons:
+            found = self.bits.get(reason)
+            if found is None:
+                if len(self.reasons) == _MAX_REASONS:
+                    return None
+                found = self.bits[reason] = len(self.reasons)
+                self.reasons.append(reason)
+                self.patches.append(_UNKNOWN)
+            bit = found
+            mask |= 1 << bit
+        if len(res.reasons) == 1 and self.patches[bit] is _UNKNOWN:
+            self.patches[bit] = res.patches
+        code = _CODES[res.severity]
+        if self.decode(mask, code) != res:
+            return None
+        return mask, code
+
+    def decode(self, mask: int, code: int) -> Detection | None:
+        key = (mask, code)
+        found = self._decoded.get(key)
+        if found is None:
+            found = _decode(list(zip(self.reasons, self.patches)), mask, code)
+            if found is not None:
+                self._decoded[key] = found
+        return found
+
+    def table(self) -> ReasonTable:
+        """The table to send back; bits without patches never reach a mask."""
+        patches = (None if p is _UNKNOWN else p for p in self.patches)
+        return list(zip(self.reasons, patches))
+
+
+def _decode(table: Sequence[Tuple[str, Any]], mask: int, code: int) -> Detection | None:
+    reasons = []
+    patches: Dict[str, Any] = {}
+    bit = 0
+    while mask >> bit:
+        if mask >> bit & 1:
+            reason, extra = table[bit]
+            if extra is _UNKNOWN:
+                return None
+            reasons.append(reason)
+            if extra:
+                patches.update(extra)
+        bit += 1
+    return Detection(not reasons, reasons, _SEVERITIES[code], patches or None)
+
+
+# Whether this process attached with a resource tracker of its own
+_OWN_TRACKER: bool | None = None
+
+
+def _attach(name: str) -> SharedMemory:
+    """Open block ``name``, which the creating process owns and unlinks."""
+    global _OWN_TRACKER
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)
+    from multiprocessing import resource_tracker
+
+    if _OWN_TRACKER is None:
+        # A worker forked before the parent started its tracker starts one
+        # of its own on attach, which would unlink the block when the
+        # worker exits; a tracker shared with the parent ignores repeats
+        tracker = resource_tracker._resource_tracker
+        _OWN_TRACKER = tracker._fd is None  # type: ignore[attr-defined]
+    shm = SharedMemory(name)
+    if _OWN_TRACKER:
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    return shm
+
+
+def _view(shm: SharedMemory) -> memoryview:
+    buf = shm.buf
+    assert buf is not None  # only None once closed
+    return buf
+
+
+def _run_chunk(
+    pipeline: "Pipeline", name: str, count: int, start: int, stop: int
+) -> Tuple[ReasonTable, Dict[int, Detection]]:
+    """Worker side: run records ``start:stop`` and write their codes."""
+    masks_at, codes_at, data_at = _layout(count)
+    codec = _Codec()
+    masks = array("Q", bytes(8 * (stop - start)))
+    codes = bytearray(stop - start)
+    spilled: Dict[int, Detection] = {}
+    shm = _attach(name)
+    try:
+        buf = _view(shm)
+        with buf[:masks_at] as raw, raw.cast("q") as offsets:
+            with buf[data_at:] as data:
+                for i in range(start, stop):
+                    with data[offsets[i] : offsets[i + 1]] as text:
+                        res = pipeline.run(str(text, "utf-8"))
+                    packed = codec.encode(res)
+                    if packed is None:
+                        spilled[i] = res
+                        codes[i - start] = _SPILLED
+                    else:
+                        masks[i - start], codes[i - start] = packed
+        buf[masks_at + start * 8 : masks_at + stop * 8] = masks.tobytes()
+        buf[codes_at + start : codes_at + stop] = codes
+    finally:
+        shm.close()
+    return codec.table(), spilled
+
+
+def _chunk_size(count: int) -> int:
+    # A few tasks per CPU balances the load; at most 10K records per task
+    # keeps the tables and spilled results per reply small
+    tasks = 4 * (os.cpu_count() or 1)
+    return max(1, min(10_000, -(-count // tasks)))
+
+
+def run_shared(
+    pipeline: "Pipeline",
+    texts: Iterable[str],
+    executor: Executor | None = None,
+    *,
+    chunk_size: int | None = None,
+) -> List[Detection]:
+    """`Pipeline.run_batch` in worker processes, through shared memory.
+
+    ``executor`` is typically a `ProcessPoolExecutor`; without one a pool
+    is started for this call. ``chunk_size`` is the number of records per
+    task.
+    """
+    texts = texts if isinstance(texts, list) else list(texts)
+    count = len(texts)
+    if not count:
+        return []
+    encoded: List[bytes] = []
+    local: List[int] = []
+    for i, text in enumerate(texts):
+        try:
+            encoded.append(text.encode("utf-8"))
+        except UnicodeEncodeError:
+            encoded.append(b"")
+            local.append(i)
+    offsets = array("q", accumulate(map(len, encoded), initial=0))
+    masks_at, codes_at, data_at = _layout(count)
+    shm = SharedMemory(create=True, size=data_at + offsets[-1])
+    try:
+        buf = _view(shm)
+        buf[:masks_at] = offsets.tobytes()
+        pos = data_at
+        for data in encoded:
+            buf[pos : pos + len(data)] = data
+            pos += len(data)
+        del encoded
+        size = chunk_size or _chunk_size(count)
+        pool = executor if executor is not None else ProcessPoolExecutor()
+        try:
+            tasks: List[Tuple[int, int, Future[Any]]] = []
+            for start in range(0, count, size):
+                stop = min(start + size, count)
+                future = pool.submit(_run_chunk, pipeline, shm.name, count, start, stop)
+                tasks.append((start, stop, future))
+            replies = [(start, stop, future.result()) for start, stop, future in tasks]
+        finally:
+            if executor is None:
+                pool.shutdown()
+        with buf[masks_at:codes_at] as raw, raw.cast("Q") as masks:
+            with buf[codes_at:data_at] as codes:
+                results = _collect(replies, masks, codes)
+    finally:
+        shm.close()
+        shm.unlink()
+    for i in local:
+        results[i] = pipeline.run(texts[i])
+    return results
+
+
+def _collect(
+    replies: Sequence[Tuple[int, int, Tuple[ReasonTable, Dict[int, Detection]]]],
+    masks: Any,
+    codes: Any,
+) -> List[Detection]:
+    results: List[Detection] = []
+    for start, stop, (table, spilled) in replies:
+        decoded: Dict[Tuple[int, int], Detection | None] = {}
+        for i in range(start, stop):
+            code = codes[i]
+            if code == _SPILLED:
+                results.append(spilled[i])
+                continue
+            key = (masks[i], code)
+            res = decoded.get(key)
+            if res is None:
+                res = decoded[key] = _decode(table, *key)
+            results.append(_copy(res))  # type: ignore[arg-type]
+    return results
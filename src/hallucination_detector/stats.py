@@ -0,0 +1,253 @@
+"""Opt-in per-detector instrumentation.
+
+Pass a `DetectorStats` to `detect_text` / `detect_batch` (``stats=``) to
+record, for every detector that runs, the number of calls, cumulative and
+percentile latency, how often it fired and which severities it produced,
+plus how many texts its prefilter let it skip (see ``prefilter.py``).
+Without ``stats`` the pipeline does no timing at all.
+
+Detectors are named after their registry entry (unwrapping severity
+overrides), ``schema`` for schema guards and ``rule:<reason>`` for custom
+rules; anything else falls back to its ``__qualname__``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import random
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Sequence
+
+if TYPE_CHECKING:
+    from .detector import Detection
+
+_SEVERITIES = ("info", "warn", "block")
+
+# Upper bounds (seconds) of the latency histogram kept per detector
+LATENCY_BUCKETS = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    5e-3,
+    1e-2,
+    1e-1,
+    1.0,
+)
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence (0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(
+        0, min(len(sorted_values) - 1, round(pct / 100.0 * len(sorted_values)) - 1)
+    )
+    return sorted_values[rank]
+
+
+def detector_name(fn: Callable[[str], "Detection"]) -> str:
+    """Name a detector callable the way the registry (or rule file) does."""
+    name = getattr(fn, "detector_name", None)
+    if isinstance(name, str):
+        return name
+    base = fn
+    while hasattr(base, "__wrapped__"):
+        base = base.__wrapped__
+    from . import registry
+    from .plugins import _LOADED
+
+    for registered, candidate in [
+        *registry._snapshot().combined.items(),
+        *_LOADED.items(),
+    ]:
+        if candidate is base or getattr(candidate, "__wrapped__", None) is base:
+            return registered
+    return getattr(base, "__qualname__", repr(base))
+
+
+class _Entry:
+    __slots__ = (
+        "calls",
+        "fired",
+        "skipped",
+        "total",
+        "samples",
+        "severities",
+        "buckets",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fired = 0
+        self.skipped = 0
+        self.total = 0.0
+        self.samples: List[float] = []
+        self.severities = dict.fromkeys(_SEVERITIES, 0)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+
+
+class DetectorStats:
+    """Thread-safe per-detector counters.
+
+    Latency percentiles come from a uniform reservoir of at most
+    ``max_samples`` timings per detector, so memory stays bounded on
+    long-running servers while counts and totals remain exact.
+    """
+
+    def __init__(self, *, max_samples: int = 4096) -> None:
+        if max_samples < 1:
+            raise ValueError("max_samples must be >= 1")
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._names: Dict[Callable[[str], "Detection"], str] = {}
+        self._rng = random.Random(0)
+        self.texts = 0
+        self._reasons: Dict[str, int] = {}
+        self._outcomes = dict.fromkeys(_SEVERITIES, 0)
+        # Texts seen and distinct texts run by deduplicated batches
+        self._dedup = [0, 0]
+
+    def name_of(self, fn: Callable[[str], "Detection"]) -> str:
+        name = self._names.get(fn)
+        if name is None:
+            name = self._names[fn] = detector_name(fn)
+        return name
+
+    def record(
+        self, fn: Callable[[str], "Detection"], seconds: float, result: "Detection"
+    ) -> None:
+        name = self.name_of(fn)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = _Entry()
+            entry.calls += 1
+            entry.total += seconds
+            entry.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            if len(entry.samples) < self.max_samples:
+                entry.samples.append(seconds)
+            else:
+                slot = self._rng.randrange(entry.calls)
+                if slot < self.max_samples:
+                    entry.samples[slot] = seconds
+            if not result.ok:
+                entry.fired += 1
+                entry.severities[result.severity] += 1
+
+    def record_skip(self, fn: Callable[[str], "Detection"], texts: int = 1) -> None:
+        """Count ``texts`` texts that ``fn``'s prefilter let it skip."""
+        name = self.name_of(fn)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = _Entry()
+            entry.skipped += texts
+
+    def record_result(self, result: "Detection") -> None:
+        """Count one text and its aggregated reasons and severity."""
+        with self._lock:
+            self.texts += 1
+            self._outcomes[result.severity] += 1
+            for reason in result.reasons:
+                self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+    def record_dedup(self, texts: int, unique: int) -> None:
+        """Count a deduplicated batch of ``texts`` with ``unique`` distinct ones."""
+        with self._lock:
+            self._dedup[0] += texts
+            self._dedup[1] += unique
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.texts = 0
+            self._reasons.clear()
+            self._outcomes = dict.fromkeys(_SEVERITIES, 0)
+            self._dedup = [0, 0]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable view of all counters.
+
+        ``texts``, ``reasons`` and ``severities`` describe aggregated results;
+        ``detectors`` maps each detector name to its own counters, with
+        cumulative ``latency_buckets`` keyed by upper bound in seconds and
+        ``skipped`` counting texts the detector did not run on because its
+        prefilter ruled them out.
+        ``dedup`` totals deduplicated batches (see `dedup.dedup_summary`).
+        """
+        from .dedup import dedup_summary
+
+        with self._lock:
+            entries = [
+                (
+                    name,
+                    e.calls,
+                    e.fired,
+                    e.skipped,
+                    e.total,
+                    sorted(e.samples),
+                    dict(e.severities),
+                    list(e.buckets),
+                )
+                for name, e in self._entries.items()
+            ]
+            texts = self.texts
+            reasons = dict(self._reasons)
+            outcomes = dict(self._outcomes)
+            dedup = dedup_summary(*self._dedup)
+        detectors = {}
+        for name, calls, fired, skipped, total, samples, severities, buckets in entries:
+            cumulative: Dict[str, int] = {}
+            running = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+                running += count
+                cumulative[repr(bound) if bound != float("inf") else "+Inf"] = running
+            detectors[name] = {
+                "calls": calls,
+                "fired": fired,
+                "skipped": skipped,
+                "total_ms": round(total * 1000.0, 3),
+                "mean_us": round(total / calls * 1e6, 3) if calls else 0.0,
+                "p50_us": round(percentile(samples, 50) * 1e6, 3),
+                "p95_us": round(percentile(samples, 95) * 1e6, 3),
+                "p99_us": round(percentile(samples, 99) * 1e6, 3),
+                "severities": severities,
+                "latency_buckets": cumulative,
+            }
+        return {
+            "texts": texts,
+            "reasons": reasons,
+            "severities": outcomes,
+            "detectors": detectors,
+            "dedup": dedup,
+        }
+
+    def format_table(self) -> str:
+        snap = self.snapshot()
+        header = f"{'detector':<28}{'calls':>9}{'fired':>9}{'skipped':>9}"
+        header += f"{'total ms':>11}"
+        header += f"{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"
+        lines = [f"texts: {snap['texts']}"]
+        dedup = snap["dedup"]
+        if dedup["texts"]:
+            lines.append(
+                f"dedup: {dedup['texts']} texts, {dedup['unique']} unique "
+                f"({dedup['ratio']:.1%} duplicates)"
+            )
+        lines.append(header)
+        rows = sorted(snap["detectors"].items(), key=lambda kv: -kv[1]["total_ms"])
+        for name, d in rows:
+            lines.append(
+                f"{name:<28}{d['calls']:>9}{d['fired']:>9}{d['skipped']:>9}"
+                f"{d['total_ms']:>11.2f}"
+                f"{d['p50_us']:>10.1f}{d['p95_us']:>10.1f}{d['p99_us']:>10.1f}"
+            )
+        return "\n".join(lines)
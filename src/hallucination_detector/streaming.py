@@ -0,0 +1,198 @@
+"""Incremental detection over chunked text streams (e.g. LLM token streams).
+
+`StreamDetector` accepts chunks as they arrive and reports provisional
+detections early, while `finish()` returns exactly what `detect_text` would
+return for the concatenated text.
+
+Each detector is evaluated according to its stream mode:
+
+- ``"window"``: a match found in the recent window is final (contradictions,
+  logical fallacies, custom rules without ``require_citation``).
+- ``"citation"``: the detector only fires when no citation appears anywhere
+  in the text (overconfidence, fact check, numeric claims, custom rules with
+  ``require_citation``). Hits are reported as *pending* because a link later
+  in the stream can still clear them; they are resolved by `finish()`.
+- ``"end"``: the detector needs the whole text (JSON and schema guards, and
+  any user detector that does not declare a mode). It only runs in `finish()`.
+
+User detectors can opt in by setting a ``stream_mode`` attribute on the
+callable.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Literal, Sequence, Set
+
+from .detector import (
+    Detection,
+    Severity,
+    _resolve_detectors,
+    detect_text,
+    guard_contradictions,
+    guard_fact_check,
+    guard_json,
+    guard_logical_fallacies,
+    guard_numeric_claims,
+    guard_overconfidence,
+)
+
+StreamMode = Literal["window", "citation", "end"]
+
+CITATION_MARKERS = ("http://", "https://", "doi.org")
+
+_BUILTIN_MODES: Dict[Callable[[str], Detection], StreamMode] = {
+    guard_json: "end",
+    guard_overconfidence: "citation",
+    guard_contradictions: "window",
+    guard_logical_fallacies: "window",
+    guard_fact_check: "citation",
+    guard_numeric_claims: "citation",
+}
+
+
+@dataclass
+class StreamEvent:
+    """A provisional detection emitted while the stream is still open."""
+
+    reason: str
+    severity: Severity
+    pending: bool
+    offset: int
+
+
+def stream_mode(fn: Callable[[str], Detection]) -> StreamMode:
+    """Return how `fn` can be evaluated on a partial stream.
+
+    Severity wrappers built by the registry are followed via ``__wrapped__``.
+    """
+    current = fn
+    while True:
+        mode = getattr(current, "stream_mode", None) or _BUILTIN_MODES.get(current)
+        if mode in ("window", "citation", "end"):
+            return mode  # type: ignore[return-value]
+        nxt = getattr(current, "__wrapped__", None)
+        if nxt is None:
+            return "end"
+        current = nxt
+
+
+def has_citation(text: str) -> bool:
+    return any(marker in text for marker in CITATION_MARKERS)
+
+
+class StreamDetector:
+    """Stateful detector fed with chunks of a single text.
+
+    Arguments mirror `detect_text`. ``overlap`` is the number of trailing
+    characters re-scanned with each new chunk so that matches spanning chunk
+    boundaries are found; it must be at least as long as the longest match a
+    window-mode detector needs to see.
+    """
+
+    def __init__(
+        self,
+        checks: Sequence[Callable[[str], Detection]] | None = None,
+        skip_json: bool = False,
+        custom_rules: Sequence[Callable[[str], Detection]] | None = None,
+        *,
+        overlap: int = 256,
+    ) -> None:
+        if overlap < max(len(m) for m in CITATION_MARKERS):
+            raise ValueError("overlap is shorter than a citation marker")
+        self._checks = checks
+        self._skip_json = skip_json
+        self._custom_rules = custom_rules
+        self._overlap = overlap
+        self._plan = [
+            (fn, stream_mode(fn))
+            for fn in _resolve_detectors(checks, skip_json, custom_rules)
+        ]
+        self._chunks: List[str] = []
+        self._tail = ""
+        self._consumed = 0
+        self._cited = False
+        self._fired: Set[int] = set()
+        self._reported: Set[str] = set()
+        self._events: List[StreamEvent] = []
+        self._result: Detection | None = None
+
+    @property
+    def cited(self) -> bool:
+        """Whether a citation marker has been seen so far."""
+        return self._cited
+
+    @property
+    def events(self) -> List[StreamEvent]:
+        """All provisional events emitted so far, in order."""
+        return list(self._events)
+
+    @property
+    def pending(self) -> List[StreamEvent]:
+        """Events that a citation later in the stream could still clear."""
+        if self._cited:
+            return []
+        return [e for e in self._events if e.pending]
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Consume a chunk and return the events it triggered."""
+        if self._result is not None:
+            raise RuntimeError("stream already finished")
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        window = self._tail + chunk
+        self._consumed += len(chunk)
+        self._tail = window[-self._overlap :]
+        if not self._cited and has_citation(window):
+            self._cited = True
+
+        new: List[StreamEvent] = []
+        for idx, (fn, mode) in enumerate(self._plan):
+            if mode == "end" or idx in self._fired:
+                continue
+            # Once cited, citation-gated detectors can no longer fire
+            if mode == "citation" and self._cited:
+                continue
+            res = fn(window)
+            if res.ok:
+                continue
+            self._fired.add(idx)
+            for reason in res.reasons:
+                if reason in self._reported:
+                    continue
+                self._reported.add(reason)
+                new.append(
+                    StreamEvent(
+                        reason=reason,
+                        severity=res.severity,
+                        pending=(mode == "citation"),
+                        offset=self._consumed,
+                    )
+                )
+        self._events.extend(new)
+        return new
+
+    def finish(self) -> Detection:
+        """Close the stream and return the final, exact detection."""
+        if self._result is None:
+            self._result = detect_text(
+                "".join(self._chunks),
+                checks=self._checks,
+                skip_json=self._skip_json,
+                custom_rules=self._custom_rules,
+            )
+        return self._result
+
+
+def detect_stream(
+    chunks: Iterable[str],
+    checks: Sequence[Callable[[str], Detection]] | None = None,
+    skip_json: bool = False,
+    custom_rules: Sequence[Callable[[str], Detection]] | None = None,
+) -> Detection:
+    """Convenience wrapper: feed all chunks and return the final detection."""
+    stream = StreamDetector(checks, skip_json, custom_rules)
+    for chunk in chunks:
+        stream.feed(chunk)
+    return stream.finish()
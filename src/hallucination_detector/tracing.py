@@ -0,0 +1,116 @@
+"""Dependency-free tracing hooks.
+
+Install any object implementing `Tracer` with `set_tracer` to receive spans
+from the pipeline. Nothing is traced by default: the hot path only checks a
+module global, so an unset tracer costs one attribute read per call.
+
+Spans emitted (``name``: start attributes -> outcome):
+
+- ``hd.detect_text``: ``input_size`` -> ``ok``, ``severity``, ``reasons``
+- ``hd.detector`` (one per detector run): ``detector``, ``input_size`` ->
+  ``ok``, ``severity``, ``reasons``
+- ``hd.detect_batch``: ``batch_size`` -> ``texts``, ``failed``
+- ``hd.schema_compile`` (`make_schema_guard` on a validator cache miss):
+  ``schema_size`` -> ``valid``
+- ``hd.load_custom_rules``: ``path`` -> ``rules``
+
+``end_span`` also receives the measured duration in seconds and the
+exception, if the traced call raised. `detect_batch` runs each text in a
+copy of the caller's `contextvars` context, so tracers that keep the
+current span in a context variable (OpenTelemetry does) see per-text spans
+as children of the batch span.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Mapping, MutableMapping, Protocol
+
+
+class Tracer(Protocol):
+    def start_span(self, name: str, attributes: Mapping[str, Any]) -> Any:
+        """Open a span; the return value is passed back to `end_span`."""
+
+    def end_span(
+        self,
+        span: Any,
+        outcome: Mapping[str, Any],
+        duration: float,
+        error: BaseException | None = None,
+    ) -> None:
+        """Close ``span`` with its outcome attributes and duration (seconds)."""
+
+
+class NoopTracer:
+    def start_span(self, name: str, attributes: Mapping[str, Any]) -> Any:
+        return None
+
+    def end_span(
+        self,
+        span: Any,
+        outcome: Mapping[str, Any],
+        duration: float,
+        error: BaseException | None = None,
+    ) -> None:
+        pass
+
+
+# None means "not tracing"; instrumented code checks this before doing work
+_TRACER: Tracer | None = None
+_NOOP = NoopTracer()
+
+
+def set_tracer(tracer: Tracer | None) -> None:
+    """Install ``tracer`` process-wide (``None`` turns tracing off)."""
+    global _TRACER
+    _TRACER = None if tracer is None or isinstance(tracer, NoopTracer) else tracer
+
+
+def get_tracer() -> Tracer:
+    return _TRACER if _TRACER is not None else _NOOP
+
+
+def detection_outcome(result: Any) -> Dict[str, Any]:
+    return {"ok": result.ok, "severity": result.severity, "reasons": result.reasons}
+
+
+# WeakKeyDictionary is not safe to share between threads: guarded by a lock
+_NAMES: "MutableMapping[Callable[..., Any], str]" = weakref.WeakKeyDictionary()
+_NAMES_LOCK = threading.Lock()
+
+
+def span_detector_name(fn: Callable[..., Any]) -> str:
+    """`stats.detector_name`, cached per detector object."""
+    try:
+        with _NAMES_LOCK:
+            return _NAMES[fn]
+    except (KeyError, TypeError):
+        pass
+    from .stats import detector_name
+
+    name = detector_name(fn)  # outside the lock: it may look up the registry
+    try:
+        with _NAMES_LOCK:
+            _NAMES[fn] = name
+    except TypeError:  # not weak-referenceable
+        pass
+    return name
+
+
+@contextmanager
+def span(
+    tracer: Tracer, name: str, attributes: Mapping[str, Any]
+) -> Iterator[Dict[str, Any]]:
+    """Trace a block; fill the yielded dict with the outcome attributes."""
+    outcome: Dict[str, Any] = {}
+    handle = tracer.start_span(name, attributes)
+    t0 = time.perf_counter()
+    try:
+        yield outcome
+    except BaseException as e:
+        tracer.end_span(handle, outcome, time.perf_counter() - t0, e)
+        raise
+    tracer.end_span(handle, outcome, time.perf_counter() - t0)
@@ -0,0 +1,144 @@
+"""Pipe-based co-process protocol (``hd worker``).
+
+A caller keeps one ``hd worker`` process alive and exchanges JSON messages
+over its stdin/stdout, so the pipeline is compiled once and no sockets are
+needed. Requests may be pipelined: responses are written in request order
+and carry the request's ``id`` back.
+
+Framing (``--framing``):
+
+- ``ndjson`` (default): one JSON object per line, UTF-8.
+- ``length``: each message is a 4-byte big-endian length followed by that
+  many bytes of UTF-8 JSON.
+
+Requests and responses:
+
+- ``{"id": 1, "text": "..."}`` -> ``{"id": 1, "result": {...}}``, where the
+  result is the object ``hd detect`` prints.
+- ``{"id": 2, "texts": ["...", ...]}`` -> ``{"id": 2, "results": [...]}``
+- ``{"id": 3, "op": "ping"}`` -> ``{"id": 3, "ok": true}``
+- Messages longer than the service's ``max_request_bytes`` are discarded
+  unread and answered with error code ``too_large`` (and ``id`` null).
+- Malformed requests get ``{"id": ..., "error": {"code": ..., "detail": ...}}``
+  and the worker keeps going.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+from .server import DetectionService
+
+FRAMINGS = ("ndjson", "length")
+
+_COMPACT = (",", ":")
+_LENGTH = struct.Struct(">I")
+
+
+def _error(request_id: Any, code: str, detail: str) -> Dict[str, Any]:
+    return {"id": request_id, "error": {"code": code, "detail": detail}}
+
+
+def handle_message(service: DetectionService, raw: bytes) -> Dict[str, Any]:
+    """Turn one framed request into its response object."""
+    try:
+        request = json.loads(raw)
+    except ValueError:  # bad JSON, bad UTF-8 or an oversized integer
+        return _error(None, "invalid_json", "request is not valid JSON")
+    if not isinstance(request, dict):
+        return _error(None, "bad_request", "request must be a JSON object")
+    request_id = request.get("id")
+    op = request.get("op", "detect")
+    if op == "ping":
+        return {"id": request_id, "ok": True}
+    if op != "detect":
+        return _error(request_id, "unknown_op", f"unsupported op {op!r}")
+    if "texts" in request:
+        texts = request["texts"]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return _error(request_id, "bad_request", "'texts' must be strings")
+        results = service.detect_many(texts)
+        return {"id": request_id, "results": [r.__dict__ for r in results]}
+    text = request.get("text")
+    if not isinstance(text, str):
+        return _error(request_id, "bad_request", "'text' must be a string")
+    return {"id": request_id, "result": service.detect(text).__dict__}
+
+
+# Readers yield None for a message over the size limit, after discarding it
+_DISCARD_BLOCK = 1 << 16
+
+
+def _read_ndjson(
+    stream: BinaryIO, limit: Optional[int] = None
+) -> Iterator[Optional[bytes]]:
+    if limit is None:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+        return
+    while True:
+        line = stream.readline(limit + 1)
+        if not line:
+            return
+        if len(line) > limit and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(_DISCARD_BLOCK)
+            yield None
+            continue
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _read_length_prefixed(
+    stream: BinaryIO, limit: Optional[int] = None
+) -> Iterator[Optional[bytes]]:
+    while True:
+        header = stream.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            return  # EOF (a partial header means the caller went away)
+        (size,) = _LENGTH.unpack(header)
+        if limit is not None and size > limit:
+            while size > 0:
+                skipped = len(stream.read(min(size, _DISCARD_BLOCK)))
+                if not skipped:
+                    return
+                size -= skipped
+            yield None
+            continue
+        payload = stream.read(size)
+        if len(payload) < size:
+            return
+        yield payload
+
+
+def run_worker(
+    service: DetectionService,
+    stdin: BinaryIO,
+    stdout: BinaryIO,
+    framing: str = "ndjson",
+) -> int:
+    """Serve requests until EOF on ``stdin``; returns the number handled."""
+    if framing not in FRAMINGS:
+        raise ValueError(f"unknown framing {framing!r}")
+    reader = _read_ndjson if framing == "ndjson" else _read_length_prefixed
+    limit = service.max_request_bytes
+    handled = 0
+    for raw in reader(stdin, limit):
+        if raw is None:
+            detail = f"message exceeds {limit} bytes"
+            response = _error(None, "too_large", detail)
+        else:
+            response = handle_message(service, raw)
+        data = json.dumps(response, separators=_COMPACT).encode("utf-8")
+        if framing == "ndjson":
+            stdout.write(data + b"\n")
+        else:
+            stdout.write(_LENGTH.pack(len(data)) + data)
+        stdout.flush()
+        handled += 1
+    return handled
@@ -1,6 +1,7 @@
 import os
 import pathlib
 import sys
+import tempfile
 
 
 def pytest_sessionstart(session):
@@ -9,6 +10,9 @@ def pytest_sessionstart(session):
     if str(src) not in sys.path:
         sys.path.insert(0, str(src))
 
+    # Keep the plugin index cache out of the user's cache directory
+    os.environ.setdefault("HD_CACHE_DIR", tempfile.mkdtemp(prefix="hd-cache-"))
+
     # Optional: allow testing against the experimental detector implementation
     # Opt-in via env var to keep default coverage focused on the stable path
     if os.getenv("HD_USE_EXPERIMENTAL_DETECTOR"):
@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import List, Optional
+
+import pytest
+
+from hallucination_detector.batching import MicroBatcher
+from hallucination_detector.detector import Detection, detect_text
+from hallucination_detector.server import DetectionService
+
+
+def _recording_runner(calls):
+    def run(texts):
+        calls.append(list(texts))
+        return [detect_text(t) for t in texts]
+
+    return run
+
+
+def test_groups_concurrent_requests_up_to_max_size():
+    calls: List[List[str]] = []
+    batcher = MicroBatcher(
+        _recording_runner(calls), window_ms=50, max_batch_size=8, adaptive=False
+    )
+    texts = [f'{{"i": {i}}}' for i in range(20)]
+    futures = [batcher.submit(t) for t in texts]
+    assert [f.result(timeout=5).ok for f in futures] == [True] * 20
+    batcher.close()
+    assert sum(len(c) for c in calls) == 20
+    assert max(len(c) for c in calls) <= 8 and len(calls) < 20
+    stats = batcher.stats()
+    assert stats["items"] == 20 and stats["batches"] == len(calls)
+    assert sum(stats["batch_size_histogram"].values()) == len(calls)
+    assert set(stats["batch_size_histogram"]) <= {"1", "2", "4", "8"}
+
+
+def test_adaptive_dispatches_sequential_requests_without_waiting():
+    batcher = MicroBatcher(_recording_runner([]), window_ms=500, adaptive=True)
+    start = time.monotonic()
+    for _ in range(3):
+        assert batcher.detect("{}").ok
+    assert time.monotonic() - start < 0.5
+    batcher.close()
+
+
+def test_errors_reach_every_caller():
+    def boom(texts):
+        raise ValueError("bad batch")
+
+    batcher = MicroBatcher(boom, window_ms=1)
+    with pytest.raises(ValueError):
+        batcher.detect("x")
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit("x")
+
+
+@pytest.mark.parametrize("extra", [-1, 1])
+def test_wrong_result_count_fails_every_caller(extra):
+    def miscount(texts):
+        results = [detect_text(t) for t in texts]
+        return results[:extra] if extra < 0 else results + results[:extra]
+
+    batcher = MicroBatcher(miscount, window_ms=20, adaptive=False)
+    futures = [batcher.submit(t) for t in ("a", "b", "c")]
+    for fut in futures:
+        with pytest.raises(RuntimeError, match="results for"):
+            fut.result(timeout=5)
+    batcher.close()
+
+
+def test_submissions_racing_close_are_all_resolved():
+    for _ in range(20):
+        batcher = MicroBatcher(_recording_runner([]), window_ms=1)
+        futures = []
+        start = threading.Barrier(5)
+
+        def submit():
+            start.wait()
+            for _ in range(50):
+                try:
+                    futures.append(batcher.submit("{}"))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=submit) for _ in range(4)]
+        for t in threads:
+            t.start()
+        start.wait()
+        batcher.close()
+        for t in threads:
+            t.join()
+        assert all(f.result(timeout=5).ok for f in futures)
+
+
+def test_invalid_knobs():
+    with pytest.raises(ValueError):
+        MicroBatcher(_recording_runner([]), window_ms=-1)
+    with pytest.raises(ValueError):
+        MicroBatcher(_recording_runner([]), max_batch_size=0)
+
+
+def test_service_routes_single_requests_through_batcher():
+    service = DetectionService(batch_window_ms=20, max_batch_size=16)
+    texts = ["not json", '{"a": 1}', "definitely 95%"] * 10
+    results: List[Optional[Detection]] = [None] * len(texts)
+
+    def worker(i):
+        results[i] = service.detect(texts[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [detect_text(t) for t in texts]
+    metrics = service.metrics()["batching"]
+    assert metrics["items"] == len(texts)
+    service.close()
+    assert DetectionService().metrics() == {"batching": None, "detectors": None}
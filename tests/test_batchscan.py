@@ -0,0 +1,155 @@
+import io
+import json
+import random
+import sys
+
+import pytest
+
+from hallucination_detector import cli, detector
+from hallucination_detector.batchscan import scan_batch
+from hallucination_detector.detector import (
+    Detection,
+    _resolve_detectors,
+    detect_batch,
+    detect_text,
+    guard_json,
+    guard_numeric_claims,
+    load_custom_rules,
+    set_confident_keywords,
+)
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.prefilter import Prefilter, prefilter_of
+from hallucination_detector.registry import build_checks
+from hallucination_detector.stats import DetectorStats
+
+_WORDS = [
+    "definitely", "Clearly", "fact", "yes and no", "TRUE AND FALSE", "either",
+    "or", "no", "middle", "everyone knows", "2024", "95%", "https://x.org",
+    "doi.org", "{", "}", '"a"', ":", "1", "null", "NaN", "\n", "\t", " ",
+    "guaranteed", "returns", "foo", "bar", "é", "İ", "ſ", "Σ",
+    "K", "yes and ſo", "٣٣٣٣",
+]  # fmt: skip
+
+
+@pytest.fixture
+def rules(tmp_path):
+    path = tmp_path / "rules.json"
+    spec = [
+        {"pattern": "guaranteed.*returns", "reason": "promise"},
+        {"pattern": r"\bfoo\s+bar\b", "reason": "foo", "require_citation": True},
+        {"pattern": r"caf\xe9|ſ", "reason": "odd", "severity": "block"},
+        {"pattern": r"\w+", "reason": "word", "severity": "info"},
+    ]
+    path.write_text(json.dumps({"rules": spec}))
+    return load_custom_rules(str(path))
+
+
+def _batches(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        batch = []
+        for _ in range(rng.randint(1, 20)):
+            text = " ".join(rng.choices(_WORDS, k=rng.randint(0, 8)))
+            if rng.random() < 0.2:
+                text = json.dumps({"answer": text})
+            batch.append(" " + text if rng.random() < 0.1 else text)
+        yield batch
+
+
+def test_scan_batch_matches_per_text_detection(rules):
+    overrides = build_checks(severity_overrides={"json": "warn", "fact_check": "block"})
+    configs = [
+        _resolve_detectors(None, False, None),
+        _resolve_detectors(None, True, rules),
+        _resolve_detectors(overrides, False, rules),
+    ]
+    for batch in _batches(400):
+        for detectors in configs:
+            expected = [detect_text(t, checks=detectors) for t in batch]
+            assert scan_batch(batch, detectors) == expected, batch
+
+
+def test_keyword_changes_are_picked_up():
+    saved = detector.CONFIDENT_KEYWORDS
+    try:
+        set_confident_keywords(["surely", "Never"])
+        batch = ["Surely so", "never", "definitely"]
+        assert scan_batch(batch, _resolve_detectors(None, True, None)) == [
+            detect_text(t, skip_json=True) for t in batch
+        ]
+    finally:
+        set_confident_keywords(saved)
+
+
+def test_only_texts_with_hits_run_their_detectors():
+    stats = DetectorStats()
+    batch = ["plain words", "about 95% sure", "plain again", "{}"]
+    results = scan_batch(batch, [guard_json, guard_numeric_claims], stats)
+    assert results == [
+        detect_text(t, checks=[guard_json, guard_numeric_claims]) for t in batch
+    ]
+    snap = stats.snapshot()
+    assert snap["texts"] == 4
+    # Every text gets a JSON result, parsed or not; one text has a number
+    assert snap["detectors"]["json"]["calls"] == 4
+    assert snap["detectors"]["numeric_claims"]["calls"] == 1
+
+
+def test_detectors_without_prefilter_always_run():
+    seen = []
+
+    def spy(text):
+        seen.append(text)
+        return Detection(True, [])
+
+    assert prefilter_of(spy) is None
+    assert prefilter_of(build_checks(severity_overrides={"fact_check": "block"})[4])
+    scan_batch(["a", "b"], [guard_numeric_claims, spy])
+    assert seen == ["a", "b"]
+
+
+def test_declared_prefilter_is_used():
+    def shout(text):
+        return Detection("!" not in text, [] if "!" not in text else ["shout"])
+
+    shout.prefilter = Prefilter(("!",))  # type: ignore[attr-defined]
+    assert [r.reasons for r in scan_batch(["a", "b!", "c"], [shout])] == [
+        [],
+        ["shout"],
+        [],
+    ]
+
+
+def test_separator_in_text_falls_back():
+    batch = ["a\x00{}", "definitely", "{}"]
+    assert scan_batch(batch, _resolve_detectors(None, False, None)) == [
+        detect_text(t) for t in batch
+    ]
+    assert scan_batch([], [guard_json]) == []
+
+
+def test_results_are_independent_copies():
+    results = scan_batch(["x", "y"], [guard_json])
+    results[0].reasons.append("edited")
+    assert results[1].reasons == ["invalid_json"]
+
+
+def test_detect_batch_and_pipeline_batch_scan(rules):
+    batch = next(_batches(1, seed=3)) * 3
+    assert detect_batch(batch, batch_scan=True) == detect_batch(batch)
+    pipeline = Pipeline.from_checks(custom_rules=rules)
+    assert pipeline.run_batch(batch, batch_scan=True, dedup=True) == pipeline.run_batch(
+        batch
+    )
+
+
+def test_cli_batch_scan(monkeypatch, capsys):
+    lines = ["{}", "definitely true", "plain"]
+    outputs = []
+    for extra in ([], ["--batch-scan"]):
+        monkeypatch.setattr(sys, "stdin", io.StringIO("\n".join(lines) + "\n"))
+        monkeypatch.setattr(sys, "argv", ["hd", "detect", "--batch", *extra])
+        with pytest.raises(SystemExit):
+            cli.main()
+        outputs.append(json.loads(capsys.readouterr().out))
+    assert outputs[0] == outputs[1] and len(outputs[0]) == 3
@@ -0,0 +1,74 @@
+import json
+import sys
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.bench import (
+    compare,
+    format_table,
+    make_corpus,
+    measure,
+    run_benchmarks,
+)
+
+
+def test_corpus_is_deterministic_per_seed():
+    assert make_corpus(50, seed=7) == make_corpus(50, seed=7)
+    assert make_corpus(50, seed=7) != make_corpus(50, seed=8)
+
+
+def test_measure_reports_ordered_percentiles():
+    res = measure("noop", lambda x: x, list(range(10)), items_per_call=4, min_time=0)
+    assert res.calls == 10 and res.items == 40
+    assert 0 <= res.p50_us <= res.p95_us <= res.p99_us
+    assert res.ops_per_sec > 0 and res.items_per_sec == pytest.approx(
+        4 * res.ops_per_sec, rel=0.01
+    )
+
+
+def test_run_benchmarks_covers_suite_and_compares():
+    report = run_benchmarks(corpus_size=20, batch_sizes=[1, 4], rule_count=5, min_time=0)
+    names = [r["name"] for r in report["results"]]
+    assert not any(name.startswith("shm.") for name in names)  # opt-in only
+    assert names[:6] == [
+        "guard.json",
+        "guard.overconfidence",
+        "guard.contradictions",
+        "guard.logical_fallacies",
+        "guard.fact_check",
+        "guard.numeric_claims",
+    ]
+    assert {"detect_text", "detect_batch.1", "detect_batch.4", "custom_rules.5"} <= set(
+        names
+    )
+    assert ("schema_guard" in names) != ("schema_guard" in report["skipped"])
+    assert report["meta"]["seed"] == 1234
+    json.dumps(report)  # machine-readable
+    rows = compare(report, report)
+    assert rows and all(r["speedup"] == 1.0 for r in rows)
+    assert "detect_text" in format_table(report)
+
+
+def test_cli_bench_json_out_and_compare(tmp_path, capsys, monkeypatch):
+    out = tmp_path / "bench.json"
+    argv = [
+        "hd",
+        "bench",
+        "--min-time",
+        "0",
+        "--corpus-size",
+        "10",
+        "--only",
+        "detect_text",
+    ]
+    monkeypatch.setattr(sys, "argv", argv + ["--out", str(out)])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 0 and "detect_text" in capsys.readouterr().out
+    monkeypatch.setattr(sys, "argv", argv + ["--format", "json", "--compare", str(out)])
+    with pytest.raises(SystemExit):
+        cli.main()
+    report = json.loads(capsys.readouterr().out)
+    assert [r["name"] for r in report["results"]] == ["detect_text"]
+    assert report["comparison"][0]["name"] == "detect_text"
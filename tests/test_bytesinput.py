@@ -0,0 +1,137 @@
+import json
+import random
+
+import pytest
+
+from hallucination_detector import detector
+from hallucination_detector.bytesinput import detect_bytes, json_plausible
+from hallucination_detector.detector import (
+    Detection,
+    detect_text,
+    load_custom_rules,
+    set_confident_keywords,
+)
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.registry import build_checks
+from hallucination_detector.stats import DetectorStats
+
+_WORDS = [
+    "definitely", "Clearly", "fact", "yes and no", "TRUE AND FALSE", "either",
+    "or", "no", "middle", "everyone knows", "2024", "95%", "https://x.org",
+    "doi.org", "{", "}", '"a"', ":", "1", "null", "NaN", "\n", "\t", " ",
+    "guaranteed", "returns", "foo", "bar", "\x1c", "é", "K",
+]  # fmt: skip
+
+
+@pytest.fixture
+def rules(tmp_path):
+    path = tmp_path / "rules.json"
+    spec = [
+        {"pattern": "guaranteed.*returns", "reason": "promise"},
+        {"pattern": r"\bfoo\s+bar\b", "reason": "foo", "require_citation": True},
+        {"pattern": r"caf\xe9", "reason": "cafe", "severity": "block"},
+    ]
+    path.write_text(json.dumps({"rules": spec}))
+    return load_custom_rules(str(path))
+
+
+@pytest.fixture
+def keywords():
+    saved = detector.CONFIDENT_KEYWORDS
+    yield set_confident_keywords
+    set_confident_keywords(saved)
+
+
+def _texts(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = rng.choices(_WORDS, k=rng.randint(0, 10))
+        text = " ".join(words)
+        yield json.dumps({"answer": text}) if rng.random() < 0.2 else text
+
+
+def test_detect_bytes_matches_detect_text(rules):
+    overrides = build_checks(severity_overrides={"json": "warn", "fact_check": "block"})
+    configs = [{}, {"skip_json": True}, {"checks": overrides, "custom_rules": rules}]
+    for text in _texts(1500):
+        data = text.encode()
+        for config in configs:
+            expected = detect_text(text, **config)
+            for buf in (data, bytearray(data), memoryview(b"  " + data)[2:]):
+                assert detect_bytes(buf, **config) == expected, (text, config)
+
+
+def test_keyword_changes_are_picked_up(keywords):
+    assert detect_bytes(b"Surely so", skip_json=True).ok
+    keywords(["surely", "Never"])  # "Never" can never match text.lower()
+    assert detect_bytes(b"Surely so", skip_json=True) == detect_text(
+        "Surely so", skip_json=True
+    )
+    assert detect_bytes(b"never", skip_json=True).ok
+
+
+def test_non_ascii_and_invalid_utf8_are_decoded():
+    text = "définitely true"
+    assert detect_bytes(text.encode()) == detect_text(text)
+    assert detect_bytes(b"definitely \xff") == detect_text("definitely �")
+
+
+@pytest.mark.parametrize(
+    "doc", ["{}", " [1] ", '"x"', "-1.5e3", "true", "null", "NaN", "-Infinity"]
+)
+def test_json_plausible_accepts_every_document(doc):
+    assert json_plausible(doc.encode())
+
+
+@pytest.mark.parametrize("text", ["", "  ", "{", "{]", "hello", "1a", "[1] x"])
+def test_json_plausible_rejects(text):
+    assert not json_plausible(text.encode())
+
+
+def _shout(text):
+    return Detection(text.isupper(), [] if text.isupper() else ["quiet"], "warn")
+
+
+def _shout_bytes(data):
+    return _shout(data.decode())
+
+
+_shout.bytes_check = _shout_bytes  # type: ignore[attr-defined]
+
+
+def test_user_detectors_get_text_unless_they_opt_in():
+    calls = []
+
+    def plain(text):
+        calls.append(type(text))
+        return Detection(True, [])
+
+    assert detect_bytes(b"x", checks=[plain, _shout]).reasons == ["quiet"]
+    assert calls == [str]
+
+
+def test_pipeline_run_bytes_and_stats(rules):
+    pipeline = Pipeline.from_checks(custom_rules=rules, time_budget_ms=1000)
+    stats = DetectorStats()
+    text = "clearly guaranteed to give returns"
+    assert pipeline.run_bytes(text.encode(), stats=stats) == pipeline.run(text)
+    names = set(stats.snapshot()["detectors"])
+    assert {"json", "overconfidence", "rule:promise"} <= names
+
+
+def test_bytes_path_skips_and_calls_like_text(rules):
+    # The bytes path must not do more detector work than decode + detect
+    pipeline = Pipeline.from_checks(custom_rules=rules)
+    by_text, by_bytes = DetectorStats(), DetectorStats()
+    for text in _texts(300, seed=3):
+        pipeline.run(text, stats=by_text)
+        pipeline.run_bytes(text.encode(), stats=by_bytes)
+    counts = [
+        {
+            name: (d["calls"], d["skipped"])
+            for name, d in s.snapshot()["detectors"].items()
+        }
+        for s in (by_text, by_bytes)
+    ]
+    assert counts[0] == counts[1]
+    assert sum(skipped for _, skipped in counts[1].values()) > 0
@@ -0,0 +1,120 @@
+import io
+import json
+import sys
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.corpus import CorpusSpec, generate_corpus, parse_size
+from hallucination_detector.detector import detect_text
+
+
+def _generate(**kwargs):
+    out = io.StringIO()
+    summary = generate_corpus(CorpusSpec(**kwargs), out)
+    return out.getvalue(), summary
+
+
+def test_parse_size_units():
+    assert parse_size("512") == 512
+    assert parse_size("64KB") == 64 * 1024
+    assert parse_size("1.5 gb") == int(1.5 * 2**30)
+    for bad in ("", "abc", "0KB", "-1"):
+        with pytest.raises(ValueError):
+            parse_size(bad)
+
+
+def test_generation_is_deterministic_and_sized():
+    a, summary = _generate(size_bytes=20_000, seed=3)
+    b, _ = _generate(size_bytes=20_000, seed=3)
+    c, _ = _generate(size_bytes=20_000, seed=4)
+    assert a == b and a != c
+    assert summary["bytes"] == len(a.encode("utf-8")) >= 20_000
+    last = a.splitlines()[-1]
+    assert len(a) - len(last) - 1 < 20_000  # stops right after crossing
+    rows = [json.loads(line) for line in a.splitlines()]
+    assert [r["id"] for r in rows] == list(range(summary["records"]))
+
+
+def test_knobs_change_the_mix():
+    text, _ = _generate(
+        size_bytes=30_000,
+        format="text",
+        payload="json",
+        invalid_json_ratio=1.0,
+        keyword_density=0.0,
+        citation_ratio=1.0,
+        numeric_ratio=1.0,
+    )
+    lines = text.splitlines()
+    invalid = 0
+    for line in lines:
+        try:
+            json.loads(line)
+        except json.JSONDecodeError:
+            invalid += 1
+    assert invalid == len(lines)
+    mixed, _ = _generate(
+        size_bytes=30_000, format="text", payload="mixed", invalid_json_ratio=1.0
+    )
+    # Every JSON record is broken, so no line of the mix parses as an object
+    for line in mixed.splitlines():
+        try:
+            assert not isinstance(json.loads(line), dict)
+        except json.JSONDecodeError:
+            pass
+    assert any(line.startswith('{"answer"') for line in mixed.splitlines())
+    prose, _ = _generate(
+        size_bytes=30_000,
+        format="text",
+        payload="prose",
+        keyword_density=0.5,
+        citation_ratio=0.0,
+        numeric_ratio=0.0,
+    )
+    assert "http" not in prose and "%" not in prose
+    flagged = [detect_text(line) for line in prose.splitlines()[:20]]
+    assert all("overconfident_no_citations" in r.reasons for r in flagged)
+
+
+def test_pathological_and_length_distributions():
+    text, _ = _generate(
+        size_bytes=50_000,
+        format="text",
+        pathological_ratio=1.0,
+        mean_words=60,
+        invalid_json_ratio=0.0,  # truncated JSON records may be short
+    )
+    assert all(len(line) >= 100 for line in text.splitlines())
+    for dist in ("fixed", "uniform", "lognormal", "pareto"):
+        out, summary = _generate(size_bytes=5_000, length_dist=dist, mean_words=10)
+        assert summary["records"] > 0
+
+
+def test_invalid_spec_rejected():
+    with pytest.raises(ValueError):
+        CorpusSpec(size_bytes=10, citation_ratio=2.0)
+    with pytest.raises(ValueError):
+        CorpusSpec(size_bytes=10, format="csv")
+
+
+def test_cli_gen_corpus_writes_file(monkeypatch, tmp_path, capsys):
+    out = tmp_path / "corpus.txt"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["hd", "gen-corpus", "--size", "8KB", "--format", "text", "--out", str(out)],
+    )
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 0
+    assert out.stat().st_size >= 8 * 1024
+    assert "records" in capsys.readouterr().err
+
+    monkeypatch.setattr(
+        sys, "argv", ["hd", "gen-corpus", "--size", "1KB", "--citation-ratio", "3"]
+    )
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 2
+    assert json.loads(capsys.readouterr().out)["error"] == "invalid_option"
@@ -0,0 +1,94 @@
+import io
+import json
+import sys
+from typing import List
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.dedup import dedup_summary, run_deduplicated
+from hallucination_detector.detector import (
+    Detection,
+    detect_batch,
+    detect_text,
+    generate_report,
+)
+from hallucination_detector.metrics import render_prometheus
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.server import DetectionService
+from hallucination_detector.stats import DetectorStats
+
+TEXTS = ["{}", "I cannot help with that", "{}", "clearly 95%", "{}", ""]
+
+_CALLS: List[str] = []
+
+
+def _counting(text):
+    _CALLS.append(text)
+    return Detection(False, ["seen"], "warn", {"len": len(text)})
+
+
+def test_results_fan_out_in_order_as_copies():
+    calls = []
+
+    def run_batch(unique):
+        calls.append(list(unique))
+        return [detect_text(t) for t in unique]
+
+    results, summary = run_deduplicated(TEXTS, run_batch)
+    assert calls == [["{}", "I cannot help with that", "clearly 95%", ""]]
+    assert results == [detect_text(t) for t in TEXTS]
+    assert results[0] is not results[2] and results[0].reasons is not results[2].reasons
+    assert summary == {"texts": 6, "unique": 4, "duplicates": 2, "ratio": 0.3333}
+    assert dedup_summary(0, 0)["ratio"] == 0.0
+
+
+def test_detect_batch_and_pipeline_dedup():
+    assert detect_batch(TEXTS, dedup=True) == detect_batch(TEXTS)
+    _CALLS.clear()
+    pipeline = Pipeline.from_checks([_counting])
+    stats = DetectorStats()
+    results = pipeline.run_batch(iter(TEXTS), stats=stats, dedup=True)
+    assert len(_CALLS) == 4
+    patches = [r.patches for r in results]
+    assert [p["len"] if p else None for p in patches] == [2, 23, 2, 11, 2, 0]
+    assert patches[0] is not None and patches[2] is not None
+    patches[0]["len"] = -1  # copies do not share patches
+    assert patches[2]["len"] == 2
+    snap = stats.snapshot()
+    assert snap["texts"] == 4 and snap["detectors"]["_counting"]["calls"] == 4
+    assert snap["dedup"] == dedup_summary(6, 4)
+    assert "dedup: 6 texts, 4 unique (33.3% duplicates)" in stats.format_table()
+    assert "hd_dedup_texts_total 6\n" in render_prometheus(stats)
+    assert "hd_dedup_unique_total 4\n" in render_prometheus(stats)
+
+
+def test_service_dedups_batches():
+    _CALLS.clear()
+    service = DetectionService([_counting], dedup=True, max_input_bytes=100)
+    assert [r.ok for r in service.detect_many(["a", "a", "b"])] == [False] * 3
+    assert _CALLS == ["a", "b"]
+
+
+def test_report_includes_dedup_summary():
+    results = detect_batch(TEXTS)
+    plain = json.loads(generate_report(results))
+    assert "dedup" not in plain
+    summary = dedup_summary(6, 4)
+    report = json.loads(generate_report(results, dedup=summary))
+    assert report == {**plain, "dedup": summary}
+    html = generate_report(results, "html", dedup=summary)
+    assert html.startswith(generate_report(results, "html"))
+    assert html.endswith("<p>Unique 4, Duplicates 2 (33.3%)</p>")
+
+
+def test_cli_batch_dedup_report(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("\n".join(TEXTS) + "\n"))
+    argv = ["hd", "detect", "--batch", "--dedup", "--report", "json"]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit):
+        cli.main()
+    report = json.loads(capsys.readouterr().out)
+    # Blank lines are skipped before deduplication
+    assert report["total_texts"] == 5
+    assert report["dedup"] == dedup_summary(5, 3)
@@ -0,0 +1,211 @@
+import http.client
+import io
+import json
+import sys
+import threading
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.corpus import CorpusSpec, generate_corpus
+from hallucination_detector.detector import _resolve_detectors, detect_text
+from hallucination_detector.largeinput import (
+    limit_text,
+    run_limited,
+    sample_spans,
+    scan_buffer,
+    scan_file,
+)
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.server import DetectionService, make_server
+from hallucination_detector.worker import run_worker
+
+
+def _prose(size, seed):
+    spec = CorpusSpec(
+        size_bytes=size,
+        seed=seed,
+        format="text",
+        payload="prose",
+        keyword_density=0.001 * (seed % 3),
+        numeric_ratio=0.02,
+        citation_ratio=0.01 * (seed % 2),
+        pathological_ratio=0.0,
+    )
+    out = io.StringIO()
+    generate_corpus(spec, out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_windowed_scan_matches_detect_text(seed):
+    text = _prose(30_000, seed)
+    expected = detect_text(text, skip_json=True)
+    detectors = _resolve_detectors(None, True, None)
+    res = scan_buffer(text.encode(), detectors, window=1024, overlap=256)
+    assert (res.ok, res.reasons, res.severity) == (
+        expected.ok,
+        expected.reasons,
+        expected.severity,
+    )
+
+
+def test_match_across_window_boundary_is_found(tmp_path):
+    path = tmp_path / "big.txt"
+    filler = "lorem ipsum " * 90
+    path.write_text(filler + "either this or that, no middle " + filler)
+    res = scan_file(str(path), skip_json=True, window=1024, overlap=256)
+    assert res.reasons == ["possible_logical_fallacy"]
+    assert scan_file(str(path), skip_json=True, window=9000).reasons == res.reasons
+
+
+def test_whole_text_checks_are_skipped_beyond_one_window(tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_text("word " * 1000)
+    res = scan_file(str(path), window=1024, overlap=256)
+    assert res.ok and res.patches == {"skipped_detectors": ["json"]}
+    small = tmp_path / "small.txt"
+    small.write_text("word " * 10)
+    assert scan_file(str(small)) == detect_text("word " * 10)
+
+
+def test_empty_file_and_invalid_utf8(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert scan_file(str(empty)) == detect_text("")
+    broken = tmp_path / "broken.txt"
+    broken.write_bytes(b"definitely \xff\xfe true")
+    assert scan_file(str(broken), skip_json=True).reasons == [
+        "overconfident_no_citations"
+    ]
+
+
+def test_policies_bound_the_bytes_scanned(tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_text("definitely " + "word " * 2000 + "clearly true")
+    size = path.stat().st_size
+    rejected = scan_file(str(path), max_bytes=1000)
+    assert rejected.reasons == ["input_too_large"] and rejected.severity == "block"
+    assert rejected.patches == {"input_bytes": size, "max_input_bytes": 1000}
+    truncated = scan_file(str(path), skip_json=True, max_bytes=1000, policy="truncate")
+    assert truncated.patches is not None
+    assert truncated.patches["input_bytes"] == size
+    assert truncated.patches["scanned_bytes"] == 1000
+    assert truncated.reasons == ["overconfident_no_citations"]
+    sampled = scan_file(
+        str(path), skip_json=True, max_bytes=1000, policy="sample", overlap=16
+    )
+    assert sampled.patches is not None
+    assert sampled.patches["scanned_bytes"] <= 1000
+    with pytest.raises(ValueError):
+        scan_file(str(path), max_bytes=1000, policy="drop")  # type: ignore[arg-type]
+
+
+def test_sample_spans_cover_start_and_end():
+    spans = sample_spans(10_000, 1000, 100)
+    assert len(spans) == 10 and spans[0][0] == 0 and spans[-1][1] == 10_000
+    assert sum(end - start for start, end in spans) == 1000
+    assert sample_spans(500, 1000, 100) == [(0, 500)]
+
+
+def test_limit_text_counts_utf8_bytes():
+    assert limit_text("é" * 10, 20) == ("é" * 10, None)
+    assert limit_text("é" * 11, 20) == (
+        None,
+        {"input_bytes": 22, "max_input_bytes": 20},
+    )
+    kept, sizes = limit_text("é" * 11, 21, "truncate")
+    assert kept == "é" * 10 and sizes == {"input_bytes": 22, "scanned_bytes": 21}
+
+
+def test_run_limited_keeps_order():
+    texts = ["{}", "x" * 50, "definitely " * 10]
+    results = run_limited(
+        texts, lambda kept: [detect_text(t) for t in kept], 40, "reject"
+    )
+    assert [r.reasons for r in results] == [
+        [],
+        ["input_too_large"],
+        ["input_too_large"],
+    ]
+    results = run_limited(texts, Pipeline().run_batch, 40, "truncate")
+    patches = results[1].patches
+    assert patches is not None and patches["scanned_bytes"] == 40
+
+
+def test_pipeline_run_file(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text('{"a": 1}')
+    assert Pipeline().run_file(str(path)) == detect_text('{"a": 1}')
+
+
+def test_service_applies_input_limit():
+    service = DetectionService(max_input_bytes=8)
+    assert service.detect("{}").ok
+    assert service.detect("x" * 9).reasons == ["input_too_large"]
+    assert [r.ok for r in service.detect_many(["{}", "x" * 9])] == [True, False]
+
+
+def test_server_refuses_oversized_requests():
+    server = make_server(DetectionService(max_request_bytes=64), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        conn.request("POST", "/detect", body=json.dumps({"text": "x" * 100}))
+        resp = conn.getresponse()
+        assert resp.status == 413
+        assert json.loads(resp.read())["error"] == "too_large"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("framing", ["ndjson", "length"])
+def test_worker_discards_oversized_messages(framing):
+    messages = [
+        json.dumps({"id": 1, "text": "x" * 200}).encode(),
+        json.dumps({"id": 2, "text": "{}"}).encode(),
+    ]
+    if framing == "ndjson":
+        stdin = io.BytesIO(b"".join(m + b"\n" for m in messages))
+    else:
+        stdin = io.BytesIO(b"".join(len(m).to_bytes(4, "big") + m for m in messages))
+    stdout = io.BytesIO()
+    service = DetectionService(max_request_bytes=64)
+    assert run_worker(service, stdin, stdout, framing=framing) == 2
+    raw = stdout.getvalue()
+    if framing == "ndjson":
+        lines = [json.loads(x) for x in raw.splitlines()]
+    else:
+        lines = []
+        while raw:
+            size = int.from_bytes(raw[:4], "big")
+            lines.append(json.loads(raw[4 : 4 + size]))
+            raw = raw[4 + size :]
+    assert lines[0]["id"] is None and lines[0]["error"]["code"] == "too_large"
+    assert lines[1] == {"id": 2, "result": detect_text("{}").__dict__}
+
+
+def _run_cli(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(sys, "argv", ["hd", "detect", *argv])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    return exc.value.code, capsys.readouterr().out
+
+
+def test_cli_large_and_max_input_bytes(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "big.txt"
+    path.write_text("word " * 400)
+    code, out = _run_cli(monkeypatch, capsys, "--file", str(path), "--large")
+    assert code == 2 and json.loads(out)["reasons"] == ["invalid_json"]
+    code, out = _run_cli(
+        monkeypatch, capsys, "--file", str(path), "--large", "--skip-json"
+    )
+    assert code == 0 and json.loads(out)["ok"] is True
+    code, out = _run_cli(
+        monkeypatch, capsys, "--file", str(path), "--max-input-bytes", "1KB"
+    )
+    assert code == 2 and json.loads(out)["reasons"] == ["input_too_large"]
+    code, out = _run_cli(monkeypatch, capsys, "--text", "{}", "--large")
+    assert code == 2 and json.loads(out)["error"] == "invalid_option"
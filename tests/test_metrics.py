@@ -0,0 +1,90 @@
+import re
+import sys
+
+import pytest
+
+from hallucination_detector import cli, rulecache
+from hallucination_detector.detector import detect_batch, load_custom_rules
+from hallucination_detector.metrics import render_prometheus, write_textfile
+from hallucination_detector.stats import DetectorStats
+
+_SAMPLE = re.compile(r'^[a-z_]+(\{([a-z]+="[^"]*",?)+\})? -?[0-9.e+-]+$|^\S+ \+?Inf')
+
+
+def _samples(text):
+    return [line for line in text.splitlines() if not line.startswith("#")]
+
+
+def test_render_counters_and_histograms():
+    stats = DetectorStats()
+    detect_batch(["definitely", '{"a": "95%"}', '{"b": 1}'], stats=stats)
+    text = render_prometheus(stats, batching={"batches": 2, "items": 3})
+    assert text.endswith("\n")
+    for line in _samples(text):
+        assert _SAMPLE.match(line), line
+    assert "# TYPE hd_detector_latency_seconds histogram" in text
+    assert "hd_texts_total 3" in text
+    assert 'hd_results_total{severity="block"} 1' in text
+    assert 'hd_detections_total{reason="numeric_claims_without_citation"} 1' in text
+    assert 'hd_detector_calls_total{detector="json"} 3' in text
+    assert 'hd_detector_latency_seconds_bucket{detector="json",le="+Inf"} 3' in text
+    assert 'hd_detector_latency_seconds_count{detector="json"} 3' in text
+    assert "hd_batcher_items_total 3" in text
+    # Buckets are cumulative
+    counts = [
+        int(line.rsplit(" ", 1)[1])
+        for line in _samples(text)
+        if line.startswith('hd_detector_latency_seconds_bucket{detector="json"')
+    ]
+    assert counts == sorted(counts)
+
+
+def test_render_without_stats_has_cache_metrics_and_escapes_labels():
+    text = render_prometheus()
+    assert "hd_schema_cache_size" in text and "hd_texts_total" not in text
+    stats = DetectorStats()
+    stats.record_result(type("R", (), {"severity": "warn", "reasons": ['a"b\\c\nd']})())
+    assert r'hd_detections_total{reason="a\"b\\c\nd"} 1' in render_prometheus(stats)
+
+
+def _value(text, name):
+    return int(
+        next(line for line in _samples(text) if line.startswith(name + " ")).split()[1]
+    )
+
+
+def test_rule_cache_metrics(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"rules": [{"pattern": "foo"}]}')
+    rulecache.clear_rule_cache()
+    before = render_prometheus()
+    load_custom_rules(str(path))
+    load_custom_rules(str(path))
+    after = render_prometheus()
+    for name, delta in [
+        ("hd_rule_cache_hits_total", 1),
+        ("hd_rule_cache_misses_total", 1),
+    ]:
+        assert _value(after, name) - _value(before, name) == delta
+    assert "# TYPE hd_rule_cache_size gauge" in after
+    assert _value(before, "hd_rule_cache_size") == 0
+    assert _value(after, "hd_rule_cache_size") == 1
+    rulecache.clear_rule_cache()
+
+
+def test_write_textfile_is_atomic_replace(tmp_path):
+    path = tmp_path / "hd.prom"
+    path.write_text("old")
+    write_textfile(str(path), "new\n")
+    assert path.read_text() == "new\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["hd.prom"]
+
+
+def test_cli_metrics_file(monkeypatch, tmp_path):
+    path = tmp_path / "hd.prom"
+    monkeypatch.setattr(
+        sys, "argv", ["hd", "detect", "--text", "{}", "--metrics-file", str(path)]
+    )
+    with pytest.raises(SystemExit):
+        cli.main()
+    assert "hd_texts_total 1" in path.read_text()
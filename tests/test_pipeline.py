@@ -0,0 +1,99 @@
+import json
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from hallucination_detector.detector import detect_text, guard_json, load_custom_rules
+from hallucination_detector.pipeline import Pipeline, PipelineConfig
+from hallucination_detector.registry import build_checks
+from hallucination_detector.stats import DetectorStats
+
+TEXTS = [
+    '{"a": 1}',
+    "not json but definitely true",
+    '{"x": "95% in 2024"}',
+    "everyone knows it https://example.com",
+]
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps(
+            {"rules": [{"pattern": "todo", "reason": "todo", "severity": "block"}]}
+        )
+    )
+    return str(path)
+
+
+def _run_in_child(pipeline, texts):
+    return [r.__dict__ for r in pipeline.run_batch(texts)]
+
+
+def test_run_matches_detect_text(rules_file):
+    pipeline = Pipeline(
+        include=["json", "overconfidence", "numeric_claims"],
+        severity_overrides={"numeric_claims": "block"},
+        rules=rules_file,
+    )
+    checks = build_checks(
+        include=["json", "overconfidence", "numeric_claims"],
+        severity_overrides={"numeric_claims": "block"},
+    )
+    rules = load_custom_rules(rules_file)
+    for text in TEXTS + ["todo"]:
+        expected = detect_text(text, checks=checks, custom_rules=rules)
+        assert pipeline.run(text) == expected
+    assert pipeline.run_batch(TEXTS) == [pipeline.run(t) for t in TEXTS]
+
+
+def test_defaults_and_skip_json():
+    assert Pipeline().run("x") == detect_text("x")
+    assert Pipeline(skip_json=True).run("x") == detect_text("x", skip_json=True)
+    assert len(Pipeline(skip_json=True).detectors) == 5
+
+
+def test_pipeline_is_frozen():
+    pipeline = Pipeline()
+    with pytest.raises(AttributeError):
+        pipeline.skip_json = True  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        del pipeline.detectors
+    with pytest.raises(AttributeError):
+        pipeline.extra = 1  # type: ignore[attr-defined]
+
+
+def test_pickles_config_by_reference(rules_file):
+    pipeline = Pipeline(include=["overconfidence"], rules=rules_file)
+    data = pickle.dumps(pipeline)
+    assert b"guard_overconfidence" not in data  # names travel, not functions
+    clone = pickle.loads(data)
+    assert (
+        clone.config
+        == pipeline.config
+        == PipelineConfig(include=("overconfidence",), rules=rules_file)
+    )
+    assert clone.run("definitely todo") == pipeline.run("definitely todo")
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        remote = pool.submit(_run_in_child, pipeline, TEXTS).result()
+    assert remote == [r.__dict__ for r in pipeline.run_batch(TEXTS)]
+
+
+def test_from_checks_pickles_module_functions():
+    pipeline = Pipeline.from_checks([guard_json])
+    assert pipeline.config is None
+    assert pickle.loads(pickle.dumps(pipeline)).run("x").reasons == ["invalid_json"]
+
+
+def test_stream_and_stats():
+    pipeline = Pipeline(skip_json=True)
+    stream = pipeline.stream()
+    for chunk in ["This is defin", "itely true."]:
+        stream.feed(chunk)
+    assert stream.finish() == pipeline.run("This is definitely true.")
+    stats = DetectorStats()
+    pipeline.run_batch(TEXTS, stats=stats)
+    assert stats.snapshot()["texts"] == len(TEXTS)
+    assert "overconfidence" in repr(pipeline)
@@ -0,0 +1,82 @@
+import sys
+import textwrap
+
+import pytest
+
+from hallucination_detector import plugins, registry
+from hallucination_detector.stats import DetectorStats
+
+MODULE = "hd_fake_plugin_mod"
+
+
+@pytest.fixture
+def installed(tmp_path, monkeypatch):
+    """A fake installed distribution publishing two detector plugins."""
+    site = tmp_path / "site"
+    dist = site / "hd_fake_plugin-0.1.dist-info"
+    dist.mkdir(parents=True)
+    (dist / "METADATA").write_text("Metadata-Version: 2.1\nName: hd-fake-plugin\n")
+    (dist / "entry_points.txt").write_text(textwrap.dedent(f"""\
+            [hallucination_detector.detectors]
+            shouting = {MODULE}:shouting
+            broken = {MODULE}:missing
+            """))
+    (site / f"{MODULE}.py").write_text(textwrap.dedent("""\
+            from hallucination_detector.detector import Detection
+
+            def shouting(text):
+                if text.isupper():
+                    return Detection(False, ["shouting"], "warn")
+                return Detection(True, [])
+            """))
+    monkeypatch.syspath_prepend(str(site))
+    monkeypatch.setenv("HD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(plugins, "_INDEX_CACHE", None)
+    monkeypatch.setattr(plugins, "_LOADED", {})
+    registry.clear_registry()
+    yield tmp_path
+    sys.modules.pop(MODULE, None)
+    registry.clear_registry()
+
+
+def test_listing_does_not_import_plugins(installed):
+    names = registry.list_detectors()
+    assert names[-2:] == ["broken", "shouting"]
+    assert MODULE not in sys.modules
+    assert "shouting" not in registry.list_detectors(include_plugins=False)
+    # Defaults never pull plugins in
+    assert len(registry.build_checks()) == 6 and MODULE not in sys.modules
+
+
+def test_include_imports_only_selected_plugin(installed):
+    checks = registry.build_checks(
+        include=["json", "shouting"], severity_overrides={"shouting": "block"}
+    )
+    assert MODULE in sys.modules
+    res = checks[1]("HELLO")
+    assert res.reasons == ["shouting"] and res.severity == "block"
+    stats = DetectorStats()
+    stats.record(checks[1], 0.0, res)
+    assert "shouting" in stats.snapshot()["detectors"]
+    with pytest.raises(plugins.PluginLoadError):
+        registry.build_checks(include=["broken"])
+
+
+def test_index_is_cached_on_disk(installed, monkeypatch):
+    assert "shouting" in plugins.plugin_index()
+    assert list((installed / "cache").glob("plugins-*.json"))
+    monkeypatch.setattr(plugins, "_INDEX_CACHE", None)
+
+    def no_scan():
+        raise AssertionError("index should come from the disk cache")
+
+    monkeypatch.setattr(plugins, "_scan", no_scan)
+    assert "shouting" in plugins.plugin_index()
+
+
+def test_registered_detectors_take_precedence_and_disable(installed, monkeypatch):
+    registry.register_detector("shouting", lambda t: plugins.Detection(True, []))
+    assert registry.build_checks(include=["shouting"])[0]("HELLO").ok
+    assert MODULE not in sys.modules
+    monkeypatch.setenv("HD_DISABLE_PLUGINS", "1")
+    assert plugins.plugin_index() == {}
@@ -0,0 +1,148 @@
+import functools
+import json
+import random
+import re
+
+import pytest
+
+from hallucination_detector import detector
+from hallucination_detector.batchscan import scan_batch
+from hallucination_detector.detector import (
+    Detection,
+    _detect_resolved,
+    _resolve_detectors,
+    detect_text,
+    guard_contradictions,
+    guard_numeric_claims,
+    guard_overconfidence,
+    load_custom_rules,
+    set_confident_keywords,
+)
+from hallucination_detector.metrics import render_prometheus
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.prefilter import Prefilter, TextFacts, prefilter_of
+from hallucination_detector.registry import build_checks
+from hallucination_detector.stats import DetectorStats
+
+_WORDS = [
+    "definitely", "Clearly", "fact", "yes and no", "TRUE AND FALSE", "either",
+    "or", "no", "middle", "everyone knows", "2024", "95%", "5%", "https://x.org",
+    "{", "}", ":", "1", "\n", " ", "guaranteed", "returns", "foo", "Foo", "bar",
+    "é", "İ", "ſ", "Σ", "K", "yes and ſo", "٣٣٣٣", "٣%", "A > B and B > A",
+]  # fmt: skip
+
+
+@pytest.fixture
+def rules(tmp_path):
+    path = tmp_path / "rules.json"
+    spec = [
+        {"pattern": "guaranteed.*returns", "reason": "promise"},
+        {"pattern": r"\bfoo\s+bar\b", "reason": "foo", "require_citation": True},
+        {"pattern": r"caf\xe9|ſ", "reason": "odd", "severity": "block"},
+        {"pattern": r"(?-i:Foo)", "reason": "exact"},
+        {"pattern": r"\d+", "reason": "digits", "severity": "info"},
+    ]
+    path.write_text(json.dumps({"rules": spec}))
+    return load_custom_rules(str(path))
+
+
+def test_skipping_never_changes_results(rules):
+    overrides = build_checks(severity_overrides={"fact_check": "block"})
+    configs = [
+        _resolve_detectors(None, False, None),
+        _resolve_detectors(overrides, True, rules),
+    ]
+    rng = random.Random(0)
+    for _ in range(3000):
+        text = " ".join(rng.choices(_WORDS, k=rng.randint(0, 8)))
+        for detectors in configs:
+            ungated = _detect_resolved(text, detectors, None)
+            assert detect_text(text, checks=detectors) == ungated, text
+
+
+def test_keyword_changes_are_picked_up():
+    saved = detector.CONFIDENT_KEYWORDS
+    try:
+        assert detect_text("surely so", skip_json=True).ok
+        set_confident_keywords(["surely"])
+        assert detect_text("surely so", skip_json=True).reasons == [
+            "overconfident_no_citations"
+        ]
+    finally:
+        set_confident_keywords(saved)
+
+
+@pytest.mark.parametrize(
+    "prefilter,text,admitted",
+    [
+        (Prefilter(("ab",)), "xaby", True),
+        (Prefilter(("ab",)), "xABy", False),
+        (Prefilter(("ab",), "ignore"), "xABy", True),
+        (Prefilter(("s",), "ignore"), "ſ", True),  # IGNORECASE folds ſ to s
+        (Prefilter(("s",), "lower"), "ſ", False),
+        (Prefilter(("ab",), "lower"), "AB", True),
+        (Prefilter(("1",), non_ascii=True), "٣", True),
+        (Prefilter(("1",), non_ascii=True), "3", False),
+        (Prefilter(("a",), min_length=3), "ab", False),
+        (Prefilter(pattern=re.compile("b+c")), "abbc", True),
+        (Prefilter(), "anything", False),
+    ],
+)
+def test_admits(prefilter, text, admitted):
+    assert prefilter.admits(TextFacts(text)) is admitted
+
+
+def test_builtin_and_rule_prefilters(rules):
+    numeric = prefilter_of(guard_numeric_claims)
+    contradictions = prefilter_of(guard_contradictions)
+    assert numeric is not None and numeric.min_length == 2
+    assert contradictions is not None and contradictions.case == "ignore"
+    assert prefilter_of(rules[0]) == Prefilter(("guaranteed",), "ignore", min_length=10)
+    assert prefilter_of(build_checks(severity_overrides={"overconfidence": "block"})[1])
+
+
+def test_stats_count_skips():
+    stats = DetectorStats()
+    detect_text("plain words", skip_json=True, stats=stats)
+    detect_text("definitely 95%", skip_json=True, stats=stats)
+    d = stats.snapshot()["detectors"]
+    assert (d["overconfidence"]["calls"], d["overconfidence"]["skipped"]) == (1, 1)
+    assert (d["contradictions"]["calls"], d["contradictions"]["skipped"]) == (0, 2)
+    assert d["numeric_claims"]["fired"] == 1
+    assert "skipped" in stats.format_table().splitlines()[1]
+    assert 'hd_detector_skipped_total{detector="contradictions"} 2\n' in (
+        render_prometheus(stats)
+    )
+
+
+def test_batch_scan_counts_skips_too():
+    stats = DetectorStats()
+    scan_batch(["plain", "definitely", "plain"], [guard_overconfidence], stats)
+    d = stats.snapshot()["detectors"]["overconfidence"]
+    assert (d["calls"], d["skipped"]) == (1, 2)
+
+
+def _upper(text):
+    return Detection(not text.isupper(), ["shout"] if text.isupper() else [])
+
+
+def test_user_detectors_opt_in_and_other_wrappers_always_run():
+    calls = []
+
+    def shout(text):
+        calls.append(text)
+        return _upper(text)
+
+    shout.prefilter = Prefilter(("!",))  # type: ignore[attr-defined]
+    pipeline = Pipeline.from_checks([shout])
+    assert pipeline.run("HI").ok and calls == []
+    assert pipeline.run("HI!").reasons == ["shout"] and calls == ["HI!"]
+
+    @functools.wraps(shout)
+    def wrapped(text):
+        return shout(text)
+
+    assert prefilter_of(wrapped) is None
+    calls.clear()
+    detect_text("HI", checks=[wrapped])
+    assert calls == ["HI"]
@@ -0,0 +1,100 @@
+import http.client
+import json
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+
+class PreforkProcess:
+    def __init__(self, *flags):
+        env = dict(os.environ, PYTHONPATH=SRC)
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "hallucination_detector.cli", "serve"]
+            + ["--port", "0", *flags],
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        self.lines: "queue.Queue[str]" = queue.Queue()
+        threading.Thread(target=self._pump, daemon=True).start()
+        match = self.wait_for(r"listening on http://([\d.]+):(\d+)")
+        self.address = (match.group(1), int(match.group(2)))
+
+    def _pump(self):
+        assert self.proc.stderr is not None
+        for line in self.proc.stderr:
+            self.lines.put(line)
+
+    def wait_for(self, pattern, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                line = self.lines.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            match = re.search(pattern, line)
+            if match:
+                return match
+        raise AssertionError(f"no log line matching {pattern!r}")
+
+    def request(self, method, path, body=None):
+        conn = http.client.HTTPConnection(*self.address, timeout=5)
+        conn.request(method, path, None if body is None else json.dumps(body))
+        resp = conn.getresponse()
+        return json.loads(resp.read())
+
+    def close(self):
+        self.proc.send_signal(signal.SIGTERM)
+        return self.proc.wait(timeout=10)
+
+
+@pytest.fixture
+def prefork():
+    started = []
+
+    def start(*flags):
+        p = PreforkProcess(*flags)
+        started.append(p)
+        return p
+
+    yield start
+    for p in started:
+        if p.proc.poll() is None:
+            p.close()
+
+
+def test_workers_serve_and_crashed_worker_is_replaced(prefork):
+    server = prefork("--workers", "2", "--skip-json")
+    first = int(server.wait_for(r"worker (\d+) started").group(1))
+    server.wait_for(r"worker (\d+) started")
+    body = server.request("POST", "/detect", {"text": "definitely"})
+    assert body["reasons"] == ["overconfident_no_citations"]
+
+    os.kill(first, signal.SIGKILL)
+    server.wait_for(rf"worker {first} killed by signal {int(signal.SIGKILL)}")
+    replacement = int(server.wait_for(r"worker (\d+) started").group(1))
+    assert replacement != first
+    assert server.request("GET", "/healthz")["ok"] is True
+    assert server.close() == 0
+
+
+def test_worker_without_heartbeats_is_killed(prefork):
+    server = prefork("--workers", "1", "--health-timeout", "1")
+    pid = int(server.wait_for(r"worker (\d+) started").group(1))
+    os.kill(pid, signal.SIGSTOP)  # simulate a worker stuck holding the GIL
+    server.wait_for(rf"worker {pid} missed heartbeats")
+    server.wait_for(rf"worker {pid} killed by signal")
+    server.wait_for(r"worker (\d+) started")
+    assert server.request("GET", "/healthz")["ok"] is True
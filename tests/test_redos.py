@@ -0,0 +1,204 @@
+import json
+import pickle
+import random
+import re
+import sys
+import time
+import warnings
+
+import pytest
+
+from hallucination_detector import cli, rulecache
+from hallucination_detector.corpus import _pathological
+from hallucination_detector.detector import (
+    Detection,
+    detect_text,
+    guard_json,
+    guard_logical_fallacies,
+    load_custom_rules,
+)
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.redos import (
+    RegexRiskWarning,
+    UnsafePattern,
+    analyze_pattern,
+    compile_bytes_search,
+    compile_search,
+    literal_chain,
+    required_literals,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    rulecache.clear_rule_cache()
+    yield
+    rulecache.clear_rule_cache()
+
+
+def _rules(path, *patterns):
+    rules = [{"pattern": p, "reason": f"r{i}"} for i, p in enumerate(patterns)]
+    path.write_text(json.dumps({"rules": rules}))
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "pattern,risks",
+    [
+        (r"(a+)+$", ["nested_quantifier"]),
+        (r"(\w+\s?)*$", ["nested_quantifier"]),
+        (r"(a|aa)*b", ["overlapping_alternation"]),
+        (r"(\w|\d\w)*", ["overlapping_alternation"]),
+        (r"\d+.*x.*y", ["wildcard_chain"]),
+        (r"either.*or.*no.*middle", []),  # literal chain, run linearly
+        (r"\bthe\b.*\bmodel\b", []),
+        (r"(foo|bar)+", []),
+        (r"(a\s?)*", []),
+        (r"[^,]*,[^,]*,x", []),
+        (r"todo", []),
+    ],
+)
+def test_analyze_pattern(pattern, risks):
+    assert analyze_pattern(pattern) == risks
+
+
+def test_literal_chain_matches_like_the_regex_engine():
+    rng = random.Random(0)
+    assert literal_chain(r"a\d.*b") is None and literal_chain(r".*a.*b") is None
+    for _ in range(3000):
+        pieces = ["".join(rng.choices("abAB", k=rng.randint(1, 2))) for _ in range(3)]
+        pattern = ".*".join(pieces[: rng.randint(2, 3)])
+        text = "".join(rng.choices("abAB\nx", k=rng.randint(0, 14)))
+        for flags in (re.IGNORECASE, 0, re.IGNORECASE | re.DOTALL):
+            expected = re.search(pattern, text, flags) is not None
+            assert bool(compile_search(pattern, flags)(text)) is expected
+
+
+def test_literal_chain_with_newlines_in_pieces():
+    assert literal_chain("foo.*bar\nbaz", 0) is None
+    assert compile_search("foo.*bar\nbaz", 0)("foo bar\nbaz")
+    rng = random.Random(2)
+    for _ in range(3000):
+        pieces = ["".join(rng.choices("ab\n", k=rng.randint(1, 3))) for _ in range(3)]
+        pattern = ".*".join(pieces[: rng.randint(2, 3)])
+        text = "".join(rng.choices("ab\nx", k=rng.randint(0, 14)))
+        for flags in (0, re.DOTALL):
+            expected = re.search(pattern, text, flags) is not None
+            assert bool(compile_search(pattern, flags)(text)) is expected, pattern
+            search = compile_bytes_search(pattern, flags)
+            assert search is not None
+            assert bool(search(text.encode())) is expected, pattern
+
+
+@pytest.mark.parametrize(
+    "pattern,literals",
+    [
+        (r"everyone (knows|thinks|agrees)", ("everyone ",)),
+        (r"obviously|clearly|of course", ("obviously", "clearly", "of course")),
+        (r"either.*or.*no.*middle", ("either",)),
+        (r"\bguaranteed\s+returns?\b", ("guaranteed",)),
+        (r"(?:foo|bar)baz", ("baz",)),
+        (r"(ab)+c", ("ab",)),
+        (r"(a|)b?", None),
+        (r"\w+", None),
+        (r"(", None),
+    ],
+)
+def test_required_literals(pattern, literals):
+    assert required_literals(pattern) == literals
+
+
+def test_required_literals_occur_in_every_match():
+    rng = random.Random(1)
+    for _ in range(2000):
+        pattern = "".join(
+            rng.choices(["a", "b", "(a|b)", "c?", "(ab)+", ".", "|"], k=4)
+        )
+        literals = required_literals(pattern)
+        if literals is None:
+            continue
+        text = "".join(rng.choices("abcAB", k=rng.randint(0, 10)))
+        for m in re.finditer(pattern, text, re.IGNORECASE):
+            found = m.group().lower()
+            assert any(lit.lower() in found for lit in literals), (pattern, text)
+
+
+def test_builtin_fallacy_chains_stay_linear_on_hostile_input():
+    rng = random.Random(3)
+    hostile = [_pathological(rng, 3000) for _ in range(8)]
+    t0 = time.perf_counter()
+    for text in hostile:
+        guard_logical_fallacies(text)
+    assert time.perf_counter() - t0 < 2.0  # minutes per text with plain `re`
+    assert guard_logical_fallacies("Either this or that, no middle").ok is False
+    assert guard_logical_fallacies("either this\nor that, no middle").ok
+
+
+def test_guard_json_rejects_oversized_integers():
+    assert guard_json("9" * 8000 + " %").reasons == ["invalid_json"]
+
+
+def test_unsafe_rules_warn_by_default(tmp_path):
+    path = _rules(tmp_path / "rules.json", "todo", r"(a+)+$")
+    with pytest.warns(RegexRiskWarning, match="nested_quantifier"):
+        rules = load_custom_rules(path)
+    risks = [r.regex_risks for r in rules]  # type: ignore[attr-defined]
+    assert risks == [(), ("nested_quantifier",)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert len(load_custom_rules(path, unsafe_patterns="allow")) == 2
+    with pytest.raises(UnsafePattern, match=r"rule:r1"):
+        load_custom_rules(path, unsafe_patterns="reject")
+    with pytest.raises(ValueError):
+        load_custom_rules(path, unsafe_patterns="ignore")  # type: ignore[arg-type]
+
+
+def test_chain_rules_match_without_backtracking(tmp_path):
+    path = _rules(tmp_path / "rules.json", "guaranteed.*returns")
+    (rule,) = load_custom_rules(path, unsafe_patterns="reject")
+    assert rule("Guaranteed 40% RETURNS").reasons == ["r0"]
+    assert rule("guaranteed\nreturns").ok
+    assert rule(" ".join(["guaranteed"] * 20000)).ok
+
+
+def _slow(text):
+    time.sleep(0.02)
+    return Detection(True, [])
+
+
+def _never(text):
+    return Detection(False, ["never"], "block")
+
+
+def test_time_budget_skips_remaining_detectors():
+    res = detect_text("x", checks=[_slow, _never, _slow], time_budget_ms=1)
+    assert res.reasons == ["time_budget_exceeded"] and res.severity == "warn"
+    assert res.patches == {"skipped_detectors": ["_never", "_slow"]}
+    assert detect_text("x", checks=[_slow, _never]).reasons == ["never"]
+    assert detect_text("x", checks=[_slow, _never], time_budget_ms=1000).ok is False
+
+
+def test_pipeline_carries_time_budget():
+    pipeline = Pipeline.from_checks([_slow, _never], time_budget_ms=1)
+    assert pipeline.run("x").reasons == ["time_budget_exceeded"]
+    assert [r.reasons for r in pipeline.run_batch(["x"])] == [["time_budget_exceeded"]]
+    clone = pickle.loads(pickle.dumps(pipeline))
+    assert clone.time_budget_ms == 1
+    configured = Pipeline(include=["json"], time_budget_ms=50)
+    assert pickle.loads(pickle.dumps(configured)).time_budget_ms == 50
+
+
+def test_cli_rejects_unsafe_rules(tmp_path, capsys, monkeypatch):
+    path = _rules(tmp_path / "rules.json", r"(x+x+)+y")
+    argv = ["hd", "detect", "--text", "{}", "--rules", path]
+    monkeypatch.setattr(sys, "argv", argv + ["--unsafe-patterns", "reject"])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 2
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)["reasons"] == ["unsafe_pattern"]
+    assert "nested_quantifier" in captured.err
+    monkeypatch.setattr(sys, "argv", argv + ["--unsafe-patterns", "allow"])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 0
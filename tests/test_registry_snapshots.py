@@ -0,0 +1,69 @@
+import threading
+
+from hallucination_detector import registry
+from hallucination_detector.detector import Detection
+
+
+def _det(reason):
+    def detector(_text: str) -> Detection:
+        return Detection(False, [reason], "warn")
+
+    return detector
+
+
+def test_build_checks_is_memoised_per_version():
+    registry.clear_registry()
+    a = registry.build_checks(include=["json", "fact_check"], exclude=["x"])
+    b = registry.build_checks(include=["json", "fact_check"], exclude=["x"])
+    assert a == b and a is not b  # callers get their own list
+    over1 = registry.build_checks(severity_overrides={"json": "warn"})
+    over2 = registry.build_checks(severity_overrides={"json": "warn"})
+    assert over1[0] is over2[0]  # wrapper reused, not rebuilt
+    version = registry.registry_version()
+    registry.register_detector("extra", _det("extra"))
+    assert registry.registry_version() == version + 1
+    assert registry.build_checks()[-1]("").ok is False
+    assert len(registry.build_checks()) == len(a) + 5
+    registry.clear_registry()
+    assert "extra" not in registry.list_detectors()
+
+
+def test_snapshots_are_immutable_and_isolated():
+    registry.clear_registry()
+    snap = registry._snapshot()
+    registry.register_detector("late", _det("late"))
+    assert "late" not in snap.combined  # old readers keep a consistent view
+    assert "late" in registry._snapshot().combined
+    try:
+        snap.user["x"] = _det("x")  # type: ignore[index]
+    except TypeError:
+        pass
+    else:  # pragma: no cover
+        raise AssertionError("snapshot mapping should be read-only")
+    registry.clear_registry()
+
+
+def test_concurrent_register_and_build():
+    registry.clear_registry()
+    errors = []
+
+    def writer(i):
+        registry.register_detector(f"d{i}", _det(f"d{i}"))
+
+    def reader():
+        try:
+            for _ in range(200):
+                checks = registry.build_checks()
+                assert len(checks) >= 6
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(20)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(registry.list_detectors(False, include_plugins=False)) == 20
+    registry.clear_registry()
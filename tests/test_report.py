@@ -0,0 +1,144 @@
+import html as html_module
+import io
+import json
+import pickle
+import random
+import sys
+from typing import Dict, List, Tuple
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.dedup import dedup_summary
+from hallucination_detector.detector import (
+    Detection,
+    Severity,
+    detect_batch,
+    detect_text,
+    generate_report,
+    load_custom_rules,
+)
+from hallucination_detector.report import ReportAccumulator
+from hallucination_detector.stats import DetectorStats
+
+_REASONS = ["invalid_json", "possible_contradiction", "x<y>", "unverified_fact"]
+_SEVERITIES: Tuple[Severity, ...] = ("info", "warn", "block")
+
+
+def _reference(results, format="json", dedup=None):
+    # generate_report before it was built on ReportAccumulator, with reasons
+    # HTML-escaped as they are now
+    total = len(results)
+    ok = sum(1 for r in results if r.ok)
+    warns = sum(1 for r in results if not r.ok and r.severity == "warn")
+    blocks = sum(1 for r in results if r.severity == "block")
+    reasons: Dict[str, int] = {}
+    for r in results:
+        for reason in r.reasons:
+            reasons[reason] = reasons.get(reason, 0) + 1
+    report = {
+        "total_texts": total,
+        "ok": ok,
+        "warn": warns,
+        "block": blocks,
+        "reason_counts": reasons,
+    }
+    if dedup is not None:
+        report["dedup"] = dedup
+    if format == "html":
+        html = f"<h1>Report</h1><p>Total {total}, OK {ok}, Warn {warns}, Block {blocks}</p><ul>"
+        for reason, count in reasons.items():
+            html += f"<li>{html_module.escape(reason)}: {count}</li>"
+        html += "</ul>"
+        if dedup is not None:
+            html += (
+                f"<p>Unique {dedup['unique']}, Duplicates {dedup['duplicates']}"
+                f" ({dedup['ratio']:.1%})</p>"
+            )
+        return html
+    return json.dumps(report, indent=2)
+
+
+def _results(count, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        reasons = rng.sample(_REASONS, rng.randint(0, 2))
+        severity = rng.choice(_SEVERITIES)
+        out.append(Detection(not reasons, reasons, severity))
+    return out
+
+
+@pytest.mark.parametrize("format", ["json", "html", "text"])
+@pytest.mark.parametrize("dedup", [None, dedup_summary(10, 7)])
+def test_output_is_unchanged(format, dedup):
+    batches: Tuple[List[Detection], ...] = ([], _results(200))
+    for results in batches:
+        expected = _reference(results, format, dedup)
+        assert generate_report(results, format, dedup=dedup) == expected
+        out = io.StringIO()
+        ReportAccumulator().add_all(iter(results)).write(out, format, dedup=dedup)
+        assert out.getvalue() == expected
+
+
+def test_html_escapes_rule_reasons(tmp_path):
+    path = tmp_path / "rules.json"
+    reason = '<script>alert("x")</script>'
+    path.write_text(json.dumps({"rules": [{"pattern": "foo", "reason": reason}]}))
+    results = detect_batch(["foo", "bar"], custom_rules=load_custom_rules(str(path)))
+    page = generate_report(results, "html")
+    assert "<script>" not in page
+    assert f"<li>{html_module.escape(reason)}: 1</li>" in page
+    assert json.loads(generate_report(results))["reason_counts"][reason] == 1
+
+
+def test_shards_merge_to_the_whole():
+    results = _results(300, seed=1)
+    texts = ["x" * random.Random(i).randint(0, 40) for i in range(300)]
+    whole = ReportAccumulator().add_all(results, texts)
+    shards = [
+        ReportAccumulator().add_all(results[i : i + 70], texts[i : i + 70])
+        for i in range(0, 300, 70)
+    ]
+    merged = ReportAccumulator()
+    for shard in shards:
+        merged.merge(pickle.loads(pickle.dumps(shard)))
+    assert merged.to_dict() == whole.to_dict()
+    assert merged.render("html", details=True) == whole.render("html", details=True)
+    restored = ReportAccumulator.from_dict(json.loads(json.dumps(whole.to_dict())))
+    assert restored.render(details=True) == whole.render(details=True)
+    assert sum(whole.length_histogram().values()) == 300
+
+
+def test_length_histogram_buckets():
+    acc = ReportAccumulator()
+    for length in (0, 1, 2, 3, 4, 1000):
+        acc.add(Detection(True, []), length)
+    assert acc.length_histogram() == {"0": 1, "1": 1, "2-3": 2, "4-7": 1, "512-1023": 1}
+
+
+def test_detector_latency_from_stats():
+    stats = DetectorStats()
+    texts = ["definitely 95%", "{}", "plain"] * 20
+    results = detect_batch(texts, stats=stats)
+    acc = ReportAccumulator().add_all(results, texts).add_stats(stats)
+    other = ReportAccumulator().add_stats(stats)
+    detectors = acc.merge(other).summary(details=True)["detectors"]
+    snap = stats.snapshot()["detectors"]
+    for name, d in detectors.items():
+        assert d["calls"] == 2 * snap[name]["calls"]
+        assert d["skipped"] == 2 * snap[name]["skipped"]
+        if d["calls"]:
+            assert d["p50_us"] is None or 0 < d["p50_us"] <= d["p99_us"]
+    page = acc.render("html", details=True)
+    assert "<h2>Detectors</h2>" in page and "<td>numeric_claims</td>" in page
+
+
+def test_cli_report_streams_same_output(monkeypatch, capsys):
+    lines = ["{}", "definitely true", "plain"]
+    monkeypatch.setattr(sys, "stdin", io.StringIO("\n".join(lines) + "\n"))
+    monkeypatch.setattr(sys, "argv", ["hd", "detect", "--batch", "--report", "html"])
+    with pytest.raises(SystemExit):
+        cli.main()
+    expected = _reference([detect_text(t) for t in lines], "html")
+    assert capsys.readouterr().out == expected + "\n"
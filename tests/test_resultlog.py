@@ -0,0 +1,184 @@
+import io
+import json
+import struct
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.detector import Detection, detect_text, generate_report
+from hallucination_detector.report import ReportAccumulator
+from hallucination_detector.resultlog import (
+    MAGIC,
+    ResultLog,
+    ResultLogError,
+    ResultLogWriter,
+)
+
+TEXTS = [
+    '{"a": 1}',
+    "not json but definitely true",
+    "definitely 95% in 2024, a fact",
+    "yes and no",
+    "plain",
+    "é İ ſ definitely",
+] * 5
+RESULTS = [detect_text(t) for t in TEXTS]
+
+
+def _log(tmp_path, results=RESULTS, texts=TEXTS):
+    path = str(tmp_path / "results.hdrl")
+    with ResultLogWriter(path) as log:
+        log.write_all(results, texts)
+    return path
+
+
+def test_roundtrip_and_report(tmp_path):
+    path = _log(tmp_path)
+    with ResultLog(path) as log:
+        records = list(log)
+        acc = log.aggregate()
+    assert [r.result for r in records] == RESULTS
+    assert [r.length for r in records] == [len(t) for t in TEXTS]
+    assert all(r.key is None for r in records)
+    assert acc.render() == generate_report(RESULTS)
+    expected = ReportAccumulator().add_all(RESULTS, TEXTS)
+    assert acc.render("html", details=True) == expected.render("html", details=True)
+    records[0].result.reasons.append("edited")
+    with ResultLog(path) as log:
+        assert next(iter(log)).result == RESULTS[0]
+
+
+def test_keys_patches_and_appended_segments(tmp_path):
+    path = _log(tmp_path)
+    missing = Detection(False, ["schema_violation"], "block", {"missing": ["a", "b"]})
+    with ResultLogWriter(path) as log:
+        log.write(missing, key="doc/1")
+        log.write(Detection(True, []), length=3)
+        log.write(Detection(False, ["x"], "info", {"n": 1}), key="other/2", length=9)
+    with ResultLog(path) as log:
+        records = list(log)
+        assert records[len(TEXTS) :] == [
+            (missing, "doc/1", None),
+            (Detection(True, []), None, 3),
+            (Detection(False, ["x"], "info", {"n": 1}), "other/2", 9),
+        ]
+        assert [r.key for r in log.records(key_prefix="doc/")] == ["doc/1"]
+        acc = log.aggregate(key_prefix="doc/")
+        assert acc.reasons == {"schema_violation": 1}
+        assert log.aggregate().total == len(TEXTS) + 3
+
+
+def test_filters(tmp_path):
+    path = _log(tmp_path)
+    cases: List[Tuple[Dict[str, Any], Callable[[Detection], Any]]] = [
+        ({"failed": True}, lambda r: not r.ok),
+        ({"min_severity": "block"}, lambda r: r.severity == "block"),
+        (
+            {"reasons": {"possible_contradiction", "unverified_fact"}},
+            lambda r: {"possible_contradiction", "unverified_fact"} & set(r.reasons),
+        ),
+    ]
+    with ResultLog(path) as log:
+        for filters, keep in cases:
+            kept = [r for r in RESULTS if keep(r)]
+            assert kept
+            assert [r.result for r in log.records(**filters)] == kept
+            assert log.aggregate(**filters).render() == generate_report(kept)
+
+
+def test_torn_tail_and_bad_files(tmp_path):
+    path = _log(tmp_path)
+    with ResultLogWriter(path) as log:
+        log.write(Detection(True, []), key="last")
+    with open(path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 2)
+    with ResultLog(path) as log:
+        assert [r.result for r in log] == RESULTS
+    # Appending after a crash drops the torn record first
+    with ResultLogWriter(path) as log:
+        log.write_all(RESULTS[:10], TEXTS[:10])
+    with ResultLog(path) as log:
+        assert [r.result for r in log] == RESULTS + RESULTS[:10]
+        assert log.aggregate().total == len(TEXTS) + 10
+    bad = tmp_path / "bad.hdrl"
+    bad.write_bytes(b"not a log")
+    with pytest.raises(ResultLogError):
+        ResultLog(str(bad))
+    with pytest.raises(ResultLogError):
+        ResultLogWriter(str(bad))
+    # A block referring to a result that was never defined
+    broken = tmp_path / "broken.hdrl"
+    broken.write_bytes(MAGIC + b"\x09\x00\x00\x00B" + bytes(8))
+    with ResultLog(str(broken)) as log:
+        with pytest.raises(ResultLogError):
+            log.aggregate()
+
+
+def _record(kind, payload):
+    return struct.pack("<I", len(payload) + 1) + kind + payload
+
+
+@pytest.mark.parametrize(
+    "records, aggregated",
+    [
+        # Five reason IDs announced, none there (another record follows)
+        ([_record(b"D", b"\x00\x05\x00"), _record(b"S", b"")], True),
+        ([_record(b"N", b"\xff\xfe")], True),
+        ([_record(b"D", b"\x08\x00\x00\x03\x00\x00\x00{x}")], True),
+        ([_record(b"D", b"\x08\x00\x00\x09\x00\x00\x00{}")], True),
+        ([_record(b"D", b"\x01\x00\x00"), _record(b"B", bytes(12))], True),
+        ([_record(b"D", b"\x01\x00\x00"), _record(b"K", b"\x00\x00")], True),
+        # Keys are only read by records()
+        ([_record(b"D", b"\x01\x00\x00"), _record(b"K", bytes(8) + b"\xff")], False),
+    ],
+)
+def test_damaged_records(tmp_path, records, aggregated):
+    path = tmp_path / "damaged.hdrl"
+    path.write_bytes(MAGIC + b"".join(records))
+    offset = len(MAGIC) + sum(map(len, records[:-1]))
+    if records[-1][4:5] == b"S":
+        offset = len(MAGIC)
+    with ResultLog(str(path)) as log:
+        reads: List[Callable[[], Any]] = [lambda: list(log)]
+        if aggregated:
+            reads.append(log.aggregate)
+        for read in reads:
+            with pytest.raises(ResultLogError, match=f"offset {offset}"):
+                read()
+
+
+def _main(monkeypatch, argv, stdin=""):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+    monkeypatch.setattr(sys, "argv", ["hd", *argv])
+    with pytest.raises(SystemExit) as e:
+        cli.main()
+    return e.value.code
+
+
+def test_cli_out_and_report(monkeypatch, capsys, tmp_path):
+    path = str(tmp_path / "out.hdrl")
+    batch = "\n".join(TEXTS) + "\n"
+    assert _main(monkeypatch, ["detect", "--batch", "--out", path], batch) == 1
+    assert capsys.readouterr().out == ""
+    assert _main(monkeypatch, ["detect", "--text", "{}", "--out", path]) == 0
+    assert _main(monkeypatch, ["report", path, "--format", "html"]) == 0
+    expected = generate_report(RESULTS + [Detection(True, [])], "html")
+    assert capsys.readouterr().out == expected + "\n"
+    argv = ["report", path, "--records", "--reason", "possible_contradiction"]
+    assert _main(monkeypatch, argv) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(lines) == TEXTS.count("yes and no")
+    assert lines[0]["length"] == len("yes and no") and lines[0]["key"] is None
+    assert _main(monkeypatch, ["report", str(tmp_path / "missing")]) == 2
+    assert "invalid_result_log" in capsys.readouterr().out
+    broken = tmp_path / "broken.hdrl"
+    broken.write_bytes(MAGIC + b"\x09\x00\x00\x00B" + bytes(8))
+    assert _main(monkeypatch, ["report", str(broken)]) == 2
+    assert "undefined result ID" in capsys.readouterr().out
+    not_log = tmp_path / "notes.txt"
+    not_log.write_text("notes")
+    assert _main(monkeypatch, ["detect", "--text", "{}", "--out", str(not_log)]) == 2
+    assert "invalid_result_log" in capsys.readouterr().out
+    assert not_log.read_text() == "notes"
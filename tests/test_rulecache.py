@@ -0,0 +1,102 @@
+import json
+import os
+import pickle
+import time
+
+import pytest
+
+from hallucination_detector import rulecache
+from hallucination_detector.detector import load_custom_rules
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.server import DetectionService
+
+
+def _write(path, reason, pattern="todo"):
+    rules = {"rules": [{"pattern": pattern, "reason": reason, "severity": "block"}]}
+    path.write_text(json.dumps(rules))
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("HD_CACHE_DIR", str(tmp_path / "cache"))
+    rulecache.clear_rule_cache()
+    yield
+    rulecache.clear_rule_cache()
+
+
+def test_unchanged_file_reuses_compiled_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    _write(path, "first")
+    a = load_custom_rules(str(path))
+    b = load_custom_rules(str(path))
+    assert a == b and a is not b
+    assert load_custom_rules(str(path), cache=False)[0] is not a[0]
+    os.utime(path, ns=(1, 1))  # touched, same content
+    assert load_custom_rules(str(path))[0] is a[0]
+    _write(path, "second-reason")
+    assert load_custom_rules(str(path))[0]("todo").reasons == ["second-reason"]
+
+
+def test_yaml_parse_is_cached_on_disk(tmp_path, monkeypatch):
+    pytest.importorskip("yaml")
+    path = tmp_path / "rules.yaml"
+    path.write_text("rules:\n  - pattern: todo\n    reason: yaml_rule\n")
+    assert load_custom_rules(str(path))[0]("TODO").reasons == ["yaml_rule"]
+    assert list((tmp_path / "cache").glob("rules-v1-*.json"))
+    rulecache.clear_rule_cache()
+
+    def no_parse(data, name):
+        raise AssertionError("YAML should come from the disk cache")
+
+    monkeypatch.setattr(rulecache, "_parse_rules", no_parse)
+    assert load_custom_rules(str(path))[0]("TODO").reasons == ["yaml_rule"]
+
+
+def test_watcher_reports_changes_and_survives_bad_files(tmp_path, capsys):
+    path = tmp_path / "rules.json"
+    _write(path, "v1")
+    watcher = rulecache.RuleFileWatcher(str(path), interval=0)
+    assert watcher.poll() is None
+    _write(path, "v2-longer")
+    rules = watcher.poll()
+    assert rules is not None and rules[0]("todo").reasons == ["v2-longer"]
+    assert watcher.poll() is None and watcher.reloads == 1
+    path.write_text("{not json")
+    assert watcher.poll() is None
+    assert "keeping previous rules" in capsys.readouterr().err
+
+
+def test_service_swaps_rules_between_requests(tmp_path):
+    path = tmp_path / "rules.json"
+    _write(path, "old_rule")
+    service = DetectionService(
+        checks=[],
+        custom_rules=load_custom_rules(str(path)),
+        rules_path=str(path),
+        reload_interval=0.01,
+    )
+    before = service.pipeline
+    assert service.detect("todo").reasons == ["old_rule"]
+    _write(path, "new_rule_name")
+    time.sleep(0.02)
+    assert service.detect("todo").reasons == ["new_rule_name"]
+    assert service.pipeline is not before
+    assert before.run("todo").reasons == ["old_rule"]  # in-flight view intact
+    assert service.detect_many(["todo"])[0].reasons == ["new_rule_name"]
+
+
+def test_reload_keeps_pipeline_config(tmp_path):
+    path = tmp_path / "rules.json"
+    _write(path, "old_rule")
+    pipeline = Pipeline(rules=str(path), skip_json=True)
+    service = DetectionService(
+        pipeline=pipeline, rules_path=str(path), reload_interval=0.01
+    )
+    _write(path, "new_rule_name")
+    time.sleep(0.02)
+    assert service.detect("todo").reasons == ["new_rule_name"]
+    reloaded = service.pipeline
+    assert reloaded.config == pipeline.config
+    copy = pickle.loads(pickle.dumps(reloaded))
+    assert copy.config == pipeline.config
+    assert copy.run("todo").reasons == ["new_rule_name"]
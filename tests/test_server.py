@@ -0,0 +1,181 @@
+import http.client
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from hallucination_detector.detector import detect_text
+from hallucination_detector.server import DetectionService, make_server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+@pytest.fixture
+def running():
+    servers = []
+
+    def start(service=None, **kwargs):
+        server = make_server(service or DetectionService(), port=0, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _request(conn, method, path, body=None):
+    conn.request(method, path, body=None if body is None else json.dumps(body))
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+def test_detect_and_batch_match_detect_text(running):
+    server = running()
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    texts = ['{"a": 1}', "not json but definitely true", '{"x": "95% in 2024"}']
+    # One keep-alive connection serves several requests
+    for text in texts:
+        status, body = _request(conn, "POST", "/detect", {"text": text})
+        assert status == 200 and body == detect_text(text).__dict__
+    status, body = _request(conn, "POST", "/detect/batch", {"texts": texts})
+    assert status == 200 and body == [detect_text(t).__dict__ for t in texts]
+    assert _request(conn, "GET", "/healthz") == (200, {"ok": True, "pid": os.getpid()})
+
+
+def test_service_configuration_is_applied(running):
+    server = running(DetectionService(skip_json=True))
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    status, body = _request(conn, "POST", "/detect", {"text": "plain text"})
+    assert status == 200 and body["ok"] is True
+
+
+@pytest.mark.parametrize(
+    "path,body",
+    [
+        ("/detect", {"texts": ["a"]}),
+        ("/detect/batch", {"texts": "a"}),
+        ("/detect", ["not", "an", "object"]),
+    ],
+)
+def test_bad_requests(running, path, body):
+    server = running()
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    status, payload = _request(conn, "POST", path, body)
+    assert status == 400 and payload["error"] == "bad_request"
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1.5"])
+def test_bad_content_length(running, length):
+    server = running()
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    conn.request("POST", "/detect", body="{}", headers={"Content-Length": length})
+    resp = conn.getresponse()
+    assert resp.status == 400 and json.loads(resp.read())["error"] == "bad_request"
+
+
+def test_failing_detector_returns_500(running):
+    def boom(text):
+        raise RuntimeError("detector bug")
+
+    server = running(DetectionService(checks=[boom]))
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    for path, body in [("/detect", {"text": "x"}), ("/detect/batch", {"texts": ["x"]})]:
+        status, payload = _request(conn, "POST", path, body)
+        assert status == 500 and payload["error"] == "internal_error"
+        assert "detector bug" in payload["detail"]
+    # The connection is still usable
+    assert _request(conn, "GET", "/healthz")[0] == 200
+
+
+def test_unknown_paths(running):
+    server = running()
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    assert _request(conn, "GET", "/nope")[0] == 404
+    assert _request(conn, "POST", "/nope", {})[0] == 404
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket_server(running, tmp_path):
+    path = str(tmp_path / "hd.sock")
+    server = running(unix_socket=path)
+    assert server.url == f"unix:{path}"
+    status, body = _request(UnixHTTPConnection(path), "POST", "/detect", {"text": "{}"})
+    assert status == 200 and body["ok"] is True
+
+
+def test_cli_serve_builds_service_once(monkeypatch, capsys):
+    import sys
+
+    from hallucination_detector import cli, server
+
+    seen = {}
+
+    def fake_serve(srv):
+        seen["service"] = srv.service
+        srv.server_close()
+
+    monkeypatch.setattr(server, "serve", fake_serve)
+    monkeypatch.setattr(
+        sys, "argv", ["hd", "serve", "--port", "0", "--include", "json", "--skip-json"]
+    )
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 0
+    service = seen["service"]
+    assert service.skip_json is True and len(service.checks) == 1
+
+
+def test_cli_serve_reports_pipeline_errors(monkeypatch, capsys, tmp_path):
+    import sys
+
+    from hallucination_detector import cli
+
+    monkeypatch.setattr(cli, "_jsonschema_available", lambda: False)
+    monkeypatch.setattr(sys, "argv", ["hd", "serve", "--schema", str(tmp_path)])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 1
+    assert "schema_validation_unavailable" in capsys.readouterr().out
+
+
+def test_metrics_endpoint_reports_batching(running):
+    server = running(DetectionService(batch_window_ms=1))
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    assert _request(conn, "POST", "/detect", {"text": "{}"})[1]["ok"] is True
+    status, body = _request(conn, "GET", "/metrics")
+    assert status == 200 and body["batching"]["items"] == 1
+
+
+def test_metrics_endpoint_prometheus_format(running):
+    from hallucination_detector.stats import DetectorStats
+
+    server = running(DetectionService(stats=DetectorStats()))
+    conn = http.client.HTTPConnection(*server.server_address[:2])
+    _request(conn, "POST", "/detect", {"text": "definitely"})
+    status, body = _request(conn, "GET", "/metrics")
+    assert body["detectors"]["texts"] == 1
+    conn.request("GET", "/metrics?format=prometheus")
+    resp = conn.getresponse()
+    text = resp.read().decode("utf-8")
+    assert resp.status == 200
+    assert resp.getheader("Content-Type", "").startswith("text/plain; version=0.0.4")
+    assert "hd_texts_total 1" in text
+    assert 'hd_detections_total{reason="invalid_json"} 1' in text
+    for path in ("/metrics?x=1&format=prometheus", "/metrics?format=prometheus&x=1"):
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        assert "hd_texts_total 1" in resp.read().decode("utf-8")
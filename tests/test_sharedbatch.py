@@ -0,0 +1,89 @@
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from hallucination_detector.bench import run_benchmarks
+from hallucination_detector.detector import Detection
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.sharedbatch import _Codec, _decode, run_shared
+
+TEXTS = [
+    '{"a": 1}',
+    "not json but definitely true",
+    "definitely 95% in 2024, a fact",
+    "everyone knows it https://example.com",
+    "yes and no",
+    "",
+    "é İ ſ ٣٣٣٣ definitely",
+    "lone \ud800 surrogate, definitely",
+    "guaranteed returns, trust me",
+] * 7
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    spec = [
+        {"pattern": "guaranteed.*returns", "reason": "promise"},
+        {"pattern": "trust me", "reason": "trust", "severity": "block"},
+    ]
+    path.write_text(json.dumps({"rules": spec}))
+    return str(path)
+
+
+def _boom(text):
+    raise RuntimeError("detector failed")
+
+
+def test_matches_run_batch_across_processes(rules_file):
+    pipelines = [Pipeline(), Pipeline(rules=rules_file, time_budget_ms=0.0)]
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        for pipeline in pipelines:
+            expected = pipeline.run_batch(TEXTS)
+            assert run_shared(pipeline, TEXTS, pool, chunk_size=4) == expected
+            assert pipeline.run_shared(iter(TEXTS), pool) == expected
+
+
+def test_threads_executor_and_copies():
+    pipeline = Pipeline()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = pipeline.run_shared(["x", "y"], pool, chunk_size=1)
+    assert results == pipeline.run_batch(["x", "y"])
+    results[0].reasons.append("edited")
+    assert results[1].reasons == ["invalid_json"]
+    assert run_shared(pipeline, [], pool) == []
+
+
+def test_worker_errors_propagate():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with pytest.raises(RuntimeError, match="detector failed"):
+            run_shared(Pipeline.from_checks([_boom]), ["a"], pool)
+
+
+def test_codec_learns_patches_and_spills_what_it_cannot_encode():
+    codec = _Codec()
+    suggestion = {"suggestion": "x"}
+    first = Detection(False, ["overconfident_no_citations"], "warn", suggestion)
+    both = Detection(
+        False, ["overconfident_no_citations", "custom"], "block", suggestion
+    )
+    assert codec.encode(both) is None  # patches of neither reason known yet
+    assert codec.encode(first) == (0b10, 1)
+    assert codec.encode(Detection(False, ["custom"], "info")) == (1 << 6, 0)
+    assert codec.encode(both) == (0b10 | 1 << 6, 2)
+    # Reasons out of bit order cannot be told apart from the mask
+    reversed_ = Detection(False, ["custom", "invalid_json"], "block")
+    assert codec.encode(Detection(False, ["invalid_json"], "block"))
+    assert codec.encode(reversed_) is None
+    assert _decode(codec.table(), 0b10 | 1 << 6, 2) == both
+    assert codec.encode(Detection(True, [])) == (0, 0)
+
+
+def test_shm_benchmarks():
+    report = run_benchmarks(min_time=0, only=["shm."], shm_records=40)
+    assert [r["name"] for r in report["results"]] == [
+        "shm.pickle.40",
+        "shm.shared.40",
+    ]
+    assert all(r["items"] == 40 * r["calls"] for r in report["results"])
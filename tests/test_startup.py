@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+PROBE = """
+import json, sys
+{body}
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _modules_after(body):
+    env = dict(os.environ, PYTHONPATH=SRC)
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(body=body)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    ).stdout
+    return set(json.loads(out.splitlines()[-1]))
+
+
+def test_package_import_is_lazy():
+    mods = _modules_after("import hallucination_detector")
+    assert "hallucination_detector.detector" not in mods
+    assert "hallucination_detector.registry" not in mods
+    assert "importlib.metadata" not in mods
+
+
+def test_lazy_attributes_resolve():
+    import hallucination_detector as hd
+
+    assert callable(hd.detect_text) and callable(hd.build_checks)
+    assert "detect_text" in dir(hd) and "detect_text" in hd.__all__
+    with pytest.raises(AttributeError):
+        hd.does_not_exist
+
+
+def test_cli_detect_avoids_heavy_imports():
+    body = (
+        "from hallucination_detector.cli import main\n"
+        "sys.argv = ['hd', 'detect', '--text', '{}']\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass"
+    )
+    mods = _modules_after(body)
+    for name in (
+        "importlib.metadata",
+        "hallucination_detector.registry",
+        "concurrent.futures",
+        "shutil",
+    ):
+        assert name not in mods, name
@@ -0,0 +1,89 @@
+import json
+import sys
+
+import pytest
+
+from hallucination_detector import cli
+from hallucination_detector.detector import (
+    Detection,
+    detect_batch,
+    detect_text,
+    load_custom_rules,
+)
+from hallucination_detector.registry import (
+    build_checks,
+    clear_registry,
+    register_detector,
+)
+from hallucination_detector.stats import DetectorStats, detector_name
+
+
+def test_stats_record_calls_hits_and_severities():
+    stats = DetectorStats()
+    detect_text("definitely true", stats=stats)
+    detect_text('{"a": 1}', stats=stats)
+    snap = stats.snapshot()
+    assert snap["texts"] == 2
+    d = snap["detectors"]
+    assert list(d)[:2] == ["json", "overconfidence"]
+    assert d["json"]["calls"] == 2 and d["json"]["fired"] == 1
+    assert d["json"]["severities"] == {"info": 0, "warn": 0, "block": 1}
+    assert d["overconfidence"]["severities"]["warn"] == 1
+    for entry in d.values():
+        assert 0 <= entry["p50_us"] <= entry["p95_us"] <= entry["p99_us"]
+    json.dumps(snap)
+
+
+def test_stats_names_registry_overrides_and_rules(tmp_path):
+    clear_registry()
+    try:
+
+        def shouty(text: str) -> Detection:
+            return (
+                Detection(False, ["shout"], "info")
+                if text.isupper()
+                else (Detection(True, []))
+            )
+
+        register_detector("shouty", shouty)
+        checks = build_checks(
+            include=["fact_check", "shouty"],
+            severity_overrides={"fact_check": "block", "shouty": "warn"},
+        )
+        assert [detector_name(c) for c in checks] == ["fact_check", "shouty"]
+        rules_file = tmp_path / "rules.json"
+        rules_file.write_text(json.dumps({"rules": [{"pattern": "x", "reason": "ex"}]}))
+        rules = load_custom_rules(str(rules_file))
+        stats = DetectorStats()
+        detect_batch(
+            ["HELLO X", "fact"], checks=checks, custom_rules=rules, stats=stats
+        )
+        d = stats.snapshot()["detectors"]
+        assert set(d) == {"fact_check", "shouty", "rule:ex"}
+        assert d["shouty"]["severities"]["warn"] == 1
+        assert d["fact_check"]["severities"]["block"] == 1
+        assert d["rule:ex"]["fired"] == 1
+    finally:
+        clear_registry()
+
+
+def test_reservoir_bounds_samples_and_reset():
+    stats = DetectorStats(max_samples=8)
+    for _ in range(100):
+        detect_text("plain", checks=build_checks(include=["json"]), stats=stats)
+    assert stats.snapshot()["detectors"]["json"]["calls"] == 100
+    assert len(stats._entries["json"].samples) == 8
+    stats.reset()
+    assert stats.snapshot()["texts"] == 0 and not stats.snapshot()["detectors"]
+    with pytest.raises(ValueError):
+        DetectorStats(max_samples=0)
+
+
+def test_cli_stats_prints_table_to_stderr(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["hd", "detect", "--text", "{}", "--stats"])
+    with pytest.raises(SystemExit) as exc:
+        cli.main()
+    assert exc.value.code == 0
+    out = capsys.readouterr()
+    assert json.loads(out.out)["ok"] is True
+    assert "texts: 1" in out.err and "numeric_claims" in out.err
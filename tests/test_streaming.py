@@ -0,0 +1,113 @@
+import json
+import random
+
+import pytest
+
+from hallucination_detector import registry
+from hallucination_detector.detector import Detection, detect_text, load_custom_rules
+from hallucination_detector.streaming import StreamDetector, detect_stream, stream_mode
+
+
+def _chunks(text, seed=0):
+    rng = random.Random(seed)
+    out, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 7)
+        out.append(text[i : i + n])
+        i += n
+    return out
+
+
+SAMPLES = [
+    '{"a": 1}',
+    "not json but definitely true",
+    '{"x": "This is definitely true https://example.com"}',
+    "In 2024 the rate was 95% and that is a fact.",
+    "Everyone knows that true and false can coexist. Either this or nothing, no middle.",
+    "Clearly a claim. Source: doi.org/10.1/xyz",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+@pytest.mark.parametrize("skip_json", [False, True])
+def test_finish_matches_detect_text(text, skip_json):
+    assert detect_stream(_chunks(text), skip_json=skip_json) == detect_text(
+        text, skip_json=skip_json
+    )
+
+
+def test_window_match_spanning_chunks_is_final():
+    s = StreamDetector(skip_json=True)
+    assert s.feed("this is true an") == []
+    events = s.feed("d false")
+    assert [e.reason for e in events] == ["possible_contradiction"]
+    assert events[0].pending is False
+    assert events[0].offset == len("this is true and false")
+
+
+def test_citation_dependent_events_are_pending_until_cleared():
+    s = StreamDetector(skip_json=True)
+    events = s.feed("It is defin")
+    events += s.feed("itely true.")
+    assert [e.reason for e in events] == ["overconfident_no_citations"]
+    assert events[0].pending and s.pending == events
+    # Citation split across chunks clears the pending warning
+    s.feed(" See htt")
+    s.feed("ps://example.com")
+    assert s.cited and s.pending == []
+    assert s.finish().ok
+
+
+def test_claims_after_citation_are_not_reported():
+    s = StreamDetector(skip_json=True)
+    s.feed("https://example.com says ")
+    assert s.feed("95% of cases in 2024") == []
+    assert s.finish().ok
+
+
+def test_json_only_evaluated_at_end():
+    s = StreamDetector()
+    assert s.feed("{") == []
+    assert s.feed('"a": 1}') == []
+    assert s.finish().ok
+    with pytest.raises(RuntimeError):
+        s.feed("more")
+
+
+def test_custom_rules_stream_modes(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(
+        json.dumps(
+            {
+                "rules": [
+                    {"pattern": "forbidden", "reason": "bad_word"},
+                    {"pattern": "study", "reason": "study", "require_citation": True},
+                ]
+            }
+        )
+    )
+    rules = load_custom_rules(str(path))
+    assert [stream_mode(r) for r in rules] == ["window", "citation"]
+    s = StreamDetector(skip_json=True, custom_rules=rules)
+    events = s.feed("a forbidden study")
+    assert {(e.reason, e.pending) for e in events} == {
+        ("bad_word", False),
+        ("study", True),
+    }
+
+
+def test_severity_wrapped_and_unknown_detectors():
+    registry.clear_registry()
+    registry.register_detector("todo", lambda s: Detection("TODO" not in s, ["todo"]))
+    checks = registry.build_checks(
+        include=["contradictions", "todo"],
+        severity_overrides={"contradictions": "block"},
+    )
+    assert [stream_mode(c) for c in checks] == ["window", "end"]
+    s = StreamDetector(checks)
+    events = s.feed("TODO: yes and no")
+    assert [(e.reason, e.severity) for e in events] == [
+        ("possible_contradiction", "block")
+    ]
+    assert s.finish().reasons == ["possible_contradiction", "todo"]
+    registry.clear_registry()
@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+
+from hallucination_detector import detector, registry
+from hallucination_detector.bench import format_table, gil_enabled, run_benchmarks
+from hallucination_detector.detector import (
+    Detection,
+    detect_text,
+    guard_logical_fallacies,
+    set_confident_keywords,
+)
+from hallucination_detector.pipeline import Pipeline
+from hallucination_detector.prefilter import prefilter_of
+from hallucination_detector.stats import DetectorStats
+
+
+def _hammer(count, target):
+    errors = []
+    start = threading.Barrier(count)
+
+    def body(i):
+        start.wait()
+        try:
+            target(i)
+        except BaseException as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=body, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_keywords_are_copied_and_swapped_whole():
+    saved = detector.CONFIDENT_KEYWORDS
+    words = ["surely"]
+    try:
+        set_confident_keywords(words)
+        words.append("maybe")
+        assert detector.CONFIDENT_KEYWORDS == ("surely",)
+        assert detect_text("maybe so", skip_json=True).ok
+    finally:
+        set_confident_keywords(saved)
+
+
+def test_keyword_swaps_during_detection():
+    saved = detector.CONFIDENT_KEYWORDS
+    fired = Detection(
+        False,
+        ["overconfident_no_citations"],
+        "warn",
+        {"suggestion": "Add a citation link to support the claim."},
+    )
+
+    def body(i):
+        for n in range(300):
+            if i == 0:
+                set_confident_keywords(["alpha"] if n % 2 else ["beta"])
+                continue
+            res = detect_text("alpha claim", skip_json=True)
+            assert res in (Detection(True, []), fired), res
+
+    try:
+        _hammer(4, body)
+    finally:
+        set_confident_keywords(saved)
+
+
+def test_shared_pipeline_and_stats_across_threads():
+    stats = DetectorStats()
+    pipeline = Pipeline()
+    texts = ["definitely 95%", "{}", "yes and no", "plain"] * 50
+    expected = [detect_text(t) for t in texts]
+
+    def body(i):
+        assert [pipeline.run(t, stats=stats) for t in texts] == expected
+
+    _hammer(6, body)
+    snap = stats.snapshot()
+    assert snap["texts"] == 6 * len(texts)
+    d = snap["detectors"]["json"]
+    assert d["calls"] + d["skipped"] == 6 * len(texts)
+
+
+def test_lazy_tables_are_published_whole(monkeypatch):
+    monkeypatch.setattr(detector, "_FALLACY_SEARCHES", ())
+    monkeypatch.setattr("hallucination_detector.prefilter._BUILTINS", {})
+
+    def body(i):
+        assert prefilter_of(guard_logical_fallacies) is not None
+        assert guard_logical_fallacies("everyone knows").reasons == [
+            "possible_logical_fallacy"
+        ]
+
+    _hammer(8, body)
+    assert len(detector._FALLACY_SEARCHES) == len(detector._FALLACIES)
+
+
+def test_concurrent_registration():
+    def body(i):
+        for n in range(50):
+            registry.register_detector(f"t{i}_{n}", lambda t: Detection(True, []))
+            registry.build_checks(include=[f"t{i}_{n}"])
+
+    try:
+        before = registry.registry_version()
+        _hammer(4, body)
+        assert registry.registry_version() == before + 200
+        assert len(registry._snapshot().user) >= 200
+    finally:
+        registry.clear_registry()
+
+
+def test_schema_cache_under_threads():
+    pytest.importorskip("jsonschema")
+    detector.clear_schema_cache()
+    before = detector.schema_cache_info()
+    schema = {"type": "object", "required": ["a"]}
+
+    def body(i):
+        for _ in range(20):
+            assert not detector.make_schema_guard(schema)("{}").ok
+
+    _hammer(4, body)
+    info = detector.schema_cache_info()
+    assert info["size"] == 1
+    assert info["hits"] + info["misses"] - before["hits"] - before["misses"] == 80
+
+
+def test_thread_scaling_bench():
+    report = run_benchmarks(
+        corpus_size=8, min_time=0, only=["threads."], thread_counts=[1, 3]
+    )
+    assert [r["name"] for r in report["results"]] == ["threads.1", "threads.3"]
+    assert all(r["items"] == 8 * r["calls"] for r in report["results"])
+    assert report["meta"]["gil_enabled"] is gil_enabled()
+    assert "threads.* ran with the GIL" in format_table(report)
@@ -0,0 +1,95 @@
+import contextvars
+import json
+from typing import Any, Dict, Optional
+
+import pytest
+
+from hallucination_detector import tracing
+from hallucination_detector.detector import (
+    detect_batch,
+    detect_text,
+    load_custom_rules,
+)
+from hallucination_detector.registry import build_checks
+
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class RecordingTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, attributes):
+        span = {"name": name, "attributes": dict(attributes), "parent": _current.get()}
+        span["token"] = _current.set(span)
+        return span
+
+    def end_span(self, span, outcome, duration, error=None):
+        _current.reset(span.pop("token"))
+        span.update(outcome=dict(outcome), duration=duration, error=error)
+        self.spans.append(span)
+
+
+@pytest.fixture
+def tracer():
+    t = RecordingTracer()
+    tracing.set_tracer(t)
+    yield t
+    tracing.set_tracer(None)
+
+
+def test_default_is_noop():
+    assert tracing._TRACER is None
+    assert isinstance(tracing.get_tracer(), tracing.NoopTracer)
+    tracing.set_tracer(tracing.NoopTracer())
+    assert tracing._TRACER is None
+
+
+def test_detect_text_spans(tracer):
+    checks = build_checks(include=["json", "overconfidence"])
+    res = detect_text("definitely", checks=checks)
+    names = [(s["name"], s["attributes"].get("detector")) for s in tracer.spans]
+    assert names == [
+        ("hd.detector", "json"),
+        ("hd.detector", "overconfidence"),
+        ("hd.detect_text", None),
+    ]
+    top = tracer.spans[-1]
+    assert top["attributes"] == {"input_size": len("definitely")}
+    assert top["outcome"] == {
+        "ok": False,
+        "severity": res.severity,
+        "reasons": res.reasons,
+    }
+    assert all(s["parent"] is top for s in tracer.spans[:2])
+    assert all(s["duration"] >= 0 for s in tracer.spans)
+
+
+def test_batch_spans_parent_per_text_spans(tracer):
+    detect_batch(["{}", "x"], checks=build_checks(include=["json"]))
+    batch = tracer.spans[-1]
+    assert batch["name"] == "hd.detect_batch"
+    assert batch["attributes"] == {"batch_size": 2}
+    assert batch["outcome"] == {"texts": 2, "failed": 1}
+    texts = [s for s in tracer.spans if s["name"] == "hd.detect_text"]
+    assert len(texts) == 2 and all(s["parent"] is batch for s in texts)
+
+
+def test_rule_loading_and_errors_are_traced(tracer, tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"rules": [{"pattern": "a"}, {"pattern": "b"}]}))
+    load_custom_rules(str(rules))
+    span = tracer.spans[-1]
+    assert span["name"] == "hd.load_custom_rules"
+    assert span["attributes"] == {"path": str(rules)}
+    assert span["outcome"] == {"rules": 2} and span["error"] is None
+
+    def boom(text):
+        raise RuntimeError("detector failed")
+
+    with pytest.raises(RuntimeError):
+        detect_text("x", checks=[boom])
+    assert isinstance(tracer.spans[-1]["error"], RuntimeError)
+    assert tracer.spans[-2]["attributes"]["detector"].endswith("boom")
@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from hallucination_detector.detector import detect_text
+from hallucination_detector.server import DetectionService
+from hallucination_detector.worker import run_worker
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+
+def _ndjson(*messages):
+    return b"".join(
+        (m if isinstance(m, bytes) else json.dumps(m).encode()) + b"\n"
+        for m in messages
+    )
+
+
+def test_ndjson_pipelined_requests_keep_order_and_ids():
+    texts = ["{}", "not json", "definitely 95%"]
+    stdin = io.BytesIO(
+        _ndjson(
+            {"id": 1, "text": texts[0]},
+            {"id": "two", "texts": texts},
+            {"id": 3, "op": "ping"},
+        )
+    )
+    stdout = io.BytesIO()
+    assert run_worker(DetectionService(), stdin, stdout) == 3
+    lines = [json.loads(x) for x in stdout.getvalue().splitlines()]
+    assert lines[0] == {"id": 1, "result": detect_text(texts[0]).__dict__}
+    assert lines[1] == {
+        "id": "two",
+        "results": [detect_text(t).__dict__ for t in texts],
+    }
+    assert lines[2] == {"id": 3, "ok": True}
+
+
+@pytest.mark.parametrize(
+    "message,code",
+    [
+        (b"{oops", "invalid_json"),
+        (b"[1, 2]", "bad_request"),
+        (b'{"id": 7, "text": 5}', "bad_request"),
+        (b'{"id": 7, "texts": [1]}', "bad_request"),
+        (b'{"id": 7, "op": "reload"}', "unknown_op"),
+    ],
+)
+def test_malformed_requests_get_errors_and_worker_continues(message, code):
+    stdin = io.BytesIO(_ndjson(message, {"id": 9, "text": "{}"}))
+    stdout = io.BytesIO()
+    run_worker(DetectionService(), stdin, stdout)
+    first, second = [json.loads(x) for x in stdout.getvalue().splitlines()]
+    assert first["error"]["code"] == code
+    assert second["id"] == 9 and second["result"]["ok"] is True
+
+
+def test_length_prefixed_framing_allows_newlines_in_payload():
+    payload = json.dumps({"id": 1, "text": "line one\nline two"}, indent=1).encode()
+    stdin = io.BytesIO(struct.pack(">I", len(payload)) + payload + b"\x00\x00")
+    stdout = io.BytesIO()
+    assert run_worker(DetectionService(skip_json=True), stdin, stdout, "length") == 1
+    raw = stdout.getvalue()
+    (size,) = struct.unpack(">I", raw[:4])
+    assert json.loads(raw[4 : 4 + size])["result"]["ok"] is True
+    with pytest.raises(ValueError):
+        run_worker(DetectionService(), io.BytesIO(), io.BytesIO(), "xml")
+
+
+def test_cli_worker_process_round_trip():
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "hallucination_detector.cli", "worker", "--skip-json"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env=dict(os.environ, PYTHONPATH=SRC),
+    )
+    assert proc.stdin is not None and proc.stdout is not None
+    # Interactive use: each response arrives before the next request is sent
+    for i, text in enumerate(["plain", "definitely"]):
+        proc.stdin.write(_ndjson({"id": i, "text": text}))
+        proc.stdin.flush()
+        response = json.loads(proc.stdout.readline())
+        assert response["id"] == i
+        assert response["result"]["ok"] is (text == "plain")
+    proc.stdin.close()
+    assert proc.wait(timeout=10) == 0